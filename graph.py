@@ -4,17 +4,39 @@ This file was created by Mo Gibson and Philip Tran
 Purpose: To take in graph files or make a random Erods-Renjy graph, find the BFS path of a set of root nodes, analyze graph features, plot the graph, and return a .gml graph file with additional graph or bfs data
 """
 
-from collections import deque
 import time
 import math
 import argparse
-from matplotlib.lines import Line2D
-from matplotlib.patches import Patch
-import matplotlib.cm as cm
-import matplotlib.colors as mcolors
-import matplotlib.pyplot as plt
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import csv
+import functools
+import gzip
+import hashlib
+import heapq
+import html
+import json
+import mmap
+import os
+from multiprocessing import shared_memory
+import re
+import tempfile
+import threading
+import tracemalloc
+import weakref
+import numpy as np
 import networkx as nx
 import sys
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module, --profile then leaves out the peak RSS
+    resource = None
+
+# the plotting stack (matplotlib) is only imported by import_plotting when a plot is drawn, it is most of the startup time otherwise
+LineCollection = Line2D = Patch = cm = mcolors = plt = None
 
 
 
@@ -22,131 +44,897 @@ import sys
 # ====================================================================================================
 
 """To take in a graph .gml file, and check that the input ID values are ints
-Input: either a local file with just the name, or the file's entire path
+Files in the node/edge/label layout graph.py writes go through read_gml_fast, anything else (or anything malformed) is handed to nx.read_gml so the errors are the same as NetworkX reports them.
+With use_cache, a binary sidecar of the loaded graph is kept next to the file, so later runs on the same unchanged file skip parsing
+Input: either a local file with just the name, or the file's entire path, and whether to use the sidecar cache
 Output: the graph that corresponds to the the file name
 """
-def load_gml(path: str):
+def load_gml(path: str, use_cache: bool = False):
     print(f"load_gml called with path={path}")
-    Graph = nx.read_gml(path)
+    start = time.perf_counter()
+    if use_cache:
+        Graph = read_gml_cache(path)
+        if Graph is not None:
+            print(f"load_gml: warm load from {gml_cache_path(path)} in {time.perf_counter() - start:.3f}s")
+            return Graph
+
+    try:
+        Graph = read_gml_fast(path)
+    except GMLFallback:
+        Graph = nx.read_gml(path)
+
+        for node in Graph.nodes():
+            if node.isdigit() is False:
+                raise ValueError(f"--input: node id {node} is not appropriate. Must be an int.")
+
+        build_graph_core(Graph)
+
+    if use_cache:
+        print(f"load_gml: cold load (parsed GML) in {time.perf_counter() - start:.3f}s")
+        write_gml_cache(Graph, path)
+    return Graph
+
+
+"""Raised by read_gml_fast when a file uses GML that isn't in the subset it reads, so load_gml should read it with nx.read_gml instead
+"""
+class GMLFallback(Exception):
+    pass
+
+
+# tokens of the GML subset read_gml_fast understands, the same token shapes nx.read_gml uses
+_GML_KEY = rb"[A-Za-z][0-9A-Za-z_]*"
+_GML_VALUE = (
+    rb'"[^"\n]*"'
+    rb"|[+-]?(?:[0-9]*\.[0-9]+|[0-9]+\.[0-9]*|INF)(?:[Ee][+-]?[0-9]+)?(?![0-9A-Za-z_.])"
+    rb"|[+-]?[0-9]+(?![0-9A-Za-z_.])"
+)
+_GML_KV = re.compile(rb"\s*(" + _GML_KEY + rb")\s+(" + _GML_VALUE + rb")")
+_GML_SPACE = re.compile(rb"\s*")
+_GML_OPEN = re.compile(rb"\s*(" + _GML_KEY + rb")\s*\[")
+_GML_NODE = re.compile(rb"\s*node\s*\[((?:\s*" + _GML_KEY + rb"\s+(?:" + _GML_VALUE + rb"))*)\s*\]")
+# up to a few thousand back to back "edge [ source s target t ]" blocks per match, so edges are pulled out without a Python step each
+_GML_EDGE = rb"\s*edge\s*\[\s*source\s+([+-]?[0-9]+)\s+target\s+([+-]?[0-9]+)\s*\]"
+_GML_EDGE_RUN = re.compile(rb"(?:" + _GML_EDGE + rb"){1,4096}")
+_GML_EDGE_ONE = re.compile(_GML_EDGE)
+_GML_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+"""To turn one GML value token into the same Python value nx.read_gml gives it
+"""
+def gml_value(token: bytes):
+    if token[:1] == b'"':
+        value = token[1:-1].decode("ascii")
+        if value in ("()", "[]"):
+            raise GMLFallback()
+        return html.unescape(value) if "&" in value else value
+    if b"." in token or b"INF" in token:
+        return float(token)
+    return int(token)
+
+"""To turn the key/value pairs inside one [ ... ] block into a dict, keys that repeat become lists in NetworkX so they aren't part of the subset
+"""
+def gml_dict(body: bytes) -> dict:
+    pairs = _GML_KV.findall(body)
+    dct = {key.decode("ascii"): gml_value(value) for key, value in pairs}
+    if len(dct) != len(pairs):
+        raise GMLFallback()
+    return dct
+
+"""Reads the node/edge/label subset of GML that graph.py (and nx.write_gml) produce straight off a memory-mapped file.
+Compiled regexes scan whole node blocks and long runs of edge blocks at a time, node ids are checked to be ints in the same pass,
+and the graph and its core are built directly from the id arrays. The graph comes out identical to nx.read_gml's, including node, neighbor and attribute order
+Input: The file's path
+Output: The graph, raises GMLFallback if the file needs nx.read_gml and ValueError if a node id isn't an int
+"""
+def read_gml_fast(path: str):
+    # gzipped files are decompressed into memory, everything else is mapped
+    if path.endswith(".gz"):
+        with gzip.open(path, "rb") as f:
+            return parse_gml_buffer(f.read())
 
-    for node in Graph.nodes():
-        if node.isdigit() is False:
-            raise ValueError(f"--input: node id {node} is not appropriate. Must be an int.")
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise GMLFallback()  # empty file
+    with buf:
+        return parse_gml_buffer(buf)
 
+"""The scanning half of read_gml_fast, over the whole file's bytes (a mmap or a bytes object)
+"""
+def parse_gml_buffer(buf):
+    # non-ASCII text is left to NetworkX (as are comments, which none of the patterns below match)
+    if _GML_NON_ASCII.search(buf):
+        raise GMLFallback()
+
+    graph_attrs = {}
+    ids, labels, node_attrs = [], [], []
+    edge_chunks = []
+    bad_label = None
+
+    # top level: scalar entries are ignored like NetworkX does, and there must be exactly one graph [ ... ]
+    pos, end, found_graph = 0, len(buf), False
+    while True:
+        pos = _GML_SPACE.match(buf, pos).end()
+        if pos == end:
+            break
+        m = _GML_KV.match(buf, pos)
+        if m:
+            pos = m.end()
+            continue
+        m = _GML_OPEN.match(buf, pos)
+        if m is None or m.group(1) != b"graph" or found_graph:
+            raise GMLFallback()
+        pos, found_graph = m.end(), True
+
+        # graph body: graph attributes, node blocks and runs of edge blocks until the closing ]
+        while True:
+            m = _GML_EDGE_RUN.match(buf, pos)
+            if m:
+                edge_chunks.append(_GML_EDGE_ONE.findall(buf, pos, m.end()))
+                pos = m.end()
+                continue
+            m = _GML_NODE.match(buf, pos)
+            if m:
+                node = gml_dict(m.group(1))
+                node_id, label = node.pop("id", None), node.pop("label", None)
+                if not isinstance(node_id, int) or not isinstance(label, str):
+                    raise GMLFallback()
+                if bad_label is None and label.isdigit() is False:
+                    bad_label = label
+                ids.append(node_id)
+                labels.append(label)
+                node_attrs.append(node)
+                pos = m.end()
+                continue
+            m = _GML_KV.match(buf, pos)
+            if m:
+                key = m.group(1).decode("ascii")
+                if key in graph_attrs or key in ("node", "edge"):
+                    raise GMLFallback()
+                graph_attrs[key] = gml_value(m.group(2))
+                pos = m.end()
+                continue
+            pos = _GML_SPACE.match(buf, pos).end()
+            if buf[pos:pos + 1] != b"]":
+                raise GMLFallback()
+            pos += 1
+            break
+
+    if not found_graph:
+        raise GMLFallback()
+
+    # NetworkX drops these, anything but a plain undirected graph is left to it
+    if graph_attrs.pop("directed", 0) or graph_attrs.pop("multigraph", 0):
+        raise GMLFallback()
+    if len(set(ids)) != len(ids) or len(set(labels)) != len(labels):
+        raise GMLFallback()
+    # edge endpoints go from GML ids to positions in the node list
+    n = len(ids)
+    pairs = [pair for chunk in edge_chunks for pair in chunk]
+    ends = np.array(pairs, dtype=np.bytes_).astype(np.int64).reshape(-1, 2)
+    id_arr = np.array(ids, dtype=np.int64)
+    if not np.array_equal(id_arr, np.arange(n)):
+        order = np.argsort(id_arr)
+        at = np.searchsorted(id_arr, ends, sorter=order).clip(0, max(n - 1, 0))
+        if n == 0 or not np.array_equal(id_arr[order[at]], ends):
+            raise GMLFallback()
+        ends = order[at]
+    elif ends.size and (ends.min() < 0 or ends.max() >= n):
+        raise GMLFallback()
+
+    # nx.read_gml adds edges by GML id and then relabels into a new graph, which re-adds them in G.edges() order:
+    # each edge sorted by its earlier endpoint in node order, then by file order
+    lo, hi = ends.min(axis=1), ends.max(axis=1)
+    if np.unique(lo * max(n, 1) + hi).size != lo.size:
+        raise GMLFallback()  # duplicated edge
+    order = np.lexsort((np.arange(lo.size), lo))
+    lo, hi = lo[order], hi[order]
+
+    # same check (and message) load_gml makes after nx.read_gml, only once the file is known to parse
+    if bad_label is not None:
+        raise ValueError(f"--input: node id {bad_label} is not appropriate. Must be an int.")
+
+    Graph = nx.Graph()
+    Graph.graph.update(graph_attrs)
+    Graph.add_nodes_from(zip(labels, node_attrs))
+    Graph.add_edges_from(zip(map(labels.__getitem__, lo.tolist()), map(labels.__getitem__, hi.tolist())))
+    set_graph_core(Graph, core_from_edges(labels, lo, hi))
     return Graph
 
-"""To save a graph to a specific .gml file
+"""To save a graph to a specific .gml file (gzip compressed when the name ends in .gz)
+The graph's attributes are streamed out by write_gml_fast, graphs with attributes it can't write are saved with nx.write_gml
 Input: the output file name and a graph
 Output:
 """
 def save_gml(G, path: str):
-    nx.write_gml(G, path)
+    try:
+        write_gml_fast(G, path)
+    except GMLFallback:
+        materialize_node_columns(G)
+        nx.write_gml(G, path)
     print(f"Graph saved to {path}")
 
+
+# nodes/edges formatted and written per chunk
+GML_WRITE_CHUNK = 1 << 16
+# marks a node that doesn't have an attribute in a node attribute column
+GML_MISSING = object()
+_GML_NEEDS_ESCAPE = re.compile(r'[^ -~]|[&"]')
+_GML_VALID_KEY = re.compile(r"^[A-Za-z][0-9A-Za-z_]*$")
+
+"""To write one scalar GML entry the way nx.write_gml writes it (ints outside 32 bits become strings, floats always have a decimal point, strings are escaped)
+Input: The key, its value and the indent
+Output: The entry's line with a newline, raises GMLFallback for values that aren't an int, float or string
+"""
+def gml_entry(key: str, value, indent: str) -> str:
+    if isinstance(value, bool):
+        return f"{indent}{key} {int(value)}\n"
+    if isinstance(value, int):
+        if key == "label" or value < -(2**31) or value >= 2**31:
+            return f'{indent}{key} "{value}"\n'
+        return f"{indent}{key} {value}\n"
+    if isinstance(value, float):
+        text = repr(value).upper()
+        if text == "INF":
+            text = "+INF"
+        else:
+            epos = text.rfind("E")
+            if epos != -1 and text.find(".", 0, epos) == -1:
+                text = text[:epos] + "." + text[epos:]
+        return f'{indent}{key} "{text}"\n' if key == "label" else f"{indent}{key} {text}\n"
+    if isinstance(value, str):
+        if _GML_NEEDS_ESCAPE.search(value):
+            value = _GML_NEEDS_ESCAPE.sub(lambda m: f"&#{ord(m.group(0))};", value)
+        return f'{indent}{key} "{value}"\n'
+    raise GMLFallback()
+
+"""To format a whole column of one node attribute at once, with a plain f-string per value when every value is a small int or a string that needs no escaping
+Input: The attribute's key and a list with a value (or GML_MISSING) per node
+Output: A list with the entry line per node ("" where the node doesn't have the attribute)
+"""
+def gml_column(key: str, values: list) -> list:
+    indent = "    "
+    types = set(map(type, values))
+    if types == {int} and -(2**31) <= min(values) and max(values) < 2**31:
+        return [f"{indent}{key} {v}\n" for v in values]
+    if types == {str} and not _GML_NEEDS_ESCAPE.search("".join(values)):
+        return [f'{indent}{key} "{v}"\n' for v in values]
+    return ["" if v is GML_MISSING else gml_entry(key, v, indent) for v in values]
+
+"""To pull the graph's node attribute dicts apart into one column per attribute.
+Columns are ordered so every node's attributes keep their own relative order when they can (nodes missing some attributes don't change it), so the file matches nx.write_gml's
+Input: A graph
+Output: A dict of attribute name -> list with a value (or GML_MISSING) per node, in node order
+"""
+def node_attr_columns(G: nx.Graph) -> dict:
+    attrs = [d for _, d in G.nodes(data=True)]
+    orders = dict.fromkeys(tuple(d) for d in attrs)
+    first_seen = list(dict.fromkeys(key for order in orders for key in order))
+
+    # each node's key order as "comes before" links, then a topological order that prefers keys seen first
+    after = {key: set() for key in first_seen}
+    waiting = dict.fromkeys(first_seen, 0)
+    for order in orders:
+        for a, b in zip(order, order[1:]):
+            if b not in after[a]:
+                after[a].add(b)
+                waiting[b] += 1
+    keys = []
+    while len(keys) < len(first_seen):
+        ready = [key for key in first_seen if waiting[key] == 0 and key not in keys]
+        if not ready:
+            keys = first_seen  # the nodes disagree on the order, first seen it is
+            break
+        keys.append(ready[0])
+        for b in after[ready[0]]:
+            waiting[b] -= 1
+
+    return {key: [d.get(key, GML_MISSING) for d in attrs] for key in keys if key not in ("id", "label")}
+
+"""Streams a graph out as GML a chunk of nodes/edges at a time. Node attributes come from per-attribute columns (node_attr_columns(G), the graph's NodeColumns and any extra columns passed in),
+each column is formatted in one go, and the edges come straight from the graph's core. The text is the same nx.write_gml writes for the int, float and string attributes graph.py uses
+Input: A graph, the output path (gzip compressed when it ends in .gz) and optionally extra node attribute columns (name -> a value per node in node order)
+Output: raises GMLFallback if the graph needs nx.write_gml
+"""
+def write_gml_fast(G: nx.Graph, path: str, columns: dict = None):
+    if G.is_directed() or G.is_multigraph():
+        raise GMLFallback()
+    if any(dd for nbrs in G.adj.values() for dd in nbrs.values()):
+        raise GMLFallback()  # edge attributes
+
+    core = graph_core(G)
+    columns = {**node_attr_columns(G), **core.columns, **(columns or {})}
+    for key, values in columns.items():
+        # node columns are materialized a chunk at a time by write_gml_stream
+        if not isinstance(values, NodeColumn):
+            columns[key] = values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+    # edges in G.edges() order: each node's neighbors that come at or after it in node order
+    rows = np.repeat(np.arange(core.n, dtype=np.int32), core.degree())
+    forward = core.indices >= rows
+    write_gml_stream(path, G.graph, core.labels, columns, [(rows[forward], core.indices[forward])])
+
+"""To write a GML file from its parts a chunk at a time, the way nx.write_gml lays it out
+Input: The output path (gzip compressed when it ends in .gz), the graph attributes, the node labels (anything that can be sliced), the node attribute columns
+(name -> a list or NodeColumn over the nodes) and an iterable of (sources, targets) int array pairs with the edges in order
+Output: raises GMLFallback for keys or values nx.write_gml has to write
+"""
+def write_gml_stream(path: str, graph_attrs: dict, labels, columns: dict, edge_chunks):
+    if not all(map(_GML_VALID_KEY.match, columns)):
+        raise GMLFallback()
+
+    # a fallback part way through is fine, nx.write_gml writes the whole file again
+    header = ["graph [\n"]
+    for key, value in graph_attrs.items():
+        if key not in ("directed", "multigraph", "node", "edge"):
+            if not _GML_VALID_KEY.match(str(key)):
+                raise GMLFallback()
+            if isinstance(value, list):
+                # lists are repeated keys, with NetworkX's markers for the empty and one item lists
+                if len(value) == 0:
+                    header.append(f'  {key} "[]"\n')
+                if len(value) == 1:
+                    header.append(f'  {key} "_networkx_list_start"\n')
+                header.extend(gml_entry(key, item, "  ") for item in value)
+            else:
+                header.append(gml_entry(key, value, "  "))
+
+    # level 6 is gzip's usual speed/size trade off, the module defaults to the slow level 9
+    f = gzip.open(path, "wb", compresslevel=6) if path.endswith(".gz") else open(path, "wb", buffering=1 << 20)
+    with f:
+        f.write("".join(header).encode("ascii"))
+
+        n = len(labels)
+        for lo in range(0, n, GML_WRITE_CHUNK):
+            hi = min(lo + GML_WRITE_CHUNK, n)
+            heads = [f"  node [\n    id {i}\n" for i in range(lo, hi)]
+            label_lines = gml_column("label", [str(v) if isinstance(v, int) else v for v in labels[lo:hi]])
+            cols = [gml_column(key, values.materialize(lo, hi) if isinstance(values, NodeColumn) else values[lo:hi]) for key, values in columns.items()]
+            f.write("".join(map("".join, zip(heads, label_lines, *cols, ["  ]\n"] * (hi - lo)))).encode("ascii"))
+
+        for sources, targets in edge_chunks:
+            for lo in range(0, sources.size, GML_WRITE_CHUNK):
+                chunk = zip(sources[lo:lo + GML_WRITE_CHUNK].tolist(), targets[lo:lo + GML_WRITE_CHUNK].tolist())
+                f.write("".join([f"  edge [\n    source {u}\n    target {v}\n  ]\n" for u, v in chunk]).encode("ascii"))
+
+        f.write(b"]\n")
+
+
 """To make a random Erdos-Renyi graph with a given number of nodes and edge probability liklihood
-Input: The number of nodes in the graph (n: int) and the likilihood of edge probability (c: float)
+The edges come from erdos_renyi_edges in O(n + m), and the graph is built with the string labels straight away (no relabel copy)
+Input: The number of nodes in the graph (n: int), the likilihood of edge probability (c: float) and optionally the random seed (the current time if not given)
 Output: An Erdos-Renyi graph
 """
-def create_random_graph(n: int, c: float):
-    seed = int(time.time())
+def create_random_graph(n: int, c: float, seed: int = None):
+    if seed is None:
+        seed = int(time.time())
     p = (c * math.log(n)) / n                   #calculating the probablility based off the probablilty funtion in the assignment
-    G = nx.erdos_renyi_graph(n, p, seed=seed)    #generating the graph
-    
-    mapping = {i: str(i) for i in G.nodes()}    #Making all the lables strings as per sinstructions
-    G = nx.relabel_nodes(G, mapping)
-    for v in G.nodes():
-        G.nodes[v]["label"] = v
+    src, dst = erdos_renyi_edges(n, p, seed)     #generating the edges
+
+    labels = [str(i) for i in range(n)]         #Making all the lables strings as per sinstructions, write_gml turns the node keys into label attributes on save
+    G = nx.Graph()
+    G.add_nodes_from(labels)
+    G.add_edges_from(zip(map(labels.__getitem__, src.tolist()), map(labels.__getitem__, dst.tolist())))
+    set_graph_core(G, core_from_edges(labels, src, dst))
     return  G
 
+"""Samples G(n, p) edges in O(n + m) with geometric skips: the gap between one chosen pair and the next, walking the n(n-1)/2 possible pairs in order, is geometric in p,
+so the chosen pairs' positions are a running sum of geometric draws (made in NumPy batches) instead of a coin flip per pair
+Input: The number of nodes, the edge probability and the random seed
+Output: Two int32 arrays with each edge's lower and higher node id, in pair order (by the higher id and then the lower one)
+"""
+def erdos_renyi_edges(n: int, p: float, seed: int):
+    rng = np.random.default_rng(seed)
+    num_pairs = n * (n - 1) // 2
+
+    if p <= 0 or num_pairs == 0:
+        positions = np.empty(0, dtype=np.int64)
+    elif p >= 1:
+        positions = np.arange(num_pairs, dtype=np.int64)
+    else:
+        chunks, last = [], -1
+        while True:
+            # enough draws to most likely reach the end in one go
+            expected = (num_pairs - 1 - last) * p
+            batch = int(expected + 4 * math.sqrt(expected) + 16)
+            chunk = last + np.cumsum(rng.geometric(p, size=batch))
+            if chunk[-1] >= num_pairs:
+                chunks.append(chunk[chunk < num_pairs])
+                break
+            chunks.append(chunk)
+            last = int(chunk[-1])
+        positions = np.concatenate(chunks)
+
+    # position k is the pair (w, v) with w < v where k = v(v-1)/2 + w, the float root can be off by one for huge k so it's corrected
+    v = ((1 + np.sqrt(1 + 8 * positions.astype(np.float64))) // 2).astype(np.int64)
+    v -= v * (v - 1) // 2 > positions
+    v += (v + 1) * v // 2 <= positions
+    w = positions - v * (v - 1) // 2
+    return w.astype(np.int32), v.astype(np.int32)
+
+
+
+
+# GML Cache Functions
+# ====================================================================================================
+# sidecar file layout: magic, 8 byte header length, JSON header, then the raw arrays (each starting on a 64 byte boundary)
+GML_CACHE_SUFFIX = ".gmlcache"
+GML_CACHE_MAGIC = b"GMLCACHE1\n"
 
+"""Where the sidecar cache of a GML file lives (right next to it)
+"""
+def gml_cache_path(path: str) -> str:
+    return path + GML_CACHE_SUFFIX
+
+"""To hash a file's contents a block at a time
+Input: The file's path
+Output: The hex blake2b digest of the file
+"""
+def gml_file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 22), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+"""To write the sidecar cache of a loaded graph: its labels, edges (in the order they were added, so the rebuilt graph has the same neighbor order) and attributes, keyed by the GML file's size, mtime and content hash.
+Numeric node attributes are stored as arrays, any other node attribute column as JSON. Graphs with attributes JSON can't hold aren't cached
+Input: The loaded graph and the GML file's path
+Output:
+"""
+def write_gml_cache(G: nx.Graph, path: str):
+    core = graph_core(G)
+    rows = np.repeat(np.arange(core.n, dtype=np.int32), core.degree())
+    forward = core.indices >= rows
+
+    arrays = {
+        "labels": np.frombuffer("\n".join(core.labels).encode("utf-8"), dtype=np.uint8),
+        "src": rows[forward],
+        "dst": core.indices[forward],
+    }
+    columns = {}
+    for key, values in node_attr_columns(G).items():
+        types = set(map(type, values))
+        if types == {int} and -(2**63) <= min(values) and max(values) < 2**63:
+            arrays["col:" + key] = np.array(values, dtype=np.int64)
+        elif types == {float}:
+            arrays["col:" + key] = np.array(values, dtype=np.float64)
+        elif types <= {int, float, str, type(GML_MISSING)}:
+            text = json.dumps([None if v is GML_MISSING else v for v in values])
+            arrays["col:" + key] = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        else:
+            return
+        columns[key] = "array" if arrays["col:" + key].dtype != np.uint8 else "json"
+    if not all(isinstance(v, (int, float, str)) for v in G.graph.values()):
+        return
+
+    stat = os.stat(path)
+    header = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": gml_file_hash(path),
+        "graph": G.graph,
+        "columns": columns,
+        "arrays": {},
+    }
+    offset = 0
+    for name, arr in arrays.items():
+        header["arrays"][name] = [arr.dtype.str, arr.size, offset]
+        offset += -(-arr.nbytes // 64) * 64
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(GML_CACHE_MAGIC) + 8 + len(header_bytes)) // 64) * 64
+
+    def write(f):
+        f.write(GML_CACHE_MAGIC + len(header_bytes).to_bytes(8, "little") + header_bytes)
+        for name, arr in arrays.items():
+            f.seek(data_start + header["arrays"][name][2])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    write_sidecar(gml_cache_path(path), write, "load_gml")
+
+"""To write a sidecar cache next to an input file: to a temp file first and then moved into place, so a reader never sees half a cache.
+Where it went is printed, and a directory that can't be written to (read-only or shared) only costs the cache, the run carries on without it
+Input: The cache's path, a function writing the cache to a binary file and the name its messages start with
+Output: Whether the cache was written
+"""
+def write_sidecar(cache: str, write, name: str) -> bool:
+    try:
+        with open(cache + ".tmp", "wb") as f:
+            write(f)
+        os.replace(cache + ".tmp", cache)
+    except OSError as err:
+        with contextlib.suppress(OSError):
+            os.remove(cache + ".tmp")
+        print(f"{name}: could not write cache {cache}, carrying on without it: {err}")
+        return False
+    print(f"{name}: wrote cache {cache} (--no_cache to skip)")
+    return True
+
+"""To load a graph from its GML file's sidecar cache by memory mapping the arrays, if the cache is there and still matches the file.
+A cache whose size and mtime match is used as is, one where only the mtime changed is used if the content hash still matches
+Input: The GML file's path
+Output: The graph, or None when there is no valid cache
+"""
+def read_gml_cache(path: str):
+    cache = gml_cache_path(path)
+    try:
+        stat = os.stat(path)
+        with open(cache, "rb") as f:
+            if f.read(len(GML_CACHE_MAGIC)) != GML_CACHE_MAGIC:
+                return None
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len))
+    except (OSError, ValueError):
+        return None
+
+    if header["size"] != stat.st_size:
+        return None
+    if header["mtime_ns"] != stat.st_mtime_ns and header["hash"] != gml_file_hash(path):
+        return None
+
+    data_start = -(-(len(GML_CACHE_MAGIC) + 8 + header_len) // 64) * 64
+    arrays = {}
+    for name, (dtype, size, offset) in header["arrays"].items():
+        if size == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(cache, dtype=dtype, mode="r", offset=data_start + offset, shape=(size,))
+
+    labels = arrays["labels"].tobytes().decode("utf-8").split("\n") if arrays["labels"].size else []
+    columns = {}
+    for key, kind in header["columns"].items():
+        arr = arrays["col:" + key]
+        columns[key] = arr.tolist() if kind == "array" else json.loads(arr.tobytes())
+
+    # same graph the parse built: attributes in column order, edges added in their original order
+    Graph = nx.Graph()
+    Graph.graph.update(header["graph"])
+    keys = list(columns)
+    node_attrs = [
+        {key: value for key, value in zip(keys, values) if value is not None}
+        for values in zip(*columns.values())
+    ] if keys else [{} for _ in labels]
+    Graph.add_nodes_from(zip(labels, node_attrs))
+    src, dst = np.asarray(arrays["src"]), np.asarray(arrays["dst"])
+    Graph.add_edges_from(zip(map(labels.__getitem__, src.tolist()), map(labels.__getitem__, dst.tolist())))
+    set_graph_core(Graph, core_from_edges(labels, src, dst))
+    return Graph
 
 
-# GML Metadata Functions 
+
+
+# Graph Core Functions
 # ====================================================================================================
-"""For a given list of root nodes, return back the multi-source dictionaries for all node's shortest-path to a root node, which root node it was, and the parent of the node for that BFS path
+"""Compact array-backed copy of a graph's structure that the BFS, component and isolate routines run on.
+Nodes are int32 ids 0..n-1 where labels[i] is the node's label in G, and the neighbors of node i are indices[indptr[i]:indptr[i+1]].
+Neighbors are kept in the same order NetworkX reports them in, so traversals over the core visit nodes in the same order as traversals over G
+"""
+class GraphCore:
+    def __init__(self, labels: list, indptr, indices):
+        self.labels = labels
+        self.index = {label: i for i, label in enumerate(labels)}
+        self.indptr = indptr
+        self.indices = indices
+        self.n = len(labels)
+        self.structure = None
+        self.bfs = None
+        self.bfs_meta = None
+        self.columns = {}   # node attributes attached as NodeColumns, only turned into GML values when the graph is written
+
+        # a self loop only shows up once in its node's neighbor list, every other edge shows up twice
+        rows = np.repeat(np.arange(self.n, dtype=np.int32), np.diff(indptr))
+        self_loops = int(np.count_nonzero(rows == indices))
+        self.m = (len(indices) - self_loops) // 2 + self_loops
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbors(self, i: int):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def ids(self, labels) -> np.ndarray:
+        return np.array([self.index[str(label)] for label in labels], dtype=np.int32)
+
+
+# cores are cached per graph object so every stage of a run shares the one built after loading/generating
+_graph_cores = weakref.WeakKeyDictionary()
+
+"""To build the array-backed core of a graph and keep it with the graph for later stages
+Input: A graph
+Output: The graph's GraphCore
+"""
+def build_graph_core(G: nx.Graph) -> GraphCore:
+    labels = list(G.nodes())
+    index = {label: i for i, label in enumerate(labels)}
+    adj = G.adj
+
+    degrees = np.fromiter((len(adj[u]) for u in labels), dtype=np.int64, count=len(labels))
+    indptr = np.zeros(len(labels) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter((index[v] for u in labels for v in adj[u]), dtype=np.int32, count=int(indptr[-1]))
+
+    core = GraphCore(labels, indptr, indices)
+    set_graph_core(G, core)
+    return core
+
+"""To build a core straight from an edge list without going through a NetworkX graph
+Input: The node labels and two int arrays of edge endpoints, in the order the edges were added to the graph
+Output: A GraphCore whose neighbor lists are in the same order NetworkX would have them
+"""
+def core_from_edges(labels: list, src, dst) -> GraphCore:
+    n = len(labels)
+    src = np.asarray(src, dtype=np.int32)
+    dst = np.asarray(dst, dtype=np.int32)
+
+    # both directions of edge j sit next to each other, so a stable sort by node keeps every neighbor list in edge order.
+    # a self loop is only listed once
+    heads = np.column_stack((src, dst)).reshape(-1)
+    tails = np.column_stack((dst, src)).reshape(-1)
+    keep = np.ones(heads.size, dtype=bool)
+    keep[1::2] = src != dst
+    heads, tails = heads[keep], tails[keep]
+    order = np.argsort(heads, kind="stable")
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(heads, minlength=n), out=indptr[1:])
+    return GraphCore(labels, indptr, tails[order])
+
+"""To keep a core with the graph it belongs to
+"""
+def set_graph_core(G: nx.Graph, core: GraphCore):
+    _graph_cores[G] = core
+
+"""To forget a graph's core after its nodes or edges were changed, so the next graph_core builds it again (with its cached analysis and columns)
+"""
+def drop_graph_core(G: nx.Graph):
+    _graph_cores.pop(G, None)
+
+"""To get the core that belongs to a graph, building it the first time it is asked for. A core is only rebuilt after drop_graph_core,
+so every code path that changes a graph's nodes or edges has to drop its core (apply_edits and IncrementalAnalysis do)
+Input: A graph
+Output: The graph's GraphCore
+"""
+def graph_core(G: nx.Graph) -> GraphCore:
+    core = _graph_cores.get(G)
+    if core is None:
+        core = build_graph_core(G)
+    return core
+
+"""Lists every (node, neighbor) pair leaving a set of nodes, in the order of the nodes and then of each node's neighbor list
+Input: A GraphCore and an int array of node ids
+Output: Two int arrays of the same length, the node each pair starts at and the neighbor it reaches
+"""
+def frontier_pairs(core: GraphCore, frontier):
+    starts = core.indptr[frontier]
+    counts = core.indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    owner = np.repeat(frontier, counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, core.indices[np.repeat(starts, counts) + offsets]
+
+"""Level-synchronous BFS over the core from a list of root ids. Each step expands the whole frontier at once with NumPy instead of popping one node at a time.
+Ties between roots/parents that reach a node on the same level go to the one a FIFO queue would have reached it from first:
+the frontier is kept in discovery order, and a newly reached node keeps the first frontier node (in that order) that lists it as a neighbor
+Input: A GraphCore and a list of root ids (in the order they should be enqueued)
+Output: int arrays for each node's distance, parent and source root (all -1 when the node is never reached, parent is -1 for the roots)
+"""
+def core_bfs(core: GraphCore, root_ids):
+    dist = np.full(core.n, -1, dtype=np.int32)
+    parent = np.full(core.n, -1, dtype=np.int32)
+    source = np.full(core.n, -1, dtype=np.int32)
+
+    # duplicate roots only count the first time they are listed
+    root_ids = np.asarray(root_ids, dtype=np.int32)
+    _, first = np.unique(root_ids, return_index=True)
+    frontier = root_ids[np.sort(first)]
+    dist[frontier] = 0
+    source[frontier] = frontier
+
+    level = 0
+    while frontier.size:
+        # every (frontier node, neighbor) pair, in the order a queue would scan them
+        owner, nbrs = frontier_pairs(core, frontier)
+        if nbrs.size == 0:
+            break
+
+        # only keep unvisited neighbors, and for each one the first pair that reaches it
+        unvisited = dist[nbrs] == -1
+        nbrs, owner = nbrs[unvisited], owner[unvisited]
+        _, first = np.unique(nbrs, return_index=True)
+        first.sort()
+
+        frontier = nbrs[first]
+        level += 1
+        dist[frontier] = level
+        parent[frontier] = owner[first]
+        source[frontier] = source[owner[first]]
+
+    return dist, parent, source
+
+"""A vectorized union-find (FastSV style): every round hooks each edge's endpoint trees onto the smaller root with np.minimum.at and then halves the paths to the roots,
+so it takes O(log n) NumPy passes over the edges instead of a Python step per node
+Input: The number of nodes and two arrays of directed edges u -> v (an undirected edge has to be in both directions)
+Output: An intp array with the smallest node id of every node's component
+"""
+def component_roots(n: int, u, v):
+    f = np.arange(n, dtype=np.intp)
+
+    while True:
+        gf = f[f]
+        np.minimum.at(f, f[u], gf[v])   # hook u's tree under v's grandparent
+        np.minimum.at(f, u, gf[v])      # and u itself
+        np.minimum(f, gf, out=f)        # shortcut
+        if np.array_equal(f[f], gf):
+            break
+
+    while True:
+        root = f[f]
+        if np.array_equal(root, f):
+            return f
+        f = root
+
+"""Labels every node of the core with the id of its connected component, numbering components in the order their first node appears
+Input: A GraphCore
+Output: An int array where nodes in the same component have the same value
+"""
+def core_component_ids(core: GraphCore):
+    u = np.repeat(np.arange(core.n, dtype=np.intp), core.degree())
+    f = component_roots(core.n, u, core.indices.astype(np.intp))
+    # every node points at its component's smallest node, so ranking the roots numbers components by first node
+    _, comp = np.unique(f, return_inverse=True)
+    return comp.astype(np.int32)
+
+"""Everything --analyze reports about a graph's structure, worked out together from one union-find pass
+comp_id: component id per node, num_components, isolate: bool per node, has_cycle, density
+"""
+class StructureAnalysis:
+    def __init__(self, core: GraphCore, comp_id=None):
+        # the component ids can be handed in when they are already known (see IncrementalAnalysis)
+        self.comp_id = core_component_ids(core) if comp_id is None else comp_id
+        self.num_components = int(self.comp_id.max(initial=-1)) + 1
+        self.isolate = core.degree() == 0
+
+        # a forest has exactly one edge fewer than nodes per component (self loops count as edges, like nx.is_forest)
+        self.has_cycle = core.m > core.n - self.num_components
+
+        # same arithmetic as nx.density so the written value doesn't change
+        if core.m == 0 or core.n <= 1:
+            self.density = 0
+        else:
+            self.density = core.m / (core.n * (core.n - 1)) * 2
+
+"""To get the structure analysis of a core, worked out the first time it is asked for and kept with the core (which is rebuilt when the graph changes)
+Input: A GraphCore
+Output: Its StructureAnalysis
+"""
+def core_structure(core: GraphCore) -> StructureAnalysis:
+    if core.structure is None:
+        core.structure = StructureAnalysis(core)
+    return core.structure
+
+
+
+
+# GML Metadata Functions
+# ====================================================================================================
+"""A node attribute held as one typed array over the graph's core ids, instead of a Python value in every node's attribute dict. A negative value is "undefined".
+kind says how a value is written: "int" as the number, "float" as the number (never undefined), "label" as the label of the node with that core id, "bool" as "true"/"false"
+"""
+class NodeColumn:
+    def __init__(self, core: GraphCore, values, kind: str):
+        self.core = core
+        self.values = values
+        self.kind = kind
+
+    """To turn part of the column into the values the node attribute dicts used to hold
+    Input: The range of core ids
+    Output: A list with a value per node
+    """
+    def materialize(self, lo: int = 0, hi: int = None) -> list:
+        chunk = self.values[lo:hi].tolist()
+        if self.kind == "float":
+            return chunk
+        if self.kind == "bool":
+            return ["true" if v else "false" for v in chunk]
+        if self.kind == "label":
+            labels = self.core.labels
+            return [labels[v] if v >= 0 else "undefined" for v in chunk]
+        return [v if v >= 0 else "undefined" for v in chunk]
+
+    def __getitem__(self, label):
+        i = self.core.index[str(label)]
+        return self.materialize(i, i + 1)[0]
+
+"""To keep a typed array as one of the graph's node attributes (replacing any attribute of that name the nodes were loaded with when the graph is written)
+Input: A graph, the attribute's name, an array with a value per core id and its NodeColumn kind
+Output:
+"""
+def attach_node_column(G: nx.Graph, key: str, values, kind: str):
+    core = graph_core(G)
+    core.columns[key] = NodeColumn(core, values, kind)
+
+"""To look up an attached node attribute without expanding it into the node attribute dicts
+Input: A graph and the attribute's name
+Output: Its NodeColumn (.values is the typed array over the core ids, column[label] one node's value), or None if it wasn't attached
+"""
+def node_column(G: nx.Graph, key: str):
+    return graph_core(G).columns.get(key)
+
+"""To write the attached node columns into the node attribute dicts, for nx.write_gml, which only reads those
+"""
+def materialize_node_columns(G: nx.Graph):
+    core = graph_core(G)
+    for key, column in core.columns.items():
+        for v, value in zip(core.labels, column.materialize()):
+            G.nodes[v][key] = value
+
+"""For a given list of root nodes, return back the multi-source arrays for all node's shortest-path to a root node, which root node it was, and the parent of the node for that BFS path
+If a node is equally close to several roots, the root listed first (and the parent reached first from it) is kept, like a FIFO queue seeded with the roots in order (core_bfs).
+It is one multi-source core_bfs over the graph whatever the number of roots, the per-root rows of the BFS cache are only for per-root queries (multi_BFS and the plots)
 Input: A graph and a list of root node ids
-Output: Based on the shortest BFS path in the list of root nodes, dictionaries for all node's shortest-path to a root node, which root node it was, and the parent of the node for that BFS path
+Output: Based on the shortest BFS path in the list of root nodes, int arrays over the graph's core ids for all node's shortest-path to a root node, which root node it was, and the parent of the node for that BFS path (-1 is undefined)
 """
 def compute_bfs_meta(G: nx.Graph, roots):
     # checks all the roots to make sure they are in g and also that they are stings
     roots = [str(r) for r in (roots or []) if str(r) in G]
 
-    dist, parent, source = {}, {}, {}
-    q = deque()
-
-    # initializes the queues
-    for r in roots:
-        dist[r] = 0
-        parent[r] = None
-        source[r] = r
-        q.append(r)
-
-    # BFS
-    while q:
-        u = q.popleft()
-        for v in G.neighbors(u):            # loop pretty much runs bfs again but this time keeps track of distance parent and source for all nodes
-            if v not in dist:           
-                dist[v]   = dist[u] + 1
-                parent[v] = u
-                source[v] = source[u]
-                q.append(v)
-
-    return dist, parent, source
+    core = graph_core(G)
+    # an IncrementalAnalysis leaves the metadata it kept up to date with the core
+    if core.bfs_meta is not None and core.bfs_meta[0] == tuple(roots):
+        return core.bfs_meta[1:]
+    return core_bfs(core, core.ids(roots))
 
-"""To take the dictionaries of multi-source BFS from compute_bfs_meta, and add the data as attributes to the nodes in the graph.
-    If the node isn't connected to any listed BFS, the attributes are undefined
-Input: A graph and dictionaries for a previously defined list of root nodes the current node's shortest distance, the root node in that distance, and it's parent in that path
+"""To take the arrays of multi-source BFS from compute_bfs_meta, and add the data as attributes to the nodes in the graph.
+    The arrays are kept as node columns (attach_node_column) and only written out as attributes by save_gml. If the node isn't connected to any listed BFS, the attributes are undefined
+Input: A graph and int arrays (over the graph's core ids) for a previously defined list of root nodes the current node's shortest distance, the root node in that distance, and it's parent in that path
 Output: 
 """
 def attach_bfs_meta(G: nx.Graph, dist, parent, source):
-    for v in G.nodes():
-        if v in dist:
-            G.nodes[v]["dist"] = int(dist[v])
-            G.nodes[v]["source"] = str(source[v])
-            G.nodes[v]["parent"] = str(parent[v]) if parent[v] is not None else "undefined"
-        else:
-            G.nodes[v]["dist"] = "undefined"
-            G.nodes[v]["source"] = "undefined"
-            G.nodes[v]["parent"] = "undefined"
+    attach_node_column(G, "dist", np.asarray(dist, dtype=np.int32), "int")
+    attach_node_column(G, "source", np.asarray(source, dtype=np.int32), "label")
+    attach_node_column(G, "parent", np.asarray(parent, dtype=np.int32), "label")
 
 """ To create a dictionary where all the nodes in a subgraph of connected_components have the same value
 Input: A graph
 Output: A dictionary that groups nodes that are connected to each other with the same value
 """
 def compute_component_ids(G: nx.Graph) -> dict:
-    comp_id = {}
-    for i, comp in enumerate(nx.connected_components(G)):
-        for v in comp:
-            comp_id[v] = i
-    return comp_id
-
-"""Save the information found in compute_component_ids as one of the node's attribute
-Input: A graph and a dictionary where all the nodes connected to each other have the same value
+    return dict(zip(graph_core(G).labels, analyze_structure(G).comp_id.tolist()))
+
+"""Save the component ids from analyze_structure as one of the node's attribute
+Input: A graph and an int array over the graph's core ids where all the nodes connected to each other have the same value
 Output: 
 """
-def attach_component_ids(G: nx.Graph, comp_id: dict):
-    for v, cid in comp_id.items():
-        G.nodes[v]["componentID"] = int(cid)
+def attach_component_ids(G: nx.Graph, comp_id):
+    attach_node_column(G, "componentID", np.asarray(comp_id, dtype=np.int32), "int")
 
 """ Returns a list of isolated nodes
 Input: A graph
 Output: A list of isolated nodes' ids
 """
 def compute_isolates(G: nx.Graph) -> list:
-    return list(nx.isolates(G))
+    labels = graph_core(G).labels
+    return [labels[v] for v in np.flatnonzero(analyze_structure(G).isolate).tolist()]
 
 """Add an attribute where if a node is isolated, it is true, and false if not.
-Input: A graph and a list of the isolated nodes in that graph
+Input: A graph and a bool array over the graph's core ids that is true for the isolated nodes
 Output: 
 """
-def attach_isolate_attr(G: nx.Graph, isolates: list):
-    for v in G.nodes():
-        if v in isolates:
-            G.nodes[v]["isolate"] = "true"
-        else:
-            G.nodes[v]["isolate"] = "false"
+def attach_isolate_attr(G: nx.Graph, isolate):
+    attach_node_column(G, "isolate", np.asarray(isolate, dtype=bool), "bool")
 
-"""The following 4 functions are to add the meta data, specifically the number of components, whether the graph is a cycle, the graph density, and if a bfs is calculated previously, what the shortest distance is
+"""Save the triangle counts and local clustering coefficients from analyze_clustering as node attributes, and the number of triangles, average clustering and transitivity as graph attributes
+Input: A graph and its TriangleResult
+Output: 
+"""
+def attach_clustering_meta(G: nx.Graph, tri):
+    attach_node_column(G, "triangles", np.asarray(tri.triangles, dtype=np.int64), "int")
+    attach_node_column(G, "clustering", np.asarray(tri.clustering, dtype=np.float64), "float")
+    G.graph["num_triangles"] = tri.num_triangles
+    G.graph["avg_clustering"] = tri.avg_clustering
+    G.graph["transitivity"] = tri.transitivity
+
+"""The following 5 functions are to add the meta data, specifically the number of components, whether the graph is a cycle, the graph density, if a bfs is calculated previously, what the shortest distance is,
+and the diameter and radius (of each component when the graph isn't connected) with how many BFS runs finding them took
 """
 def attach_components_meta(G, num_comps):
     G.graph["num_components"] = num_comps
@@ -157,35 +945,805 @@ def attach_cycles_meta(G, is_cycle):
 def attach_density_meta(G, density):
     G.graph["density"] = density
 
-def attach_avg_shortest_path_meta(G, avg_len):
-    G.graph["avg_shortest_path"] = avg_len if avg_len is not None else "undefined"
+def attach_avg_shortest_path_meta(G, avg_path):
+    G.graph["avg_shortest_path"] = avg_path.avg_len if avg_path.avg_len is not None else "undefined"
+    if avg_path.samples is not None:
+        G.graph["avg_shortest_path_samples"] = avg_path.samples
+        if avg_path.ci is not None:
+            G.graph["avg_shortest_path_ci_low"], G.graph["avg_shortest_path_ci_high"] = avg_path.ci
+    if avg_path.per_component is not None:
+        G.graph["avg_shortest_path_per_component"] = avg_path.per_component
+
+def attach_diameter_meta(G, ecc):
+    connected = len(ecc.diameter) == 1
+    G.graph["diameter"] = int(ecc.diameter[0]) if connected else "undefined"
+    G.graph["radius"] = int(ecc.radius[0]) if connected else "undefined"
+    if len(ecc.diameter) > 1:
+        G.graph["diameter_per_component"] = ecc.diameter.tolist()
+        G.graph["radius_per_component"] = ecc.radius.tolist()
+    G.graph["eccentricity_bfs_runs"] = ecc.bfs_runs
             
             
             
 # BFS Functions
 # ====================================================================================================
-"""To list the BFS starting at one of the list of root_nodes given
+# roots share one sweep of the graph in groups of this size, one bit of a uint64 word per root
+BFS_WORD_BITS = 64
+# root bits of (node, neighbor) pairs that are unpacked or compared at a time
+BFS_PAIR_CHUNK = 1 << 20
+# memory the per-root BFS results kept by a BFSCache may use before the least recently used roots are dropped
+BFS_CACHE_BYTES = 1 << 28
+
+"""Per-root distances and parents from multi_BFS. Row i belongs to roots[i] and is read from the core's BFS cache when asked for (row), so the rows of many roots
+are never all held at once, and paths are only rebuilt from the parents when asked for
+"""
+class MultiBFSResult:
+    def __init__(self, core: GraphCore, roots: list):
+        self.core = core
+        self.roots = roots
+
+    def __len__(self):
+        return len(self.roots)
+
+    """To get a root's BFS arrays
+    Input: The row of the root
+    Output: int arrays over the core ids of its distance and parent (-1 is undefined)
+    """
+    def row(self, i: int):
+        return core_bfs_cache(self.core).row(self.core.index[self.roots[i]])
+
+    """To go over every root's BFS arrays in root order, sweeping the roots the cache dropped BFS_WORD_BITS at a time again
+    Output: (root, distance, parent) for each root
+    """
+    def rows(self):
+        for root, (dist, parent) in zip(self.roots, core_bfs_cache(self.core).lookup(self.core.ids(self.roots))):
+            yield root, dist, parent
+
+    """To rebuild the BFS path from roots[i] to a node
+    Input: The row of the root and the node's label
+    Output: A list of node labels from the root to the node, or None if the root doesn't reach it
+    """
+    def path(self, i: int, node) -> list:
+        v = self.core.index[str(node)]
+        dist, parent = self.row(i)
+        if dist[v] < 0:
+            return None
+        path = [v]
+        while parent[v] >= 0:
+            v = int(parent[v])
+            path.append(v)
+        return [self.core.labels[u] for u in reversed(path)]
+
+"""Bit-parallel BFS from up to BFS_WORD_BITS roots at once: every node holds a uint64 word with one bit per root, for the roots that have seen it and the roots whose frontier it is in,
+so one sweep level by level pushes all the roots' frontiers forward together
+A node's parent for a root is the one a FIFO queue from that root alone would have reached it from (the same tree as core_bfs from that root and nx.bfs_tree): every
+(root, frontier node) keeps its position in that root's queue (one more int32 per root and node, like dist), the pair whose owner comes first claims the node,
+and the nodes it reaches are queued in its neighbor list order
+Input: A GraphCore and an array of at most BFS_WORD_BITS root ids
+Output: (number of roots x n) int arrays of distance and parent for each root (-1 is undefined)
+"""
+def core_multi_root_bfs(core: GraphCore, root_ids):
+    num_roots = len(root_ids)
+    dist = np.full((num_roots, core.n), -1, dtype=np.int32)
+    flat_dist = dist.reshape(-1)
+
+    parent = np.full((num_roots, core.n), -1, dtype=np.int32)
+    flat_parent = parent.reshape(-1)
+
+    seen = np.zeros(core.n, dtype=np.uint64)
+    for b, r in enumerate(root_ids):
+        seen[r] |= np.uint64(1 << b)
+        dist[b, r] = 0
+
+    # each root's queue position of every node it has reached (only the frontier's are looked at again), by root * n + node
+    queue_pos = np.zeros(num_roots * core.n, dtype=np.int32)
+    # only the bytes of a word that hold root bits are read
+    word_bytes = -(-num_roots // 8)
+
+    # the frontier is kept sparse (its ids in order and their words), so no step of a level is proportional to n
+    level = 0
+    frontier = np.unique(np.asarray(root_ids, dtype=np.intp))
+    words = seen[frontier]
+    while frontier.size:
+        counts = core.indptr[frontier + 1] - core.indptr[frontier]
+        owner, nbrs = frontier_pairs(core, frontier)
+
+        # the roots each pair carries to a neighbor that hasn't seen them yet
+        bits = np.repeat(words, counts) & ~seen[nbrs]
+        carries = np.flatnonzero(bits)
+        if carries.size == 0:
+            break
+
+        # group the pairs by neighbor, keeping each one's owner and its place in queue order (owner, then its neighbor list)
+        order = carries[np.argsort(nbrs[carries])].astype(np.int32)
+        owner, nbrs, bits = owner[order].astype(np.int32), nbrs[order], bits[order]
+        group_starts = np.flatnonzero(np.r_[True, nbrs[1:] != nbrs[:-1]])
+        level += 1
+
+        # one (root, pair) for every root bit a pair carries, about BFS_PAIR_CHUNK of them at a time so the arrays per chunk stay small (and in cache).
+        # chunks end where a neighbor's pairs start, so each (root, node) is settled inside one chunk
+        step = max(1, BFS_PAIR_CHUNK // num_roots)
+        bounds = np.unique(np.r_[group_starts[np.searchsorted(group_starts, np.arange(step, nbrs.size, step))], nbrs.size])
+        claims, claim_pos, claim_rank = [], [], []
+        lo = 0
+        for hi in bounds.tolist():
+            # read root by root from each root's byte of the words, so each root's pairs stay in neighbor order and its (root, node) keys come out sorted
+            columns = np.ascontiguousarray(bits[lo:hi].astype("<u8", copy=False).view(np.uint8).reshape(-1, 8)[:, :word_bytes].T)
+            pairs = [np.flatnonzero(columns[r >> 3] & np.uint8(1 << (r & 7))) for r in range(num_roots)]
+            b = np.repeat(np.arange(num_roots, dtype=np.int64), [p.size for p in pairs])
+            pair = np.concatenate(pairs) + lo
+            lo = hi
+
+            # the pair whose owner has the smallest position in the root's queue claims its (root, node)
+            key = b * core.n + nbrs[pair]
+            pos = queue_pos[b * core.n + owner[pair]]
+            starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+            firsts = pos == np.repeat(np.minimum.reduceat(pos, starts), np.diff(np.r_[starts, key.size]))
+            key, pair = key[firsts], pair[firsts]
+
+            flat_dist[key] = level
+            flat_parent[key] = owner[pair]
+            claims.append(key)
+            claim_pos.append(pos[firsts])
+            claim_rank.append(order[pair])
+        key, pos, rank = np.concatenate(claims), np.concatenate(claim_pos).astype(np.int64), np.concatenate(claim_rank).astype(np.int64)
+        del claims, claim_pos, claim_rank
+
+        # the new nodes are queued by their parent's position, then by their place in its neighbor list
+        root = key // core.n
+        num_pairs = int(counts.sum())
+        if BFS_WORD_BITS * frontier.size * num_pairs < 1 << 62:
+            queue = np.argsort((root * frontier.size + pos) * num_pairs + rank)
+        else:
+            queue = np.lexsort((rank, pos, root))
+        queued = root[queue]
+        queue_pos[key[queue]] = np.arange(key.size) - np.searchsorted(queued, queued)
+        # the claims are as big as the next frontier's pairs can be, so they aren't kept while those are made
+        del key, pos, rank, root, queue, queued
+
+        # OR each neighbor's bits into the next frontier
+        frontier = nbrs[group_starts].astype(np.intp)
+        words = np.bitwise_or.reduceat(bits, group_starts)
+        seen[frontier] |= words
+
+    return dist, parent
+
+"""How many of the BFS_WORD_BITS bits are set across a set of uint64 words, bit by bit
+Input: A uint64 array
+Output: An int64 array of BFS_WORD_BITS counts
+"""
+def bit_counts(words):
+    counts = np.zeros(BFS_WORD_BITS, dtype=np.int64)
+    for lo in range(0, words.size, BFS_PAIR_CHUNK):
+        chunk = words[lo:lo + BFS_PAIR_CHUNK].astype("<u8", copy=False).view(np.uint8)
+        counts += np.unpackbits(chunk, bitorder="little").reshape(-1, BFS_WORD_BITS).sum(axis=0, dtype=np.int64)
+    return counts
+
+"""Bit-parallel BFS from up to BFS_WORD_BITS distinct roots that only keeps the current level: bit b of a node's word is set at the level root_ids[b] first reaches it,
+so nothing per (root, node) is ever stored
+Input: A GraphCore and an array of at most BFS_WORD_BITS distinct root ids
+Output: Yields (level, the node ids first reached by some root at that level, their uint64 words of the roots that reached them), starting with the roots at level 0
+"""
+def bit_bfs_levels(core: GraphCore, root_ids):
+    num_roots = len(root_ids)
+    frontier = np.asarray(root_ids, dtype=np.intp)
+    words = np.left_shift(np.uint64(1), np.arange(num_roots, dtype=np.uint64))
+    seen = np.zeros(core.n, dtype=np.uint64)
+    seen[frontier] = words
+
+    # like core_multi_root_bfs, the frontier is only its ids and words, and the next one comes from grouping the pairs by neighbor
+    level = 0
+    while frontier.size:
+        yield level, frontier, words
+        owner, nbrs = frontier_pairs(core, frontier)
+        bits = np.repeat(words, core.indptr[frontier + 1] - core.indptr[frontier]) & ~seen[nbrs]
+        carries = bits != 0
+        nbrs, bits = nbrs[carries], bits[carries]
+        order = np.argsort(nbrs)
+        nbrs, bits = nbrs[order], bits[order]
+        group_starts = np.flatnonzero(np.r_[True, nbrs[1:] != nbrs[:-1]]) if nbrs.size else nbrs
+        frontier = nbrs[group_starts].astype(np.intp)
+        words = np.bitwise_or.reduceat(bits, group_starts) if nbrs.size else bits
+        seen[frontier] |= words
+        level += 1
+
+"""Bit-parallel BFS (bit_bfs_levels) that only keeps what average path lengths need: how far away each root's reachable nodes are in total, and how many there are.
+Each level just counts the newly set bits
+Input: A GraphCore and an array of at most BFS_WORD_BITS distinct root ids
+Output: int64 arrays with each root's sum of distances to the nodes it reaches and the number of nodes it reaches (counting itself)
+"""
+def core_distance_sums(core: GraphCore, root_ids):
+    num_roots = len(root_ids)
+    sums = np.zeros(num_roots, dtype=np.int64)
+    reached = np.zeros(num_roots, dtype=np.int64)
+    for level, _, words in bit_bfs_levels(core, root_ids):
+        counts = bit_counts(words)[:num_roots]
+        sums += level * counts
+        reached += counts
+    return sums, reached
+
+"""Two bit-parallel sweeps (bit_bfs_levels) from up to BFS_WORD_BITS distinct roots for eccentricity bounds: the first finds each root's eccentricity (the last level its bit
+reaches anything at), the second tightens every reached node's bounds in place with max(ecc(r) - d, d) <= ecc(w) <= ecc(r) + d, a level and a group of roots with the same
+eccentricity at a time
+Input: A GraphCore, an array of at most BFS_WORD_BITS distinct root ids and the int32 lower and upper bound arrays
+Output: The roots' eccentricities
+"""
+def core_eccentricity_sweep(core: GraphCore, root_ids, lower, upper):
+    num_roots = len(root_ids)
+    ecc = np.zeros(num_roots, dtype=np.int32)
+    for level, _, words in bit_bfs_levels(core, root_ids):
+        any_bits = np.array([np.bitwise_or.reduce(words)], dtype="<u8").view(np.uint8)
+        ecc[np.unpackbits(any_bits, bitorder="little")[:num_roots].astype(bool)] = level
+
+    shifts = np.left_shift(np.uint64(1), np.arange(num_roots, dtype=np.uint64))
+    masks = [(int(e), np.bitwise_or.reduce(shifts[ecc == e])) for e in np.unique(ecc)]
+    for level, frontier, words in bit_bfs_levels(core, root_ids):
+        for e, mask in masks:
+            nodes = frontier[(words & mask) != 0]
+            lower[nodes] = np.maximum(lower[nodes], max(e - level, level))
+            upper[nodes] = np.minimum(upper[nodes], e + level)
+    return ecc
+
+
+# the core a worker process reads from shared memory, set up once per worker by init_shared_core_worker
+_worker_core = None
+
+"""To put a core's neighbor arrays in shared memory so worker processes can use them without a copy each
+Input: A GraphCore
+Output: The SharedMemory blocks (the caller closes and unlinks them) and the spec a worker needs to attach to them
+"""
+def share_core(core: GraphCore):
+    blocks, spec = [], [core.n]
+    for arr in (core.indptr, core.indices):
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+        blocks.append(block)
+        spec.append((block.name, arr.dtype.str, arr.size))
+    return blocks, spec
+
+"""Process pool initializer: attaches to the shared neighbor arrays from share_core and builds the worker's core over them
+"""
+def init_shared_core_worker(spec):
+    global _worker_core, _worker_blocks
+    n, arrays, _worker_blocks = spec[0], [], []
+    for name, dtype, size in spec[1:]:
+        # workers share the parent's resource tracker, which the parent's unlink clears, so attaching here needs no cleanup of its own
+        block = shared_memory.SharedMemory(name=name)
+        _worker_blocks.append(block)
+        arrays.append(np.ndarray((size,), dtype=dtype, buffer=block.buf))
+    _worker_core = GraphCore(list(range(n)), arrays[0], arrays[1])
+
+"""Pool task: core_distance_sums on the worker's shared core
+"""
+def shared_distance_sums(root_ids):
+    return core_distance_sums(_worker_core, root_ids)
+
+"""To get the distance sums for any number of sources, BFS_WORD_BITS per bit-parallel sweep, with the sweeps sharded across a process pool when workers > 1
+Input: A GraphCore, an array of distinct source ids and the number of worker processes
+Output: int64 arrays with each source's sum of distances and number of nodes reached
+"""
+def distance_sums(core: GraphCore, source_ids, workers: int = 1):
+    batches = [source_ids[lo:lo + BFS_WORD_BITS] for lo in range(0, len(source_ids), BFS_WORD_BITS)]
+    if workers <= 1 or len(batches) <= 1:
+        results = [core_distance_sums(core, batch) for batch in batches]
+    else:
+        blocks, spec = share_core(core)
+        try:
+            with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_shared_core_worker, initargs=(spec,)) as pool:
+                results = list(pool.map(shared_distance_sums, batches))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    if not results:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+"""Per-core cache of single-root BFS results (each root's distance and parent arrays, as core_multi_root_bfs works them out), so multi_BFS
+and the plots traverse the graph from each root only once per run (compute_bfs_meta runs one multi-source core_bfs of its own instead). The least recently used roots are dropped
+once the arrays take more than max_bytes, and lookup hands rows out one root at a time, so past the kept rows only one sweep's worth (BFS_WORD_BITS roots) is in memory
+"""
+class BFSCache:
+    def __init__(self, core: GraphCore, max_bytes: int = BFS_CACHE_BYTES):
+        self.core = core
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()     # root id -> (dist, parent), least recently used first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    """To get the BFS results of a list of roots one root at a time, running the bit-parallel BFS only for the roots that aren't cached: the roots are taken
+    BFS_WORD_BITS at a time, and the missing ones of each group share one sweep
+    Input: A list of root ids
+    Output: A generator of (distance, parent) int arrays over the core ids for each root in the order given (-1 is undefined)
+    """
+    def lookup(self, root_ids):
+        root_ids = [int(r) for r in root_ids]
+        for lo in range(0, len(root_ids), BFS_WORD_BITS):
+            group = root_ids[lo:lo + BFS_WORD_BITS]
+            found = {}
+            for r in group:
+                if r in self.entries and r not in found:
+                    self.entries.move_to_end(r)
+                    found[r] = self.entries[r]
+                    self.hits += 1
+            missing = list(dict.fromkeys(r for r in group if r not in found))
+            self.misses += len(missing)
+            if missing:
+                dist, parent = core_multi_root_bfs(self.core, np.array(missing, dtype=np.int32))
+                for i, r in enumerate(missing):
+                    found[r] = (dist[i].copy(), parent[i].copy())
+                    self.store(r, found[r])
+                del dist, parent
+            for r in group:
+                yield found[r]
+
+    """To get one root's BFS results
+    Input: A root id
+    Output: Its distance and parent int arrays over the core ids (-1 is undefined)
+    """
+    def row(self, root_id: int):
+        return next(self.lookup([root_id]))
+
+    def store(self, root_id: int, result):
+        size = result[0].nbytes + result[1].nbytes
+        if size > self.max_bytes:
+            return
+        self.entries[root_id] = result
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (dist, parent) = self.entries.popitem(last=False)
+            self.nbytes -= dist.nbytes + parent.nbytes
+
+"""To get a core's BFS cache, made the first time it is asked for and kept with the core (which is rebuilt when the graph changes)
+Input: A GraphCore
+Output: Its BFSCache
+"""
+def core_bfs_cache(core: GraphCore) -> BFSCache:
+    if core.bfs is None:
+        core.bfs = BFSCache(core)
+    return core.bfs
+
+"""To run a BFS starting at each of the list of root_nodes given, sweeping the graph once for every BFS_WORD_BITS roots (roots already traversed this run come from the BFS cache)
 Input: A graph and a list of root nodes
-Output: A ragged array of BFS where the row corresponds to the root node list order
+Output: A MultiBFSResult whose rows (distance and parent arrays over the graph's core ids) correspond to the root node list order
 """
 def multi_BFS(G, start_nodes: list[str]):
-    all_BFS = []
-    for indv_node in start_nodes:
-        indv_BFS = nx.single_source_shortest_path(G, indv_node)
-        all_BFS.append(indv_BFS)
-    return all_BFS
+    core = graph_core(G)
+    for _ in core_bfs_cache(core).lookup(core.ids(start_nodes)):
+        pass
+    return MultiBFSResult(core, [str(r) for r in start_nodes])
+
+
+
+
+# Incremental Analysis Functions
+# ====================================================================================================
+# the analysis of an --input file is kept next to it in this sidecar, so later runs with --edits can start from it
+ANALYSIS_CACHE_SUFFIX = ".analysis.npz"
+# written into the analysis cache's key, so caches from a version with other BFS metadata rules are worked out again
+ANALYSIS_CACHE_VERSION = 2
+EDIT_OPS = {"add_node": 1, "remove_node": 1, "add_edge": 2, "remove_edge": 2}
+
+"""To read an edits file: one edit per line, "add_node u", "remove_node u", "add_edge u v" or "remove_edge u v" (node ids are ints like in the GML files).
+Blank lines and anything after a # are ignored
+Input: The edits file's path
+Output: A list of (operation, node ids) tuples
+"""
+def read_edits(path: str) -> list:
+    edits = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            words = line.split("#", 1)[0].split()
+            if not words:
+                continue
+            op, nodes = words[0], words[1:]
+            if op not in EDIT_OPS:
+                raise ValueError(f"line {line_no}: unknown edit {op!r} (must be one of {', '.join(EDIT_OPS)})")
+            if len(nodes) != EDIT_OPS[op]:
+                raise ValueError(f"line {line_no}: {op} takes {EDIT_OPS[op]} node id(s)")
+            for node in nodes:
+                if not node.isdigit():
+                    raise ValueError(f"line {line_no}: node id {node} is not appropriate. Must be an int.")
+            edits.append((op, tuple(str(int(node)) for node in nodes)))
+    return edits
+
+"""To apply edits to a graph directly, when no analysis has to be kept up to date
+Input: A graph and a list of edits from read_edits
+Output:
+"""
+def apply_edits(G: nx.Graph, edits: list):
+    drop_graph_core(G)
+    for op, nodes in edits:
+        check_edit(G, op, nodes)
+        if op == "add_node":
+            G.add_node(nodes[0])
+        elif op == "remove_node":
+            G.remove_node(nodes[0])
+        elif op == "add_edge":
+            G.add_edge(*nodes)
+        else:
+            G.remove_edge(*nodes)
+    build_graph_core(G)
+
+"""To check an edit can be applied (removals need the node or edge to be there, adding something that is already there does nothing, like in NetworkX)
+Input: A graph, and an edit's operation and node ids
+Output:
+"""
+def check_edit(G: nx.Graph, op: str, nodes: tuple):
+    if op == "remove_node" and nodes[0] not in G:
+        raise ValueError(f"remove_node {nodes[0]}: the node is not in the graph")
+    if op == "remove_edge" and not G.has_edge(*nodes):
+        raise ValueError(f"remove_edge {nodes[0]} {nodes[1]}: the edge is not in the graph")
+
+"""Keeps the --analyze results (components, isolates, cycle status, density and the multi-source BFS metadata) of a graph up to date while edits are applied to it,
+so only the part of the analysis an edit touches is worked out again:
+- components are a union-find that relabels the smaller side on an insertion, and a removal searches from both endpoints at once,
+  stopping as soon as they meet (still connected) or one side runs out (that side is split off and relabeled)
+- a removal (or insertion) only repairs the BFS distances of the nodes that lose (or gain) their shortest paths, and then a node's source and parent
+  are worked out again, nearest to the roots first, only where its neighbors one level closer changed
+- isolates, the cycle status and density only need the node and edge counts, and are worked out by StructureAnalysis when the analysis is finished
+Node ids are the graph's core ids, a new node gets the next id and a removed one is only dropped (keeping the order of the rest) by finish
+"""
+class IncrementalAnalysis:
+    def __init__(self, G: nx.Graph, roots: list, comp_id, dist, parent, source):
+        core = graph_core(G)
+        self.G = G
+        self.labels = list(core.labels)
+        self.index = dict(core.index)
+        self.alive = [True] * core.n
+        self.roots = [str(r) for r in roots]
+
+        self.comp = comp_id.tolist()
+        self.sizes = collections.Counter(self.comp)
+        self.next_comp = len(self.sizes)
+
+        # a node's source is kept as the position of its root in the listed roots, which is what ties are settled by
+        self.root_rank = {}
+        for i, r in enumerate(self.roots):
+            self.root_rank.setdefault(r, i)
+        rank_of_id = {self.index[r]: i for r, i in self.root_rank.items() if r in self.index}
+        self.dist = dist.tolist()
+        self.parent = parent.tolist()
+        self.src = [rank_of_id[s] if s >= 0 else -1 for s in source.tolist()]
+
+    def nbrs(self, x: int) -> list:
+        index = self.index
+        return [index[label] for label in self.G.adj[self.labels[x]]]
+
+    """To apply one edit from read_edits and update the analysis for it
+    """
+    def apply(self, op: str, nodes: tuple):
+        check_edit(self.G, op, nodes)
+        if op == "add_node":
+            self.add_node(nodes[0])
+        elif op == "remove_node":
+            self.remove_node(nodes[0])
+        elif op == "add_edge":
+            self.add_edge(*nodes)
+        else:
+            self.remove_edge(*nodes)
+
+    def add_node(self, label: str):
+        if label in self.G:
+            return
+        self.G.add_node(label)
+        drop_graph_core(self.G)
+        x = len(self.labels)
+        self.labels.append(label)
+        self.index[label] = x
+        self.alive.append(True)
+        self.comp.append(self.next_comp)
+        self.sizes[self.next_comp] = 1
+        self.next_comp += 1
+        if label in self.root_rank:
+            self.dist.append(0)
+            self.src.append(self.root_rank[label])
+        else:
+            self.dist.append(-1)
+            self.src.append(-1)
+        self.parent.append(-1)
+
+    def remove_node(self, label: str):
+        # taking the node's edges away first repairs everything that went through it, after that it is on its own
+        for other in list(self.G.adj[label]):
+            self.remove_edge(label, other)
+        x = self.index.pop(label)
+        self.G.remove_node(label)
+        drop_graph_core(self.G)
+        self.alive[x] = False
+        self.sizes[self.comp[x]] -= 1
+        if self.sizes[self.comp[x]] == 0:
+            del self.sizes[self.comp[x]]
+        self.dist[x] = self.src[x] = self.parent[x] = -1
+
+    def add_edge(self, u_label: str, v_label: str):
+        self.add_node(u_label)
+        self.add_node(v_label)
+        if self.G.has_edge(u_label, v_label):
+            return
+        self.G.add_edge(u_label, v_label)
+        drop_graph_core(self.G)
+        u, v = self.index[u_label], self.index[v_label]
+        self.union(u, v)
+        self.insert_repair(u, v)
+
+    def remove_edge(self, u_label: str, v_label: str):
+        self.G.remove_edge(u_label, v_label)
+        drop_graph_core(self.G)
+        u, v = self.index[u_label], self.index[v_label]
+        if u != v:
+            self.split(u, v)
+        self.delete_repair(u, v)
+
+    """Union-find insertion: joins the components of u and v by relabeling the smaller one
+    """
+    def union(self, u: int, v: int):
+        cu, cv = self.comp[u], self.comp[v]
+        if cu == cv:
+            return
+        if self.sizes[cu] < self.sizes[cv]:
+            u, cu, cv = v, cv, cu
+        # relabel v's (smaller) side, found by a search that stays inside its old component
+        comp = self.comp
+        comp[v] = cu
+        stack = [v]
+        while stack:
+            x = stack.pop()
+            for y in self.nbrs(x):
+                if comp[y] == cv:
+                    comp[y] = cu
+                    stack.append(y)
+        self.sizes[cu] += self.sizes.pop(cv)
+
+    """After removing edge (u, v): searches from u and v in turns until the searches meet (still one component) or one of them runs out,
+    in which case the nodes it found are split off into a new component. The work is bounded by twice the size of the smaller side
+    """
+    def split(self, u: int, v: int):
+        seen = ({u}, {v})
+        queues = (collections.deque([u]), collections.deque([v]))
+        side = 0
+        while queues[0] and queues[1]:
+            x = queues[side].popleft()
+            for y in self.nbrs(x):
+                if y in seen[1 - side]:
+                    return
+                if y not in seen[side]:
+                    seen[side].add(y)
+                    queues[side].append(y)
+            side = 1 - side
+        cut = seen[0] if not queues[0] else seen[1]
+        old = self.comp[next(iter(cut))]
+        for x in cut:
+            self.comp[x] = self.next_comp
+        self.sizes[old] -= len(cut)
+        self.sizes[self.next_comp] = len(cut)
+        self.next_comp += 1
+
+    def supports(self, x: int) -> list:
+        d = self.dist[x] - 1
+        return [w for w in self.nbrs(x) if self.dist[w] == d] if d >= 0 else []
+
+    """Whether node a comes before node b (two different nodes on the same level) in the order the FIFO queue of compute_bfs_meta reaches them:
+    nodes reached from earlier nodes come first, and the roots in listed order. Both are followed up their parents until they have the same parent,
+    which reached them in the order of its current neighbor list (or until they are roots)
+    """
+    def precedes(self, a: int, b: int) -> bool:
+        parent = self.parent
+        while self.dist[a] > 0 and parent[a] != parent[b]:
+            a, b = parent[a], parent[b]
+        if self.dist[a] == 0:
+            return self.src[a] < self.src[b]
+        index = self.index
+        for label in self.G.adj[self.labels[parent[a]]]:
+            y = index[label]
+            if y == a or y == b:
+                return y == a
+        return False
+
+    """To work out a node's source and parent again from its neighbors one level closer to the roots: its parent is the one of them the FIFO queue reaches first (precedes),
+    and its source is that parent's (the same as compute_bfs_meta gives)
+    Output: Whether the node's parent or source changed
+    """
+    def settle(self, x: int) -> bool:
+        if self.dist[x] == 0:
+            return False
+        if self.dist[x] < 0:
+            changed = self.src[x] != -1
+            self.src[x] = self.parent[x] = -1
+            return changed
+        sup = self.supports(x)
+        best = sup[0]
+        for w in sup[1:]:
+            if self.precedes(w, best):
+                best = w
+        changed = best != self.parent[x] or self.src[best] != self.src[x]
+        self.parent[x] = best
+        self.src[x] = self.src[best]
+        return changed
+
+    """To settle a set of nodes whose distances are final, nearest to the roots first. A node whose place in the queue order moved (its parent changed,
+    its parent moved, or it is one of the given moved nodes whose distance changed) has its neighbors one level further settled again too
+    """
+    def resettle(self, nodes, moved=()):
+        moved = set(moved)
+        heap = [(self.dist[x], x) for x in set(nodes) if self.alive[x] and self.dist[x] > 0]
+        heapq.heapify(heap)
+        queued = {x for _, x in heap}
+        while heap:
+            d, x = heapq.heappop(heap)
+            if self.settle(x) or x in moved or self.parent[x] in moved:
+                moved.add(x)
+                for y in self.nbrs(x):
+                    if self.dist[y] == d + 1 and y not in queued:
+                        queued.add(y)
+                        heapq.heappush(heap, (d + 1, y))
+
+    """After adding edge (u, v): if it gives one endpoint a shorter path to the roots, the shorter distances spread out from it breadth first
+    """
+    def insert_repair(self, u: int, v: int):
+        changed = []
+        for a, b in ((u, v), (v, u)):
+            if self.dist[a] >= 0 and (self.dist[b] < 0 or self.dist[b] > self.dist[a] + 1):
+                self.dist[b] = self.dist[a] + 1
+                changed.append(b)
+                queue = collections.deque([b])
+                while queue:
+                    x = queue.popleft()
+                    for y in self.nbrs(x):
+                        if self.dist[y] < 0 or self.dist[y] > self.dist[x] + 1:
+                            self.dist[y] = self.dist[x] + 1
+                            changed.append(y)
+                            queue.append(y)
+        dirty = {u, v, *changed}
+        for x in changed:
+            dirty.update(self.nbrs(x))
+        self.resettle(dirty, changed)
+
+    """After removing edge (u, v): if it was the last shortest path of the farther endpoint, that endpoint and every node that only had shortest paths through it
+    (found level by level) move further away. Their new distances come from their other neighbors, spreading inside that set nearest first
+    """
+    def delete_repair(self, u: int, v: int):
+        dist = self.dist
+        if dist[u] >= 0 and dist[v] == dist[u] + 1:
+            b = v
+        elif dist[v] >= 0 and dist[u] == dist[v] + 1:
+            b = u
+        else:
+            return
+        if self.supports(b):
+            self.resettle([b])
+            return
+
+        lost = {b}
+        level = [b]
+        while level:
+            below = {y for x in level for y in self.nbrs(x) if dist[y] == dist[x] + 1 and y not in lost}
+            level = [y for y in below if all(w in lost for w in self.supports(y))]
+            lost.update(level)
+
+        for x in lost:
+            dist[x] = -1
+        heap = []
+        for x in lost:
+            reach = [dist[w] for w in self.nbrs(x) if w not in lost and dist[w] >= 0]
+            if reach:
+                heap.append((min(reach) + 1, x))
+        heapq.heapify(heap)
+        while heap:
+            d, x = heapq.heappop(heap)
+            if dist[x] >= 0:
+                continue
+            dist[x] = d
+            for y in self.nbrs(x):
+                if y in lost and dist[y] < 0:
+                    heapq.heappush(heap, (d + 1, y))
+
+        dirty = set(lost)
+        for x in lost:
+            dirty.update(self.nbrs(x))
+        for x in lost:
+            if dist[x] < 0:
+                self.src[x] = self.parent[x] = -1
+        self.resettle(dirty, lost)
+
+    """To drop the removed nodes and give the graph a new core that carries the updated analysis, so analyze_structure and compute_bfs_meta use it instead of starting over
+    Input:
+    Output: The graph's new GraphCore
+    """
+    def finish(self) -> GraphCore:
+        alive = np.array(self.alive, dtype=bool)
+        new_id = np.cumsum(alive) - 1
+        core = build_graph_core(self.G)
+
+        # components are numbered by their lowest node, like core_component_ids
+        _, group = np.unique(np.array(self.comp)[alive], return_inverse=True)
+        lowest = np.full(group.max(initial=-1) + 1, core.n, dtype=np.int64)
+        np.minimum.at(lowest, group, np.arange(core.n))
+        rank = np.empty_like(lowest)
+        rank[np.argsort(lowest)] = np.arange(lowest.size)
+        core.structure = StructureAnalysis(core, rank[group].astype(np.int32))
+
+        dist = np.array(self.dist, dtype=np.int32)[alive]
+        parent = np.array(self.parent, dtype=np.int64)[alive]
+        parent = np.where(parent >= 0, new_id[parent], -1).astype(np.int32)
+        root_id = np.array([core.index.get(r, -1) for r in self.roots] or [-1], dtype=np.int32)
+        src = np.array(self.src, dtype=np.int64)[alive]
+        source = np.where(src >= 0, root_id[src], -1).astype(np.int32)
+        # keyed by the roots still in the graph, which is what compute_bfs_meta is asked for
+        core.bfs_meta = (tuple(r for r in self.roots if r in self.G), dist, parent, source)
+        return core
+
+"""To get the analysis an IncrementalAnalysis starts from: the one kept next to the --input file by write_analysis_cache if it is still for the same file
+(and, for the BFS metadata, the same roots), otherwise worked out from the graph as it is before the edits
+Input: The graph, the listed roots, and the --input file's path (None when there is no file or the cache is off)
+Output: An IncrementalAnalysis
+"""
+def start_incremental_analysis(G: nx.Graph, roots: list, path: str = None) -> IncrementalAnalysis:
+    core = graph_core(G)
+    roots = [str(r) for r in (roots or [])]
+    cached = read_analysis_cache(path, core.n) if path else None
+    if cached is not None:
+        comp_id = cached["comp_id"]
+        print(f"incremental analysis: starting from {path + ANALYSIS_CACHE_SUFFIX}")
+    else:
+        comp_id = core_structure(core).comp_id
+
+    if cached is not None and cached["roots"].tolist() == roots:
+        dist, parent, source = cached["dist"], cached["parent"], cached["source"]
+    else:
+        dist, parent, source = compute_bfs_meta(G, roots)
+    return IncrementalAnalysis(G, roots, comp_id, dist, parent, source)
+
+"""To keep the analysis of an --input file (its component ids and the BFS metadata for the listed roots) next to it, keyed by the file's size and mtime
+Input: The graph loaded from the file (before any edits), the listed roots and the file's path
+Output:
+"""
+def write_analysis_cache(G: nx.Graph, roots: list, path: str):
+    core = graph_core(G)
+    dist, parent, source = compute_bfs_meta(G, roots)
+    stat = os.stat(path)
+
+    def write(f):
+        np.savez(f, key=np.array([stat.st_size, stat.st_mtime_ns, core.n, ANALYSIS_CACHE_VERSION], dtype=np.int64),
+                 roots=np.array([str(r) for r in (roots or [])], dtype=str), comp_id=core_structure(core).comp_id,
+                 dist=dist, parent=parent, source=source)
+    write_sidecar(path + ANALYSIS_CACHE_SUFFIX, write, "incremental analysis")
+
+"""To read the analysis kept by write_analysis_cache, if it is there and still for the same file
+Input: The --input file's path and its graph's number of nodes
+Output: A dict of the cached arrays, or None
+"""
+def read_analysis_cache(path: str, n: int):
+    try:
+        stat = os.stat(path)
+        with np.load(path + ANALYSIS_CACHE_SUFFIX, allow_pickle=False) as cached:
+            arrays = {name: cached[name] for name in cached.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if arrays.get("key") is None or arrays["key"].tolist() != [stat.st_size, stat.st_mtime_ns, n, ANALYSIS_CACHE_VERSION]:
+        return None
+    return arrays
 
 
 
 
 # Print Analysis Functions
 # ====================================================================================================
+"""To work out the graph's components, isolates, cycle status and density in one pass, the analyze_* and attach_* functions below all read from it
+Input: A graph
+Output: The StructureAnalysis of the graph (kept with the graph's core, so it is only worked out once)
+"""
+def analyze_structure(G) -> StructureAnalysis:
+    return core_structure(graph_core(G))
+
 """To print out and return a list of connected nodes (nodes that have edges)
 Input: A graph
 Output: A list of all the connected components
 """
 def analyze_components(G):
-    num_comps = nx.number_connected_components(G)
+    num_comps = analyze_structure(G).num_components
     print("Number of connected components:", num_comps)
     return num_comps
 
@@ -194,7 +1752,7 @@ Input: A graph
 Output: A true/false that corresponds to if it has a cycle or not
 """
 def analyze_cycles(G):
-    is_cycle = bool(not nx.is_forest(G))
+    is_cycle = analyze_structure(G).has_cycle
     if is_cycle:
         print("This graph has a cycle.")
     else:
@@ -206,7 +1764,7 @@ Input: A graph
 Output: 
 """
 def analyze_isolates(G):
-    isolates = list(nx.isolates(G))
+    isolates = compute_isolates(G)
     if isolates:
         print("Graph has isolated nodes:", isolates)
     else:
@@ -217,266 +1775,1855 @@ Input: A graph
 Output: A float that corresponds to the graph's density
 """
 def analyze_density(G):
-    density = nx.density(G)
+    density = analyze_structure(G).density
     print("Density:", density)
     return density
     
-"""If the graph does have edges, use the NetworkX function to see the average path length for the shortest distance between possible pairs (only if they are connected nodes)
+"""What analyze_avg_shortest_path found: the average (None when undefined), and when some average really was estimated, the number of sources and the 95% confidence interval
+(samples stays None when every average was exact, including when the sample size was at least the number of nodes),
+and when asked for, the average of each component (indexed by component id)
+"""
+class AvgPathResult:
+    def __init__(self, avg_len=None, samples=None, ci=None, per_component=None):
+        self.avg_len = avg_len
+        self.samples = samples
+        self.ci = ci
+        self.per_component = per_component
+
+"""To average the shortest path length over the ordered pairs of one set of nodes that are all connected, either exactly (a BFS from every node)
+or estimated from a random sample of BFS sources, each source's average distance to the rest being one sample
+Input: A GraphCore, the ids of the nodes, the number of sampled sources (None for exact), the numpy random generator and the number of worker processes
+Output: The average, and the 95% confidence interval (None when exact)
+"""
+def average_path_length(core: GraphCore, nodes, samples, rng, workers):
+    size = len(nodes)
+    if size <= 1:
+        return 0, None     # like nx.average_shortest_path_length on one node
+
+    if samples is None or samples >= size:
+        sums, _ = distance_sums(core, nodes, workers)
+        return int(sums.sum()) / (size * (size - 1)), None
+
+    sources = rng.choice(nodes, size=samples, replace=False)
+    sums, _ = distance_sums(core, sources, workers)
+    per_source = sums / (size - 1)
+    avg_len = float(per_source.mean())
+
+    # normal approximation with the finite population correction (sources are drawn without replacement)
+    spread = per_source.std(ddof=1) if samples > 1 else 0.0
+    half = 1.96 * spread / math.sqrt(samples) * math.sqrt((size - samples) / (size - 1))
+    return avg_len, (float(avg_len - half), float(avg_len + half))
+
+"""If the graph is connected, find the average path length for the shortest distance between all possible pairs. The BFS sources are swept BFS_WORD_BITS at a time
+(bit-parallel) and can be sharded across worker processes, or only `samples` random sources are used for an estimate with a confidence interval.
+With per_component, a disconnected graph gets the average of each of its components instead of just "undefined"
+Input: A graph, the number of sampled sources (None for exact), whether to report per-component averages, the number of worker processes and the sampling seed
+Output: An AvgPathResult
+"""
+def analyze_avg_shortest_path(G, samples: int = None, per_component: bool = False, workers: int = 1, seed: int = None):
+    core = graph_core(G)
+    structure = analyze_structure(G)
+    rng = np.random.default_rng(seed)
+    result = AvgPathResult()
+
+    if structure.num_components == 1:
+        result.avg_len, result.ci = average_path_length(core, np.arange(core.n), samples, rng, workers)
+        if result.ci is None:
+            print("Average shortest path length:", result.avg_len)
+        else:
+            result.samples = samples
+            print(f"Average shortest path length (estimated from {samples} sources): {result.avg_len} (95% CI {result.ci[0]} to {result.ci[1]})")
+        return result
+
+    print("This graph is not connected; average shortest path length is undefined.")
+    if per_component:
+        # nodes grouped by component id
+        order = np.argsort(structure.comp_id, kind="stable")
+        starts = np.searchsorted(structure.comp_id[order], np.arange(structure.num_components + 1))
+        result.per_component = []
+        for cid in range(structure.num_components):
+            nodes = order[starts[cid]:starts[cid + 1]]
+            avg_len, ci = average_path_length(core, nodes, samples, rng, workers)
+            result.per_component.append(avg_len)
+            if ci is not None:
+                result.samples = samples
+            if len(nodes) > 1:
+                note = "" if ci is None else f" (95% CI {ci[0]} to {ci[1]})"
+                print(f"Component {cid} ({len(nodes)} nodes) average shortest path length: {avg_len}{note}")
+    return result
+
+"""The exact diameter and radius of every component (indexed by component id), how many BFS runs (one per source) and how many rounds (multi-source BFS) it took
+"""
+class EccentricityResult:
+    def __init__(self, diameter, radius, bfs_runs: int, rounds: int):
+        self.diameter = diameter
+        self.radius = radius
+        self.bfs_runs = bfs_runs
+        self.rounds = rounds
+
+# core_eccentricity_bounds gives each open component a single source for this many rounds, then doubles the sources per round up to BFS_WORD_BITS
+ECCENTRICITY_SINGLE_ROUNDS = 8
+
+"""Exact diameter and radius of every component from bounds on each node's eccentricity (Takes and Kosters' BoundingDiameters). A BFS from v gives ecc(v), and for every node w
+in its component max(ecc(v) - d(v, w), d(v, w)) <= ecc(w) <= ecc(v) + d(v, w). A component is done once its largest lower bound equals its largest upper bound (the diameter)
+and its smallest upper bound equals its smallest lower bound (the radius), so it stops as soon as both close rather than once every eccentricity is known.
+Sources come from a component's candidates (the nodes that could still raise the diameter or lower the radius), picked like the paper: a double sweep (the highest degree
+node, then a node farthest from it), then alternately the node with the largest upper bound and the node with the smallest lower bound, highest degree first on ties.
+For the first ECCENTRICITY_SINGLE_ROUNDS rounds every open component gets one source, and one multi-source core_bfs covers them all (the sources are in different components).
+A component still open after that has most of its eccentricities within one of each other, which takes about as many sources with any order, so the sources per round
+double (half of them by each bound) up to BFS_WORD_BITS and share bit-parallel sweeps (core_eccentricity_sweep), at most BFS_WORD_BITS in total per round
+Input: A GraphCore and its StructureAnalysis
+Output: An EccentricityResult
+"""
+def core_eccentricity_bounds(core: GraphCore, structure: StructureAnalysis) -> EccentricityResult:
+    comp, num_comps = structure.comp_id, structure.num_components
+    neg_degree = -core.degree()
+    order = np.argsort(comp, kind="stable")
+    starts = np.searchsorted(comp[order], np.arange(num_comps + 1))
+
+    lower = np.zeros(core.n, dtype=np.int32)
+    # an isolated node's eccentricity is 0 without a BFS
+    upper = np.where(structure.isolate, 0, np.iinfo(np.int32).max).astype(np.int32)
+    runs = rounds = 0
+    while num_comps:
+        d_low = np.maximum.reduceat(lower[order], starts[:-1])
+        d_up = np.maximum.reduceat(upper[order], starts[:-1])
+        r_low = np.minimum.reduceat(lower[order], starts[:-1])
+        r_up = np.minimum.reduceat(upper[order], starts[:-1])
+        need_diameter, need_radius = d_low < d_up, r_low < r_up
+        active = np.flatnonzero(need_diameter | need_radius)
+        if active.size == 0:
+            break
+
+        # every candidate ranks ahead of its component's other nodes, so the first k of a component are its best k candidates (or all of them when it has fewer)
+        wants = (upper > d_low[comp]) | (lower < r_up[comp])
+        by_upper = np.lexsort((neg_degree, -upper.astype(np.int64), ~wants, comp))
+        by_lower = np.lexsort((neg_degree, lower, ~wants, comp))
+        per_comp = min(2 ** max(0, rounds - ECCENTRICITY_SINGLE_ROUNDS + 1), max(1, BFS_WORD_BITS // active.size))
+        if per_comp == 1:
+            # the double sweep, then alternating
+            ranked = by_upper if rounds < 2 or rounds % 2 == 1 else by_lower
+            sources = ranked[starts[active]]
+            dist, _, source = core_bfs(core, sources)
+            reached = np.flatnonzero(dist >= 0)
+            d = dist[reached]
+            ecc = np.zeros(core.n, dtype=np.int32)
+            np.maximum.at(ecc, source[reached], d)
+            e = ecc[source[reached]]
+            lower[reached] = np.maximum(lower[reached], np.maximum(e - d, d))
+            upper[reached] = np.minimum(upper[reached], e + d)
+        else:
+            # split between the two bounds, or all to the one still open
+            k_upper = np.where(need_diameter[active], np.where(need_radius[active], per_comp // 2, per_comp), 0)
+            picks = []
+            for ranked, k in ((by_upper, k_upper), (by_lower, per_comp - k_upper)):
+                k = np.minimum(k, np.diff(starts)[active])
+                offsets = np.arange(int(k.sum())) - np.repeat(np.cumsum(k) - k, k)
+                picks.append(ranked[np.repeat(starts[active], k) + offsets])
+            sources = np.unique(np.concatenate(picks))
+            sources = sources[wants[sources]]
+            for lo in range(0, sources.size, BFS_WORD_BITS):
+                core_eccentricity_sweep(core, sources[lo:lo + BFS_WORD_BITS], lower, upper)
+        runs += int(sources.size)
+        rounds += 1
+
+    if num_comps == 0:
+        return EccentricityResult(lower[:0], upper[:0], 0, 0)
+    return EccentricityResult(d_low, r_up, runs, rounds)
+
+"""To find the exact diameter and radius of every component of the graph with a handful of BFS runs (core_eccentricity_bounds) instead of a BFS from every node like nx.diameter
 Input: A graph
-Output: 
+Output: An EccentricityResult
 """
-def analyze_avg_shortest_path(G):
-    if nx.is_connected(G):
-        avg_len = nx.average_shortest_path_length(G)
-        print("Average shortest path length:", avg_len)
-        return avg_len
-    else:
-        print("This graph is not connected; average shortest path length is undefined.")
-    return None
+def analyze_diameter_radius(G) -> EccentricityResult:
+    structure = analyze_structure(G)
+    result = core_eccentricity_bounds(graph_core(G), structure)
+    if structure.num_components == 1:
+        print(f"Diameter: {int(result.diameter[0])}, radius: {int(result.radius[0])} (exact, {result.bfs_runs} BFS runs)")
+    elif structure.num_components > 1:
+        largest = int(np.argmax(result.diameter))
+        print(f"This graph is not connected; largest component diameter is {int(result.diameter[largest])} (component {largest}), "
+              f"per component diameters and radii are saved with the graph ({result.bfs_runs} BFS runs)")
+    return result
+
+# oriented edges are checked for triangles in steps of this many lookups (one per out-neighbor of each edge's head), which bounds the working memory
+TRIANGLE_CHUNK = 1 << 22
+
+"""Every edge once, pointed from its end that is lower in (degree, id) order to the higher one, with self loops left out. Triangles counted over these edges are each found once
+(from their lowest node), and a node has at most sqrt(2m) higher neighbors, so counting takes O(m sqrt(m)) checks even with high degree hubs
+Input: A GraphCore
+Output: The oriented edges as sorted int64 keys tail * n + head, their heads, the start of each node's out-edges in them and each node's degree without self loops
+"""
+def core_orientation(core: GraphCore):
+    n = core.n
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(core.indptr))
+    cols = core.indices.astype(np.int64)
+    loops = rows == cols
+    degree = core.degree() - np.bincount(rows[loops], minlength=n)
+
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.argsort(degree, kind="stable")] = np.arange(n)
+    up = rank[rows] < rank[cols]
+    keys = np.sort(rows[up] * n + cols[up])
+    out_ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // max(n, 1), minlength=n), out=out_ptr[1:])
+    return keys, keys % max(n, 1), out_ptr, degree
+
+"""To count the triangles through oriented edges lo..hi (u -> v): every head w of v's out-edges closes a triangle when u -> w is an oriented edge too, which is looked up in
+the sorted keys. The edges are taken TRIANGLE_CHUNK checks at a time
+Input: The number of nodes, the keys, heads and out-edge starts from core_orientation and the range of oriented edges
+Output: An int64 array with the number of those triangles each node is in
+"""
+def oriented_triangles(n: int, keys, heads, out_ptr, lo: int, hi: int):
+    counts = np.zeros(n, dtype=np.int64)
+    out_deg = np.diff(out_ptr)
+    checks = np.cumsum(out_deg[heads[lo:hi]])
+    start = 0
+    while start < hi - lo:
+        done = int(checks[start - 1]) if start else 0
+        stop = max(int(np.searchsorted(checks, done + TRIANGLE_CHUNK, side="right")), start + 1)
+        edge = np.arange(lo + start, lo + stop)
+        start = stop
+
+        v = heads[edge]
+        k = out_deg[v]
+        total = int(k.sum())
+        if total == 0:
+            continue
+        offsets = np.arange(total) - np.repeat(np.cumsum(k) - k, k)
+        w = heads[np.repeat(out_ptr[v], k) + offsets]
+        tails = keys[edge] // n
+        u = np.repeat(tails, k)
+        query = u * n + w
+        # only the out-edges of this step's tails can match
+        near = keys[out_ptr[tails[0]]:out_ptr[tails[-1] + 1]]
+        closed = near[np.minimum(np.searchsorted(near, query), near.size - 1)] == query
+        for ends in (u, np.repeat(v, k), w):
+            counts += np.bincount(ends[closed], minlength=n)
+    return counts
+
+
+# the orientation of the worker's shared core, worked out by its first triangle counting task
+_worker_orientation = None
+
+"""Pool task: oriented_triangles over a range of the oriented edges of the worker's shared core
+"""
+def shared_triangle_counts(span):
+    global _worker_orientation
+    if _worker_orientation is None or _worker_orientation[0] is not _worker_core:
+        _worker_orientation = (_worker_core, core_orientation(_worker_core))
+    keys, heads, out_ptr, _ = _worker_orientation[1]
+    return oriented_triangles(_worker_core.n, keys, heads, out_ptr, *span)
+
+"""To count the triangles every node is in over the degree-ordered edges (core_orientation), with the edges split into ranges of about the same number of checks
+across a process pool when workers > 1 and there is more than one TRIANGLE_CHUNK of work
+Input: A GraphCore and the number of worker processes
+Output: An int64 array with each node's number of triangles, and the nodes' degrees without self loops
+"""
+def triangle_counts(core: GraphCore, workers: int = 1):
+    keys, heads, out_ptr, degree = core_orientation(core)
+    checks = np.cumsum(np.diff(out_ptr)[heads])
+    if workers <= 1 or checks.size == 0 or checks[-1] <= TRIANGLE_CHUNK:
+        return oriented_triangles(core.n, keys, heads, out_ptr, 0, keys.size), degree
+
+    cuts = np.searchsorted(checks, np.linspace(0, checks[-1], 4 * workers + 1)[1:-1])
+    bounds = np.unique(np.concatenate(([0], cuts, [keys.size])))
+    blocks, spec = share_core(core)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(workers, initializer=init_shared_core_worker, initargs=(spec,)) as pool:
+            counts = sum(pool.map(shared_triangle_counts, zip(bounds[:-1].tolist(), bounds[1:].tolist())))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return counts, degree
+
+"""The triangles each node is in and its local clustering coefficient (arrays over the core ids), the number of triangles in the graph,
+the average clustering coefficient and the transitivity
+"""
+class TriangleResult:
+    def __init__(self, triangles, clustering, num_triangles: int, avg_clustering: float, transitivity: float):
+        self.triangles = triangles
+        self.clustering = clustering
+        self.num_triangles = num_triangles
+        self.avg_clustering = avg_clustering
+        self.transitivity = transitivity
+
+"""To count the triangles and work out the clustering coefficients from one triangle count (triangle_counts) instead of intersecting neighbor sets node by node like nx.clustering.
+A node's clustering is 2T / (d(d - 1)) (0 with fewer than 2 neighbors), the average is over all nodes like nx.average_clustering, and the transitivity is 3 times the triangles
+over the connected triples, like nx.transitivity (self loops are left out of all of them)
+Input: A graph and the number of worker processes
+Output: A TriangleResult
+"""
+def analyze_clustering(G, workers: int = 1) -> TriangleResult:
+    core = graph_core(G)
+    triangles, degree = triangle_counts(core, workers)
+    pairs = degree * (degree - 1)
+    clustering = np.divide(2 * triangles, pairs, out=np.zeros(core.n), where=pairs > 0)
+    num_triangles = int(triangles.sum()) // 3
+    triples = int(pairs.sum())
+    result = TriangleResult(triangles, clustering, num_triangles, float(clustering.mean()) if core.n else 0.0,
+                            6 * num_triangles / triples if num_triangles else 0.0)
+    print(f"Triangles: {result.num_triangles}, average clustering: {result.avg_clustering}, transitivity: {result.transitivity}")
+    return result
 
 
 
 
-# Plotting Helper Functions
+# Layout Functions
 # ====================================================================================================
-"""Take all the isolate nodes and draw them in red to differentiate them
-Input: A graph, the set positioning for the entire graph, and the axis for isolated nodes
-Output: A matplot patch that is 2D containing the face color and edge color for a graph
+# seed every layout is drawn with, so the same graph is always drawn the same way
+LAYOUT_SEED = 951369
+LAYOUTS = ("spring", "spectral", "force")
+LAYOUT_CACHE_DIR = ".layout_cache"
+
+"""To hash a graph's structure (its labels in order and its neighbor arrays), which is what every layout depends on
+Input: A GraphCore
+Output: The hex digest
 """
-def draw_isolates(G, pos, ax):
-    #spliting the nodes into two groups isolated and non isolated
-    isolates = set(nx.isolates(G))
-    
-    # draws all isolates
-    if isolates:
-        nx.draw_networkx_nodes(
-            G,
-            pos,
-            nodelist=isolates,
-            node_color="none",
-            edgecolors="red",
-            linewidths=2.0,
-            ax=ax
-            )   
-    iso_handle = Patch(      # creating the legend handle for isolates
-        facecolor="none",    # hollow fill
-        edgecolor="red",     # red border
-        linewidth=2.0,
-        label="Isolates"
-    )
-    return iso_handle
-        
-"""When no BFS is called, draw all nodes the same color
-"""
-def draw_default_nodes(G, pos, ax):
-    #drawing the connected nodes first (default color)
-    nx.draw_networkx_nodes(
-        G, 
-        pos, 
-        nodelist=G.nodes(),
-        node_color="paleturquoise",
-        ax=ax
-    )
-
-"""Take all the nodes that aren't isolated or the root and draw them in a soft color to differentiate them
-Input: A graph, the set positioning for the entire graph, and the axis for isolated nodes
-Output: A matplot patch that is 2D containing the face color and edge color for a graph
+def graph_hash(core: GraphCore) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update("\0".join(core.labels).encode("utf-8"))
+    digest.update(core.indptr.tobytes())
+    digest.update(core.indices.tobytes())
+    return digest.hexdigest()
+
+"""Where the positions of a graph drawn with a given layout and seed are cached
+Input: A GraphCore, the layout name and the seed
+Output: The cache file's path
+"""
+def layout_cache_path(core: GraphCore, layout: str, seed: int) -> str:
+    return os.path.join(LAYOUT_CACHE_DIR, f"{graph_hash(core)}-{layout}-{seed}.npy")
+
+"""Sparse spectral layout (pivot MDS): BFS distances from a few pivot nodes per component, picked farthest-first, stand in for the full distance matrix,
+and the top two eigenvectors of the small pivots x pivots matrix give each component's coordinates, so only O(pivots * (V + E)) work is needed.
+Every component gets its own drawing (one multi-source BFS finds the distances from one pivot of every component at once), and the components are then
+packed side by side in rows, largest first
+Input: A GraphCore, the seed used to pick the first pivots and the number of pivots per component
+Output: A (V, 2) float array of positions
 """
-def draw_component_nodes(G, pos, ax):
-    # creates a color map to give each component a diffrent color
-    comp_id = compute_component_ids(G)
-    unique_cids = sorted(set(comp_id.values()))
+def spectral_positions(core: GraphCore, seed: int, pivots: int = 32):
+    rng = np.random.default_rng(seed)
+    structure = core_structure(core)
+    comp, num_comps = structure.comp_id, structure.num_components
+    sizes = np.bincount(comp, minlength=num_comps)
+    order = np.argsort(comp, kind="stable")
+    starts = np.searchsorted(comp[order], np.arange(num_comps + 1))
+
+    # the first pivot of every component is a random node of it, after that the node farthest from the pivots so far
+    pivot = np.lexsort((rng.random(core.n), comp))[starts[1:] - 1]
+    dists = np.zeros((core.n, pivots), dtype=np.float64)
+    nearest = np.full(core.n, np.iinfo(np.int32).max, dtype=np.int64)
+    for r in range(pivots):
+        active = sizes > max(r, 1)
+        if not active.any():
+            break
+        # the roots are in different components, so each node's distance is from its own component's pivot
+        dist, _, _ = core_bfs(core, pivot[active])
+        dists[:, r] = dist
+        reached = dist >= 0
+        nearest[reached] = np.minimum(nearest[reached], dist[reached])
+        pivot = np.lexsort((nearest, comp))[starts[1:] - 1]
+
+    x = np.zeros((core.n, 2))
+    for cid in np.flatnonzero(sizes > 1):
+        nodes = order[starts[cid]:starts[cid + 1]]
+        d2 = dists[nodes, :min(pivots, len(nodes))] ** 2
+        # double centering, then the two largest eigenvectors of C^T C
+        c = -0.5 * (d2 - d2.mean(axis=0) - d2.mean(axis=1, keepdims=True) + d2.mean())
+        _, vectors = np.linalg.eigh(c.T @ c)
+        x[nodes, :min(2, vectors.shape[1])] = c @ vectors[:, ::-1][:, :2]
+
+    # fit every component in a box whose side grows with the square root of its size
+    lo = np.minimum.reduceat(x[order], starts[:-1])
+    hi = np.maximum.reduceat(x[order], starts[:-1])
+    side = np.sqrt(sizes)
+    x = (x - lo[comp]) / np.maximum((hi - lo).max(axis=1), 1e-12)[comp, None] * (0.8 * side)[comp, None]
+
+    # shelf packing: components in decreasing size, left to right, in rows about as wide as the whole drawing is tall
+    row_width = math.sqrt((side ** 2).sum()) * 1.2
+    offset = np.zeros((num_comps, 2))
+    cx = cy = row_height = 0.0
+    for cid in np.argsort(-sizes, kind="stable"):
+        if cx > 0 and cx + side[cid] > row_width:
+            cx, cy, row_height = 0.0, cy + row_height, 0.0
+        offset[cid] = (cx, cy)
+        cx += side[cid]
+        row_height = max(row_height, side[cid])
+    return x + offset[comp]
+
+"""Force-directed (Fruchterman-Reingold) refinement that scales to large graphs: the attraction along the edges is exact, and the all-pairs repulsion
+is approximated on a grid (particle-mesh): the nodes are binned into cells and the repulsion every cell gets from all the others is one FFT convolution
+Input: A GraphCore, starting positions (V, 2) and the number of iterations
+Output: The refined (V, 2) float positions
+"""
+def force_positions(core: GraphCore, pos, iterations: int = 50):
+    n = core.n
+    if n < 2:
+        return np.array(pos, dtype=np.float64)
+    rows = np.repeat(np.arange(n), np.diff(core.indptr))
+    cells = int(min(256, max(16, 2 ** math.ceil(math.log2(2 * math.sqrt(n))))))
+
+    # kernel of the repulsion k^2 / d away from a node, over every cell offset of a grid twice the size (so the convolution does not wrap around)
+    offsets = np.fft.fftfreq(2 * cells, 1 / (2 * cells))
+    dx, dy = np.meshgrid(offsets, offsets, indexing="ij")
+    r2 = dx ** 2 + dy ** 2
+    r2[0, 0] = np.inf
+    kernels = [np.fft.rfft2(dx / r2), np.fft.rfft2(dy / r2)]
+
+    # start from the unit square, where the ideal edge length is k
+    p = (pos - pos.min(axis=0)) / max(float(np.ptp(pos, axis=0).max()), 1e-12)
+    k = 1 / math.sqrt(n)
+    temperature = 0.1
+    for _ in range(iterations):
+        # the grid is stretched over wherever the nodes are now
+        lo = p.min(axis=0)
+        h = max(float(np.ptp(p, axis=0).max()), 1e-12) / (cells - 1)     # cell width
+
+        cell = np.minimum(((p - lo) / h + 0.5).astype(np.intp), cells - 1)
+        mass = np.zeros((2 * cells, 2 * cells))
+        np.add.at(mass, (cell[:, 0], cell[:, 1]), 1)
+        mass_f = np.fft.rfft2(mass)
+        disp = np.empty((n, 2))
+        for j in range(2):
+            field = np.fft.irfft2(mass_f * kernels[j], s=mass.shape)
+            disp[:, j] = field[cell[:, 0], cell[:, 1]] * (k * k / h)
+
+        delta = p[rows] - p[core.indices]
+        dist = np.sqrt((delta ** 2).sum(axis=1))
+        for j in range(2):
+            disp[:, j] -= np.bincount(rows, weights=delta[:, j] * dist / k, minlength=n)
+
+        # move each node at most `temperature` along its displacement, cooling linearly like nx.spring_layout
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 0.01)
+        p += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= 0.1 / (iterations + 1)
+    return p
+
+"""To get the positions a graph is drawn at, with the positions kept in a cache (in LAYOUT_CACHE_DIR, keyed by the graph's structure, the layout and the seed)
+so drawing the same graph again, for example with other --multi_BFS roots, does not lay it out again.
+spring is nx.spring_layout (O(V^2) per iteration), spectral is spectral_positions, and force refines spectral_positions with force_positions
+Input: A graph, the layout name, the seed, and whether to use the cache
+Output: A dict of node label -> position, centered on 0 and scaled to fit in [-1, 1] like nx.spring_layout
+"""
+def graph_layout(G, layout: str = "spring", seed: int = LAYOUT_SEED, use_cache: bool = True):
+    core = graph_core(G)
+    cache = layout_cache_path(core, layout, seed) if use_cache else None
+    pos = None
+    if cache is not None and os.path.exists(cache):
+        try:
+            pos = np.load(cache)
+        except (OSError, ValueError):
+            pos = None
+        if pos is not None and pos.shape != (core.n, 2):
+            pos = None
+        if pos is not None:
+            print(f"graph_layout: cached {layout} layout from {cache}")
+
+    if pos is None:
+        start = time.perf_counter()
+        if layout == "spring":
+            spring = nx.spring_layout(G, seed=seed)
+            pos = np.array([spring[label] for label in core.labels], dtype=np.float64).reshape(core.n, 2)
+        else:
+            pos = spectral_positions(core, seed)
+            if layout == "force":
+                pos = force_positions(core, pos)
+            if core.n:
+                pos = pos - pos.mean(axis=0)
+                pos /= max(float(np.abs(pos).max()), 1e-12)
+        print(f"graph_layout: {layout} layout of {core.n} nodes in {time.perf_counter() - start:.3f}s")
+
+        if cache is not None:
+            try:
+                os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+                with open(cache + ".tmp", "wb") as f:
+                    np.save(f, pos)
+                os.replace(cache + ".tmp", cache)
+            except OSError as err:
+                print(f"graph_layout: could not write cache {cache}: {err}")
+
+    return dict(zip(core.labels, pos))
+
 
-    max_cid = max(unique_cids, default=0)
-    norm = mcolors.Normalize(vmin=0, vmax=max_cid)
-    cmap = cm.tab20
-    
-    # draws all components in a diffrent color
-    for cid in unique_cids:
-        nodes = [v for v,c in comp_id.items() if c==cid]
-        if nodes:
-            nx.draw_networkx_nodes(
-                G, 
-                pos, 
-                nodelist=nodes, 
-                node_color=[cmap(cid)], 
-                ax=ax
-            )
-    
-    #Draws Legend for components
-    comp_handles  = [
-    Patch(facecolor=cmap(norm(cid)), edgecolor='black', label=f"Component {cid}")
-    for cid in unique_cids
-    ]
-    return comp_handles
-
-"""Sets the color and dimension for all edges"""
-def draw_edges(G, pos, ax):
-#Drawing all edges in the graph
-        nx.draw_networkx_edges(
-            G, 
-            pos, 
-            edge_color="lightgray",
-            width=4.0,
-            alpha=0.7,
-            ax=ax
-        )
 
-"""Sets the size and lable name for numbering all nodes"""
-def draw_lables(G, pos, ax):
-    #labeling the node number
-    nx.draw_networkx_labels(
-        G,
-        pos, 
-        labels={node: node for node in G.nodes},
-        ax=ax
-    )
 
-"""Creating a ragged array where the row number corresponds to the level of the nodes inside the ragged array, and return the maximum number of levels
+# Plotting Helper Functions
+# ====================================================================================================
+"""To import matplotlib and the pieces of it the plotting functions use, the first time a plot is drawn.
+headless switches to the off-screen Agg backend, for rendering to a file without a display
 """
-def compute_all_BFS_level(G, root):
-    #Compute BFS tree from root
-    bfs_tree = nx.bfs_tree(G, str(root))
+def import_plotting(headless: bool = False):
+    global LineCollection, Line2D, Patch, cm, mcolors, plt
+    if plt is not None:
+        if headless:
+            plt.switch_backend("Agg")
+        return
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    from matplotlib.patches import Patch
+    import matplotlib.cm as cm
+    import matplotlib.colors as mcolors
+    import matplotlib.pyplot as plt
+
+# above this many edges the plot is drawn density-aggregated (binned onto a pixel grid) instead of one marker and line per node and edge
+PLOT_DENSITY_EDGES = 20000
+# side in pixels of the grid density-aggregated layers are binned onto
+DENSITY_PIXELS = 600
+# how many line samples are binned at once, which bounds the memory used
+DENSITY_CHUNK = 1 << 20
+# most line samples binned for one layer, which bounds the time used (long edges are then sampled less than once per pixel)
+DENSITY_SAMPLES = 1 << 24
+# a density-aggregated plot's legend lists at most this many components
+DENSITY_LEGEND_COMPONENTS = 20
+# with --plot_hops, a neighborhood with more nodes than this is drawn without node labels
+PLOT_LABEL_NODES = 50
+# with --plot_hops, at most this many other components get their own summary marker, the rest share one
+PLOT_SUMMARY_COMPONENTS = 10
+
+"""Everything the plots draw that does not depend on the BFS root, worked out once from the graph core and shared by every subplot:
+the node positions, each node's color (its component's color with show_components), the isolate mask, the edge segments and the legend handles.
+Each subplot still gets its own matplotlib artists (an artist can only be in one axis), but they are built from these same arrays.
+With more than density_edges edges the scene is density-aggregated: every layer is binned onto a DENSITY_PIXELS grid over `extent` and drawn as an image.
+A scene of part of a graph (a --plot_hops neighborhood) takes its colors and isolates from the whole graph's component ids (comp_id) and isolate mask (isolate),
+so a root with neighbors outside the part isn't drawn as an isolate, and isn't labeled past label_nodes nodes.
+It is only made by plot_graph, which has imported the plotting modules (import_plotting) already
+"""
+class PlotScene:
+    def __init__(self, G, pos, show_components: bool, density_edges: int = PLOT_DENSITY_EDGES, comp_id=None, isolate=None, label_nodes: int = None):
+        self.core = core = graph_core(G)
+        structure = core_structure(core)
+        self.xy = np.array([pos[label] for label in core.labels], dtype=np.float64).reshape(core.n, 2)
+        self.isolate = structure.isolate if isolate is None else isolate
+        self.density = core.m > density_edges
+        self.labeled = not self.density and (label_nodes is None or core.n <= label_nodes)
+
+        # the drawn area, padded by 5% like nx.draw_networkx_edges does
+        lo, hi = (self.xy.min(axis=0), self.xy.max(axis=0)) if core.n else (np.zeros(2), np.zeros(2))
+        pad = np.maximum(0.05 * (hi - lo), 1e-9)
+        self.extent = (lo[0] - pad[0], hi[0] + pad[0], lo[1] - pad[1], hi[1] + pad[1])
+
+        # each component drawn in its own color, the legend uses the same colors as the nodes
+        if show_components:
+            cmap = cm.tab20
+            comp_id = structure.comp_id if comp_id is None else comp_id
+            self.node_colors = cmap(comp_id)
+            cids = np.unique(comp_id).tolist()
+            shown = len(cids) if not self.density else min(len(cids), DENSITY_LEGEND_COMPONENTS)
+            self.comp_handles = [
+                Patch(facecolor=cmap(cid), edgecolor='black', label=f"Component {cid}")
+                for cid in cids[:shown]
+            ]
+            if shown < len(cids):
+                self.comp_handles.append(Patch(facecolor="none", edgecolor="none", label=f"+{len(cids) - shown} more components"))
+        else:
+            self.node_colors = np.tile(mcolors.to_rgba("paleturquoise"), (core.n, 1))
+            self.comp_handles = []
+
+        self.iso_handle = Patch(      # creating the legend handle for isolates
+            facecolor="none",    # hollow fill
+            edgecolor="red",     # red border
+            linewidth=2.0,
+            label="Isolates"
+        )
 
-    #Shortest path from root
-    path_dir = nx.single_source_shortest_path(G, str(root))
+        # every edge once, as a (start, end) segment
+        rows = np.repeat(np.arange(core.n), np.diff(core.indptr))
+        once = core.indices > rows
+        self.edge_segments = np.stack([self.xy[rows[once]], self.xy[core.indices[once]]], axis=1)
 
-    #BFS level of each node
-    level_dir = {}
-    for node in path_dir:
-        level_dir[node] = len(path_dir[node]) - 1
+"""To hide the axis ticks the way the NetworkX drawing functions do
+"""
+def hide_ticks(ax):
+    ax.tick_params(axis="both", which="both", bottom=False, left=False, labelbottom=False, labelleft=False)
 
+"""To bin points onto the scene's pixel grid: how many land in each pixel and the sum of their colors. With radius, each point also lands
+in the pixels up to radius away (so a node is a visible dot rather than one pixel)
+Input: The plot scene, (k, 2) points, their (k, 4) colors, the count and color sum grids to add to, and the radius in pixels
+Output:
+"""
+def density_bin(scene: PlotScene, points, colors, counts, color_sums, radius: int = 0):
+    x0, x1, y0, y1 = scene.extent
+    col = ((points[:, 0] - x0) / (x1 - x0) * DENSITY_PIXELS).astype(np.intp)
+    row = ((points[:, 1] - y0) / (y1 - y0) * DENSITY_PIXELS).astype(np.intp)
+    for dr in range(-radius, radius + 1):
+        for dc in range(-radius, radius + 1):
+            pixel = np.clip(row + dr, 0, DENSITY_PIXELS - 1) * DENSITY_PIXELS + np.clip(col + dc, 0, DENSITY_PIXELS - 1)
+            counts += np.bincount(pixel, minlength=counts.size)
+            for channel in range(3):
+                color_sums[:, channel] += np.bincount(pixel, weights=colors[:, channel], minlength=counts.size)
+
+"""To bin line segments onto the scene's pixel grid, each sampled about once per pixel along its length (so a long edge adds as much ink as it covers),
+thinned out evenly if that would be more than DENSITY_SAMPLES samples, and binned DENSITY_CHUNK samples at a time
+Input: The plot scene, (k, 2, 2) segments and their (k, 4) colors
+Output: The per-pixel sample counts and color sums
+"""
+def density_segments(scene: PlotScene, segments, colors):
+    counts = np.zeros(DENSITY_PIXELS * DENSITY_PIXELS, dtype=np.int64)
+    color_sums = np.zeros((counts.size, 3))
+    x0, x1, y0, y1 = scene.extent
+    span = np.array([(x1 - x0), (y1 - y0)]) / DENSITY_PIXELS
+    lengths = np.sqrt((((segments[:, 1] - segments[:, 0]) / span) ** 2).sum(axis=1))
+    lengths *= min(1.0, DENSITY_SAMPLES / max(float(lengths.sum()), 1.0))
+    samples = np.maximum(np.ceil(lengths).astype(np.int64), 1)
+
+    ends = np.cumsum(samples)
+    splits = np.searchsorted(ends, np.arange(DENSITY_CHUNK, int(ends[-1]) if ends.size else 0, DENSITY_CHUNK))
+    for chunk in np.split(np.arange(len(segments)), splits):
+        if chunk.size == 0:
+            continue
+        each = samples[chunk]
+        seg = np.repeat(chunk, each)
+        first = np.repeat(np.cumsum(each) - each, each)
+        t = ((np.arange(seg.size) - first + 0.5) / samples[seg])[:, None]
+        points = segments[seg, 0] + t * (segments[seg, 1] - segments[seg, 0])
+        density_bin(scene, points, colors[seg], counts, color_sums)
+    return counts, color_sums
+
+"""To draw binned counts and color sums as an image layer: each pixel gets the average color of what landed in it,
+and an opacity that grows with the log of how much landed there (up to max_alpha)
+Input: The plot scene, the axis, the counts and color sums, the highest opacity, whether any pixel with something in it is fully opaque, and the z order
+Output:
+"""
+def draw_density_layer(scene: PlotScene, ax, counts, color_sums, max_alpha: float = 1.0, solid: bool = False, zorder: int = 1):
+    image = np.zeros((counts.size, 4))
+    hit = counts > 0
+    image[hit, :3] = color_sums[hit] / counts[hit, None]
+    if solid:
+        image[hit, 3] = max_alpha
+    elif hit.any():
+        image[hit, 3] = max_alpha * (0.2 + 0.8 * np.log1p(counts[hit]) / np.log1p(counts.max()))
+    ax.imshow(image.reshape(DENSITY_PIXELS, DENSITY_PIXELS, 4), origin="lower", extent=scene.extent,
+              interpolation="antialiased", aspect="auto", zorder=zorder)
+
+"""Draw every node in one collection, in its default or component color (or binned onto the pixel grid for a density-aggregated scene)
+"""
+def draw_nodes(scene: PlotScene, ax):
+    if scene.density:
+        counts = np.zeros(DENSITY_PIXELS * DENSITY_PIXELS, dtype=np.int64)
+        color_sums = np.zeros((counts.size, 3))
+        density_bin(scene, scene.xy, scene.node_colors, counts, color_sums, radius=1)
+        draw_density_layer(scene, ax, counts, color_sums, solid=True, zorder=2)
+    else:
+        nodes = ax.scatter(scene.xy[:, 0], scene.xy[:, 1], s=300, c=scene.node_colors)
+        nodes.set_zorder(2)
+    hide_ticks(ax)
 
-    #Group edges of BFS tree by level
-    level_edges = {}
-    for edge in bfs_tree.edges():
-        level_edge_check = level_dir[edge[1]]
-        if level_edge_check not in level_edges:
-            level_edges[level_edge_check] = []
-        level_edges[level_edge_check].append(edge)
+"""Take all the isolate nodes and draw them with a hollow red outline to differentiate them
+Input: The plot scene and the axis to draw on
+Output: A matplot patch that is 2D containing the face color and edge color for a graph
+"""
+def draw_isolates(scene: PlotScene, ax):
+    # draws all isolates, as red pixels in a density-aggregated scene
+    if scene.isolate.any() and scene.density:
+        counts = np.zeros(DENSITY_PIXELS * DENSITY_PIXELS, dtype=np.int64)
+        color_sums = np.zeros((counts.size, 3))
+        red = np.tile(mcolors.to_rgba("red"), (int(scene.isolate.sum()), 1))
+        density_bin(scene, scene.xy[scene.isolate], red, counts, color_sums, radius=1)
+        draw_density_layer(scene, ax, counts, color_sums, solid=True, zorder=2)
+    elif scene.isolate.any():
+        isolates = ax.scatter(
+            scene.xy[scene.isolate, 0],
+            scene.xy[scene.isolate, 1],
+            s=300,
+            c="none",
+            edgecolors="red",
+            linewidths=2.0,
+        )
+        isolates.set_zorder(2)
+    return scene.iso_handle
+
+"""Sets the color and dimension for all edges, drawn as one (rasterized) collection, or binned onto the pixel grid for a density-aggregated scene"""
+def draw_edges(scene: PlotScene, ax):
+    if scene.density:
+        colors = np.tile(mcolors.to_rgba("lightgray"), (len(scene.edge_segments), 1))
+        draw_density_layer(scene, ax, *density_segments(scene, scene.edge_segments, colors), max_alpha=0.7, zorder=1)
+    else:
+        edges = LineCollection(scene.edge_segments, colors="lightgray", linewidths=4.0, alpha=0.7, zorder=1)
+        edges.set_rasterized(True)
+        ax.add_collection(edges)
+    x0, x1, y0, y1 = scene.extent
+    ax.update_datalim([(x0, y0), (x1, y1)])
+    ax.autoscale_view()
+
+"""Sets the size and lable name for numbering all nodes (a density-aggregated scene, or a neighborhood past PLOT_LABEL_NODES nodes, has too many nodes to label)"""
+def draw_lables(scene: PlotScene, ax):
+    if not scene.labeled:
+        return
+    #labeling the node number
+    for (x, y), label in zip(scene.xy.tolist(), scene.core.labels):
+        ax.text(x, y, label, size=12, color="k", family="sans-serif", weight="normal",
+                horizontalalignment="center", verticalalignment="center", transform=ax.transData, clip_on=True)
+
+"""A root's BFS distance and parent arrays over the core ids, from the BFS cache (multi_BFS already ran it)
+"""
+def bfs_levels(core: GraphCore, root):
+    return core_bfs_cache(core).row(core.index[str(root)])
 
-    max_level = max(level_edges.keys(), default=1)
+"""The BFS tree edges from a root as segments, and each edge's level (the level of the node it reaches, starting at 0 for the root's edges)
+"""
+def compute_all_BFS_level(scene: PlotScene, root):
+    # the parent array holds the BFS tree
+    dist, parent = bfs_levels(scene.core, root)
 
-    #level_edges -> ragged array to use for edgelist
-    ragged_edge_array = [level_edges[level] for level in level_edges.keys()]
-    row_in_ragged = []
-    for list_level in level_edges:
-        row_in_ragged.append(level_edges[list_level])
-    return ragged_edge_array, max_level
+    tree = np.flatnonzero(parent >= 0)
+    segments = np.stack([scene.xy[parent[tree]], scene.xy[tree]], axis=1)
+    return segments, dist[tree] - 1
 
-"""Takes the ragged array of levels and the maximum number of levels to create a BFS graph where an edge corresponds to the node's level for that specific root
+"""Draws the BFS tree from a root as one collection, where the color of an edge corresponds to the node's level for that specific root
 """
-def draw_bfs(G, pos, root, ax):
+def draw_bfs(scene: PlotScene, root, ax):
+
+    segments, levels = compute_all_BFS_level(scene, root)
+    num_levels = int(levels.max()) + 1 if levels.size else 0
 
-    ragged_edge_array, max_level = compute_all_BFS_level(G, root)
-        
     #creates a color map for the amout of levels we have
-    norm = mcolors.Normalize(vmin=0, vmax=max_level)
+    norm = mcolors.Normalize(vmin=0, vmax=max(num_levels, 1))
     cmap = cm.hsv
-    
-    #Iterate through and save the colors
-    for i, indv_list in enumerate(ragged_edge_array):
-        color = cmap(norm(i))
-        nx.draw_networkx_edges(
-            G, 
-            pos, 
-            edgelist=indv_list, 
-            edge_color=[color], 
-            width=4.0,
-            ax=ax
-        )
-    
+
+    if scene.density:
+        draw_density_layer(scene, ax, *density_segments(scene, segments, cmap(norm(levels))), zorder=1)
+    else:
+        tree = LineCollection(segments, colors=cmap(norm(levels)), linewidths=4.0, zorder=1)
+        tree.set_rasterized(True)
+        ax.add_collection(tree)
+
     #root node -> different color
-    nx.draw_networkx_nodes(
-        G, 
-        pos, 
-        nodelist=[str(root)], 
-        node_color='red', 
-        linewidths=3.0,
-        ax=ax
-    )    
-    
+    root_xy = scene.xy[scene.core.ids([root])]
+    root_node = ax.scatter(root_xy[:, 0], root_xy[:, 1], s=300, c="red", linewidths=3.0)
+    root_node.set_zorder(2)
+
     # creates the legend for the bfs edges
     bfs_handles = [
         Line2D([0], [0], color=cmap(norm(i)), lw=3, label=f"Level {i}")
-        for i in range(len(ragged_edge_array))
+        for i in range(num_levels)
     ]
     return bfs_handles
 
+"""The k-hop BFS ball around a root as a graph of its own: the nodes at most hops levels from the root (from its levels in the BFS cache) and the edges between them,
+in the whole graph's node order. Every node is as far from the root in the ball as in the whole graph, so its BFS tree is the same
+Input: The whole graph's GraphCore, the root, the number of hops and the root's BFS distances
+Output: The ball's graph and the core ids of its nodes
+"""
+def bfs_ball(core: GraphCore, root, hops: int, dist):
+    ball = np.flatnonzero((dist >= 0) & (dist <= hops))
+    owner, nbr = frontier_pairs(core, ball)
+    # each edge once, between two nodes of the ball
+    keep = (dist[nbr] >= 0) & (dist[nbr] <= hops) & (owner <= nbr)
+    labels = core.labels
+    H = nx.Graph()
+    H.add_nodes_from(labels[i] for i in ball.tolist())
+    H.add_edges_from(zip((labels[i] for i in owner[keep].tolist()), (labels[i] for i in nbr[keep].tolist())))
+    return H, ball
+
+"""What a neighborhood plot leaves out, as summary markers: the root's component past the ball (with the ball's nodes that have neighbors out there),
+then the other components, largest first, PLOT_SUMMARY_COMPONENTS of them on their own and the rest sharing one marker
+Input: The whole graph's GraphCore, the number of hops, the root's BFS distances and the ball's core ids
+Output: A list of (text, node count, component id or None) per marker, and the core ids of the ball's boundary nodes
+"""
+def neighborhood_summaries(core: GraphCore, hops: int, dist, ball):
+    structure = core_structure(core)
+    root_comp = int(structure.comp_id[ball[0]]) if ball.size else -1
+    summaries = []
+    beyond = int(np.count_nonzero(dist > hops))
+    if beyond:
+        summaries.append((f"{beyond} more nodes past {hops} hops", beyond, root_comp))
+
+    edge = ball[dist[ball] == hops]
+    owner, nbr = frontier_pairs(core, edge)
+    boundary = np.unique(owner[dist[nbr] > hops])
+
+    sizes = np.bincount(structure.comp_id, minlength=structure.num_components)
+    others = np.argsort(-sizes, kind="stable")
+    others = others[others != root_comp]
+    for cid in others[:PLOT_SUMMARY_COMPONENTS].tolist():
+        summaries.append((f"Component {cid}: {int(sizes[cid])} nodes", int(sizes[cid]), cid))
+    rest = others[PLOT_SUMMARY_COMPONENTS:]
+    if rest.size:
+        count = int(sizes[rest].sum())
+        summaries.append((f"+{rest.size} more components: {count} nodes", count, None))
+    return summaries, boundary
+
+"""Draws the summary markers of a neighborhood plot in a column right of the ball (a square sized by the log of its node count, in its component's color
+with show_components), with dashed lines from the ball's boundary nodes to the marker for the rest of the root's component
+Input: The ball's plot scene, the axis, the summaries and the boundary's positions from neighborhood_summaries, and whether components are colored
+Output: The legend handle for the markers
+"""
+def draw_summaries(scene: PlotScene, ax, summaries, boundary_xy, show_components: bool):
+    x0, x1, y0, y1 = scene.extent
+    width = x1 - x0
+    x = x1 + 0.15 * width
+    ys = np.linspace(y1, y0, len(summaries) + 2)[1:-1] if len(summaries) > 1 else [(y0 + y1) / 2] * len(summaries)
+    for (text, count, cid), y in zip(summaries, ys):
+        color = cm.tab20(cid) if show_components and cid is not None else "lightgray"
+        ax.scatter([x], [y], s=100 + 60 * math.log2(count + 1), c=[color], marker="s", edgecolors="black", zorder=2)
+        ax.text(x + 0.06 * width, y, text, size=9, horizontalalignment="left", verticalalignment="center", clip_on=False)
+
+    # boundary nodes only exist when there is more of the root's component, which is the first marker
+    if len(boundary_xy):
+        stubs = np.stack([boundary_xy, np.tile([x, ys[0]], (len(boundary_xy), 1))], axis=1)
+        ax.add_collection(LineCollection(stubs, colors="gray", linestyles="dashed", linewidths=1.0, alpha=0.5, zorder=1))
+    if summaries:
+        ax.update_datalim([(x + 0.6 * width, y0), (x + 0.6 * width, y1)])
+        ax.autoscale_view()
+    return Line2D([0], [0], marker="s", color="none", markerfacecolor="lightgray", markeredgecolor="black", markersize=10, label="Collapsed nodes")
+
 
 
 
 # Plotting  Function
 # ====================================================================================================
-"""Takes all the helper functions to create either:
+"""To show a finished figure, or with out, save it to that file (the format comes from its extension) without a display
+"""
+def show_plot(fig, out: str = None):
+    if out is None:
+        plt.show()
+        plt.clf()
+    else:
+        fig.savefig(out, dpi=100)
+        plt.close(fig)
+        print(f"Plot saved to {out}")
+
+"""Draws the k-hop neighborhood of a root on one axis (--plot_hops): only the ball (bfs_ball) is laid out and drawn, with its BFS levels,
+and the rest of the graph is collapsed into summary markers, so drawing it takes time for the size of the ball rather than of the graph
+"""
+def draw_neighborhood(G, root, hops: int, ax, show_components: bool, layout: str, use_cache: bool, density_edges: int):
+    core = graph_core(G)
+    dist, _ = bfs_levels(core, root)
+    H, ball = bfs_ball(core, root, hops, dist)
+    pos = graph_layout(H, layout, LAYOUT_SEED, use_cache)
+    structure = core_structure(core)
+    scene = PlotScene(H, pos, show_components, density_edges, comp_id=structure.comp_id[ball], isolate=structure.isolate[ball], label_nodes=PLOT_LABEL_NODES)
+
+    draw_nodes(scene, ax)
+    iso_handle = draw_isolates(scene, ax)
+    draw_edges(scene, ax)
+    bfs_handles = draw_bfs(scene, root, ax)
+    draw_lables(scene, ax)
+
+    summaries, boundary = neighborhood_summaries(core, hops, dist, ball)
+    summary_handle = draw_summaries(scene, ax, summaries, scene.xy[np.searchsorted(ball, boundary)], show_components)
+    ax.set_title(f"BFS from root {root} ({hops} hops: {ball.size} of {core.n} nodes)")
+
+    combined_handles = []
+    if show_components:
+        combined_handles += scene.comp_handles
+    combined_handles += bfs_handles
+    combined_handles.append(iso_handle)
+    if summaries:
+        combined_handles.append(summary_handle)
+    ax.legend(handles=combined_handles, title="Legend", loc="best")
+
+"""Takes all the helper functions, with the nodes placed by graph_layout, to create either:
 -if no bfs was called: the isolated nodes a different color and a regular graph with edges
 -if bfs was previously called: create a graph for each root node, and the color of the edges corresponds to the node's bfs level
+-with hops: create a graph for each root node of only its neighborhood up to that many BFS levels (draw_neighborhood)
 """
-def plot_graph(G, root_nodes, show_components):
-    seed = 951369
-    pos = nx.spring_layout(G, seed=seed)
+def plot_graph(G, root_nodes, show_components, layout: str = "spring", use_cache: bool = True, out: str = None, density_edges: int = PLOT_DENSITY_EDGES, hops: int = None):
+    import_plotting(headless=out is not None)
+
+    # a neighborhood plot lays out only each root's neighborhood, never the whole graph
+    if hops is not None and root_nodes:
+        fig, axes = plt.subplots(1, len(root_nodes), figsize=(8 * len(root_nodes), 6))
+        if len(root_nodes) == 1:
+            axes = [axes]
+        for ax, root in zip(axes, root_nodes):
+            draw_neighborhood(G, root, hops, ax, show_components, layout, use_cache, density_edges)
+        plt.tight_layout()
+        show_plot(fig, out)
+        return
+
+    pos = graph_layout(G, layout, LAYOUT_SEED, use_cache)
+    scene = PlotScene(G, pos, show_components, density_edges)
     
     #if bfs isnt done and there are no roots
     if len(root_nodes) < 1:
         fig, ax = plt.subplots(1, 1, figsize=(7, 7))
         
         combined_handles = []
+        draw_nodes(scene, ax)
         #if show_components is called in the comand line
         if show_components:
-            comp_handles = draw_component_nodes(G, pos, ax)
-            combined_handles += comp_handles
-        else:
-            draw_default_nodes(G, pos, ax)
+            combined_handles += scene.comp_handles
             
-        iso_handle = draw_isolates(G, pos, ax)
+        iso_handle = draw_isolates(scene, ax)
         combined_handles.append(iso_handle)
         
-        draw_edges(G, pos, ax)
+        draw_edges(scene, ax)
                 
         # adds lables to the nodes not required i just added this in when i was verifying the graph will delete later
-        draw_lables(G, pos, ax)
+        draw_lables(scene, ax)
 
         #combines all legend handles into one legend
         if combined_handles:
             ax.legend(handles=combined_handles, title="Legend", loc="best")
             
-        plt.show()
-        plt.clf()
+        show_plot(fig, out)
     #if bfs is done and there are roots
     else: 
         # Make subplots: 1 row, N columns
         fig, axes = plt.subplots(1, len(root_nodes), figsize=(6 * len(root_nodes), 6))
         if len(root_nodes) == 1:
             axes = [axes]  # keep it iterable
-        #loop to make a one sub plot per root
+        #loop to make a one sub plot per root, all drawn from the same scene
         for ax, root in zip(axes,root_nodes):
-            #if show components was called in cmd line
-            if show_components:
-                comp_handles = draw_component_nodes(G, pos, ax)
-            else:
-                draw_default_nodes(G, pos, ax) 
-            
-            iso_handle = draw_isolates(G, pos, ax)
-            draw_edges(G, pos, ax)
+            draw_nodes(scene, ax)
+            iso_handle = draw_isolates(scene, ax)
+            draw_edges(scene, ax)
                                     
             #Highlighting BFS route
-            bfs_handles = draw_bfs(G, pos, root, ax)
+            bfs_handles = draw_bfs(scene, root, ax)
             
-            draw_lables(G, pos, ax)
+            draw_lables(scene, ax)
             
             ax.set_title(f"BFS from root {root}")
             
             #combines legend handles and outputs them to a single legend
             combined_handles = []
-            if show_components and comp_handles:
-                combined_handles += comp_handles
+            if show_components:
+                combined_handles += scene.comp_handles
             combined_handles += bfs_handles
             combined_handles.append(iso_handle)  
             
             ax.legend(handles=combined_handles, title="Legend", loc="best")
             
         plt.tight_layout()
-        plt.show()
+        show_plot(fig, out)
+
+
+
+
+# Sweep Functions
+# ====================================================================================================
+SWEEP_FIELDS = ("n", "c", "p", "rep", "seed", "edges", "components", "giant_fraction", "isolates", "connected", "seconds")
+
+"""The seed of one sweep point, worked out from the base seed and the point itself (not its place in the grid), so the same point always gets the same graph
+and any row can be rebuilt with --create_random_graph n c --seed seed
+Input: The base seed, n, c and the repetition number
+Output: An int seed
+"""
+def sweep_seed(base_seed: int, n: int, c: float, rep: int) -> int:
+    c_bits = int(np.float64(c).view(np.uint64))
+    return int(np.random.SeedSequence([base_seed, n, c_bits, rep]).generate_state(1, np.uint32)[0])
+
+"""One sweep point: the G(n, p) edges with p = c * ln(n) / n, as create_random_graph makes them, and only the connectivity statistics, straight from the edge arrays
+(no NetworkX graph or GraphCore is built)
+Input: n, c, the repetition number and its seed
+Output: A dict with a value for each of SWEEP_FIELDS
+"""
+def sweep_point(n: int, c: float, rep: int, seed: int) -> dict:
+    start = time.perf_counter()
+    p = (c * math.log(n)) / n
+    src, dst = erdos_renyi_edges(n, p, seed)
+
+    u = np.concatenate([src, dst]).astype(np.intp)
+    v = np.concatenate([dst, src]).astype(np.intp)
+    roots = component_roots(n, u, v)
+    sizes = np.bincount(roots, minlength=n)
+    components = int(np.count_nonzero(sizes))
+    isolates = n - int(np.count_nonzero(np.bincount(u, minlength=n)))
+
+    return {
+        "n": n, "c": c, "p": p, "rep": rep, "seed": seed, "edges": int(src.size),
+        "components": components,
+        "giant_fraction": int(sizes.max()) / n,
+        "isolates": isolates,
+        "connected": components == 1,
+        "seconds": round(time.perf_counter() - start, 6),
+    }
+
+"""pool.map only hands one argument to each call
+"""
+def sweep_job(point: tuple) -> dict:
+    return sweep_point(*point)
+
+"""To run every (n, c) grid point reps times across a process pool and write one CSV row per run, in grid order, as the results come in
+Input: The lists of n and c values, the number of repetitions, the base seed, the open CSV file and the number of worker processes
+Output: The number of rows written
+"""
+def run_sweep(ns: list, cs: list, reps: int, base_seed: int, out, workers: int = 1) -> int:
+    points = [(n, c, rep, sweep_seed(base_seed, n, c, rep)) for n in ns for c in cs for rep in range(reps)]
+    writer = csv.DictWriter(out, fieldnames=SWEEP_FIELDS)
+    writer.writeheader()
+
+    if workers <= 1 or len(points) <= 1:
+        results = map(sweep_job, points)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(min(workers, len(points)))
+        results = pool.map(sweep_job, points)
+    try:
+        for row in results:
+            writer.writerow(row)
+            out.flush()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return len(points)
+
+
+
+
+# Batch Functions
+# ====================================================================================================
+"""To read a --batch manifest: one graph per line, its input .gml (or .gml.gz) path and optionally the path to save it to after the analysis.
+Relative paths are relative to the manifest's folder, and blank lines and anything after a # are ignored
+Input: The manifest's path
+Output: A list of (input path, output path or None) tuples
+"""
+def read_manifest(path: str) -> list:
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            words = line.split("#", 1)[0].split()
+            if not words:
+                continue
+            if len(words) > 2:
+                raise ValueError(f"line {line_no}: expected an input path and at most one output path")
+            paths = [os.path.join(base, word) for word in words]
+            for p in paths:
+                if not p.endswith((".gml", ".gml.gz")):
+                    raise ValueError(f"line {line_no}: {p} must be a .gml file")
+            jobs.append((paths[0], paths[1] if len(paths) == 2 else None))
+    return jobs
+
+"""To run --multi_BFS and --analyze on a loaded graph like a single run does, attaching the results to the graph, for batch_job and the server's export
+Input: The graph and a dict of options (roots, analyze, avg_path_samples, avg_path_per_component, diameter, clustering, seed)
+Output: A dict of the results, raises ValueError for roots that aren't in the graph
+"""
+def analyze_graph(G: nx.Graph, options: dict) -> dict:
+    result = {}
+    roots = options["roots"]
+    if roots:
+        missing = [r for r in roots if r not in G]
+        if missing:
+            raise ValueError(f"--multi_BFS root(s) {missing} not in the graph")
+        result["multi_BFS"] = {
+            root: {"reached": int((dist >= 0).sum()), "depth": int(dist.max())}
+            for root, dist, _ in multi_BFS(G, roots).rows()
+        }
+        if options["analyze"]:
+            attach_bfs_meta(G, *compute_bfs_meta(G, roots))
+
+    if options["analyze"]:
+        structure = analyze_structure(G)
+        attach_components_meta(G, analyze_components(G))
+        attach_component_ids(G, structure.comp_id)
+        attach_cycles_meta(G, analyze_cycles(G))
+        analyze_isolates(G)
+        attach_isolate_attr(G, structure.isolate)
+        attach_density_meta(G, analyze_density(G))
+        avg_path = analyze_avg_shortest_path(G, options["avg_path_samples"], options["avg_path_per_component"], 1, options["seed"])
+        attach_avg_shortest_path_meta(G, avg_path)
+        result.update(
+            num_components=structure.num_components,
+            has_cycle=bool(structure.has_cycle),
+            isolates=int(structure.isolate.sum()),
+            density=structure.density,
+            avg_shortest_path=avg_path.avg_len,
+        )
+        if avg_path.ci is not None:
+            result["avg_shortest_path_ci"] = list(avg_path.ci)
+        if avg_path.per_component is not None:
+            result["avg_shortest_path_per_component"] = avg_path.per_component
+        if options["diameter"]:
+            ecc = analyze_diameter_radius(G)
+            attach_diameter_meta(G, ecc)
+            if structure.num_components == 1:
+                result.update(diameter=int(ecc.diameter[0]), radius=int(ecc.radius[0]))
+            else:
+                result.update(diameter_per_component=ecc.diameter.tolist(), radius_per_component=ecc.radius.tolist())
+            result["eccentricity_bfs_runs"] = ecc.bfs_runs
+        if options["clustering"]:
+            tri = analyze_clustering(G)
+            attach_clustering_meta(G, tri)
+            result.update(num_triangles=tri.num_triangles, avg_clustering=tri.avg_clustering, transitivity=tri.transitivity)
+    return result
+
+"""One --batch pipeline, run in a worker process: load_gml, --multi_BFS and --analyze (analyze_graph) and save_gml for one graph. The usual printed output goes to stderr,
+so stdout only has the JSON lines
+Input: The input path, the output path (or None) and a dict of the options every graph in the batch is run with
+Output: A dict of the graph's results, with "ok" false and the "error" when something went wrong
+"""
+def batch_job(input_path: str, output_path: str, options: dict) -> dict:
+    start = time.perf_counter()
+    result = {"input": input_path, "output": output_path}
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            G = load_gml(input_path, use_cache=options["use_cache"])
+            result.update(nodes=G.number_of_nodes(), edges=G.number_of_edges())
+            result.update(analyze_graph(G, options))
+            if output_path:
+                save_gml(G, output_path)
+        result["ok"] = True
+    except Exception as err:
+        # one bad graph is reported and the rest of the batch carries on
+        result["ok"] = False
+        result["error"] = f"{type(err).__name__}: {err}"
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+"""To run every graph in a manifest through batch_job across a process pool, printing each graph's results as one JSON line as soon as it finishes.
+With one worker (or one graph) the jobs run in this process in manifest order, without starting a pool
+Input: The manifest's jobs, the options for batch_job and the number of worker processes
+Output: The number of graphs that failed
+"""
+def run_batch(jobs: list, options: dict, workers: int) -> int:
+    failed = 0
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        results = pool_batch_results(jobs, options, workers)
+    else:
+        results = (batch_job(input_path, output_path, options) for input_path, output_path in jobs)
+    for result in results:
+        failed += not result["ok"]
+        print(json.dumps(result), flush=True)
+    print(f"batch: {len(jobs) - failed} of {len(jobs)} graphs done, {failed} failed", file=sys.stderr)
+    return failed
+
+"""To run batch jobs over a process pool, yielding each graph's results as it finishes. batch_job catches a graph's own errors, but not a worker dying
+(killed for memory, a crash in native code) or a result that can't be sent back: the last one is that graph's error line, and a dead worker breaks the
+whole pool, failing every graph still in it. Those graphs are run again, each in a pool of its own, so only the one that kills its worker is reported
+and the rest of the batch carries on
+Input: The manifest's jobs, the options for batch_job and the number of worker processes
+Output: A generator of batch_job result dicts, one per job
+"""
+def pool_batch_results(jobs: list, options: dict, workers: int):
+    pending, alone = list(jobs), False
+    while pending:
+        broken = []
+        for group in ([job] for job in pending) if alone else [pending]:
+            with concurrent.futures.ProcessPoolExecutor(min(workers, len(group))) as pool:
+                futures = {pool.submit(batch_job, input_path, output_path, options): (input_path, output_path) for input_path, output_path in group}
+                for future in concurrent.futures.as_completed(futures):
+                    input_path, output_path = futures[future]
+                    try:
+                        yield future.result()
+                    except concurrent.futures.BrokenExecutor as err:
+                        if not alone:
+                            broken.append((input_path, output_path))
+                            continue
+                        yield {"input": input_path, "output": output_path, "ok": False, "error": f"worker process died: {type(err).__name__}: {err}"}
+                    except Exception as err:
+                        yield {"input": input_path, "output": output_path, "ok": False, "error": f"{type(err).__name__}: {err}"}
+        pending, alone = broken, True
+
+
+
+
+# Server Functions
+# ====================================================================================================
+# the longest request line the server reads (asyncio's default is 64 KiB, a few thousand node ids in a bfs request's "nodes")
+SERVER_LINE_LIMIT = 1 << 26
+
+"""Raised for a request that can't be answered as asked (an unknown op, graph or node), answered with just its message
+"""
+class RequestError(ValueError):
+    pass
+
+# the types a request field can be asked for as: a check of the JSON value and how it is described in the error
+REQUEST_FIELD_TYPES = {
+    "str": (lambda value: isinstance(value, str), "a string"),
+    "bool": (lambda value: isinstance(value, bool), "true or false"),
+    "int": (lambda value: isinstance(value, int) and not isinstance(value, bool), "an integer"),
+    "nodes": (lambda value: isinstance(value, list) and all(isinstance(v, str) for v in value), "a list of node id strings"),
+}
+
+"""To read a field of a request, checking its type up front so a malformed request gets a clear error instead of failing halfway through
+Input: The request, the field's name and type (a key of REQUEST_FIELD_TYPES), whether it has to be there, and the value a missing (or null) optional field takes
+Output: The field's value, raises RequestError for a missing required field or a value of the wrong type
+"""
+def request_field(request: dict, name: str, kind: str, required: bool = False, default=None):
+    value = request.get(name)
+    if value is None:
+        if required:
+            raise RequestError(f"missing {name!r} field")
+        return default
+    check, description = REQUEST_FIELD_TYPES[kind]
+    if not check(value):
+        raise RequestError(f"{name!r} must be {description}, got {json.dumps(value)[:100]}")
+    return value
+
+"""A graph the server has loaded. Requests on it run one at a time (lock), since the cached analysis and the attached metadata are shared by all of them.
+No request changes a served graph, so its core (and the structure analysis kept with it) is looked up once here. A BFS request is one multi-source core_bfs,
+the same pass as compute_bfs_meta
+"""
+class ServedGraph:
+    def __init__(self, G: nx.Graph, path: str):
+        self.G = G
+        self.path = path
+        self.lock = threading.Lock()
+        self.core = graph_core(G)
+        self.component_sizes = None
+
+    """To turn node labels from a request into core ids
+    Input: A list of node labels
+    Output: An int array of their core ids, raises RequestError for a node that isn't in the graph
+    """
+    def ids(self, nodes: list) -> np.ndarray:
+        for v in nodes:
+            if str(v) not in self.core.index:
+                raise RequestError(f"unknown node {str(v)!r}")
+        return self.core.ids(nodes)
+
+"""Long-running --serve mode: loads graphs once and answers JSON line requests ({"op": ..., "graph": name, ...}, one per line, each answered with one line) from memory.
+Requests that touch a graph run on a thread pool, so the event loop keeps reading and answering other connections while a BFS or an export runs.
+Threads rather than processes: a request works on the loaded graph in place, keeping its core and structure analysis for every later request to reuse,
+where a process would get a pickled copy of the NetworkX graph (slower to send than a BFS over its core takes) and lose whatever it cached. Requests on one graph
+run one at a time under its lock either way, so a process pool would only help requests on different graphs
+"""
+class GraphServer:
+    def __init__(self, workers: int, folder: str = "."):
+        self.graphs = {}
+        self.pool = concurrent.futures.ThreadPoolExecutor(workers)
+        # load and export requests only read and write files in here (--serve_dir), since any client that reaches the socket can send them
+        self.folder = os.path.realpath(folder)
+
+    """To turn a path from a request into a file in the served folder: relative to it, with symlinks and .. resolved, and refused if it ends up outside it
+    Input: The path from the request
+    Output: The resolved path, raises RequestError for a path outside the folder
+    """
+    def resolve(self, path: str) -> str:
+        full = os.path.realpath(os.path.join(self.folder, path))
+        if os.path.commonpath([full, self.folder]) != self.folder:
+            raise RequestError(f"path {path!r} is outside the served directory")
+        return full
+
+    """To answer the requests of one connection in order until it closes
+    """
+    async def handle(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError as err:
+                    # the last request doesn't need a newline after it
+                    line = err.partial
+                    if not line:
+                        break
+                except asyncio.LimitOverrunError as err:
+                    # a line past the limit is skipped and answered with an error, and the connection carries on with the next one
+                    await skip_line(reader, err.consumed)
+                    line = None
+                if line is not None and not line.strip():
+                    continue
+                request = {}
+                try:
+                    if line is None:
+                        raise RequestError(f"request line longer than {SERVER_LINE_LIMIT} bytes")
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise RequestError("a request must be a JSON object")
+                    response = {"ok": True, **await self.dispatch(request)}
+                except RequestError as err:
+                    response = {"ok": False, "error": str(err)}
+                except Exception as err:
+                    # a bad request gets an error line and the connection carries on
+                    response = {"ok": False, "error": f"{type(err).__name__}: {err}"}
+                if "id" in request:
+                    response["id"] = request["id"]
+                response["seconds"] = round(time.perf_counter() - start, 6)
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {}
+        if op == "graphs":
+            return {"graphs": {name: {"path": served.path, "nodes": served.G.number_of_nodes(), "edges": served.G.number_of_edges()} for name, served in self.graphs.items()}}
+        handler = SERVER_OPS.get(op) if isinstance(op, str) else None
+        if handler is None:
+            raise RequestError(f"unknown op {op!r}, expected one of {['ping', 'graphs', *SERVER_OPS]}")
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, self.run_op, handler, request)
+
+    def run_op(self, handler, request: dict) -> dict:
+        if handler is server_load:
+            return server_load(self, request)
+        name = request_field(request, "graph", "str", required=True)
+        if name not in self.graphs:
+            raise RequestError(f"no graph loaded as {name!r}")
+        served = self.graphs[name]
+        if handler is server_export:
+            request = {**request, "path": self.resolve(request_field(request, "path", "str", required=True))}
+        with served.lock:
+            if handler is server_unload:
+                return server_unload(self, request)
+            return handler(served, request)
+
+"""To drop the rest of a request line that went past SERVER_LINE_LIMIT, reading it a buffer at a time
+Input: The connection's StreamReader and the bytes of the line it has buffered (LimitOverrunError.consumed)
+Output: raises asyncio.IncompleteReadError if the connection closes before the line ends
+"""
+async def skip_line(reader, consumed: int):
+    import asyncio
+    while True:
+        await reader.readexactly(consumed)
+        try:
+            await reader.readuntil(b"\n")
+            return
+        except asyncio.LimitOverrunError as err:
+            consumed = err.consumed
+
+"""The following functions answer one request op each on the server's thread pool: load and unload a graph, the multi-source BFS metadata for some roots,
+the component of a node, the isolates, the density, and an export of the graph (with --multi_BFS/--analyze metadata) to GML
+"""
+def server_load(server: GraphServer, request: dict) -> dict:
+    path = request_field(request, "path", "str", required=True)
+    name = request_field(request, "graph", "str", default=path)
+    G = load_gml(server.resolve(path), use_cache=request_field(request, "cache", "bool", default=True))
+    server.graphs[name] = ServedGraph(G, path)
+    return {"graph": name, "nodes": G.number_of_nodes(), "edges": G.number_of_edges()}
+
+def server_unload(server: GraphServer, request: dict) -> dict:
+    del server.graphs[request["graph"]]
+    return {"graph": request["graph"]}
+
+def server_bfs(served: ServedGraph, request: dict) -> dict:
+    core = served.core
+    roots = request_field(request, "roots", "nodes", required=True)
+    if not roots:
+        raise RequestError("'roots' must be a non-empty list of nodes in the graph")
+    root_ids = served.ids(roots)
+    nodes = request_field(request, "nodes", "nodes")
+    if nodes is not None:
+        ids = served.ids(nodes)
+    else:
+        nodes, ids = core.labels, np.arange(core.n)
+    dist, parent, source = core_bfs(core, root_ids)
+    labels = core.labels
+    return {
+        "nodes": list(nodes),
+        "dist": [d if d >= 0 else None for d in dist[ids].tolist()],
+        "source": [labels[s] if s >= 0 else None for s in source[ids].tolist()],
+        "parent": [labels[p] if p >= 0 else None for p in parent[ids].tolist()],
+    }
+
+def server_component(served: ServedGraph, request: dict) -> dict:
+    core = served.core
+    structure = core_structure(core)
+    if served.component_sizes is None:
+        served.component_sizes = np.bincount(structure.comp_id, minlength=structure.num_components)
+    node = request_field(request, "node", "str", required=True)
+    cid = int(structure.comp_id[served.ids([node])[0]])
+    return {"node": node, "componentID": cid, "size": int(served.component_sizes[cid]), "num_components": structure.num_components}
+
+def server_isolates(served: ServedGraph, request: dict) -> dict:
+    labels = served.core.labels
+    return {"isolates": [labels[v] for v in np.flatnonzero(core_structure(served.core).isolate).tolist()]}
+
+def server_density(served: ServedGraph, request: dict) -> dict:
+    return {"density": core_structure(served.core).density}
+
+"""To give an export its own graph to attach metadata to, so one export's attributes (dist, componentID, diameter, ...) never end up in the served graph or a later export.
+The copy has its own graph attributes, node attribute dicts and core columns, but the same neighbor order (which BFS ties follow, unlike G.copy()) and shares the core's
+arrays and cached analysis instead of building them again, since an export never changes the edges
+Input: The served graph
+Output: The copy
+"""
+def export_copy(G: nx.Graph) -> nx.Graph:
+    H = G.__class__()
+    H.graph.update(G.graph)
+    H.add_nodes_from(G.nodes(data=True))
+    for v, nbrs in G._adj.items():
+        H._adj[v] = dict(nbrs)
+    core = copy.copy(graph_core(G))
+    core.columns = dict(core.columns)
+    set_graph_core(H, core)
+    return H
+
+def server_export(served: ServedGraph, request: dict) -> dict:
+    path = request_field(request, "path", "str", required=True)
+    options = {
+        "roots": request_field(request, "roots", "nodes", default=[]),
+        "analyze": request_field(request, "analyze", "bool", default=False),
+        "avg_path_samples": request_field(request, "avg_path_samples", "int"),
+        "avg_path_per_component": request_field(request, "avg_path_per_component", "bool", default=False),
+        "diameter": request_field(request, "diameter", "bool", default=False),
+        "clustering": request_field(request, "clustering", "bool", default=False),
+        "seed": request_field(request, "seed", "int"),
+    }
+    if options["avg_path_samples"] is not None and options["avg_path_samples"] <= 0:
+        raise RequestError("'avg_path_samples' must be > 0")
+    G = export_copy(served.G)
+    result = analyze_graph(G, options)
+    save_gml(G, path)
+    return {"path": path, **result}
+
+SERVER_OPS = {
+    "load": server_load,
+    "unload": server_unload,
+    "bfs": server_bfs,
+    "component": server_component,
+    "isolates": server_isolates,
+    "density": server_density,
+    "export": server_export,
+}
+
+"""To run the server on a local socket until it is interrupted: host:port for TCP, anything else is the path of a Unix socket.
+graph.py's usual printed output goes to stderr, so it doesn't mix with anything on stdout
+Input: The address and the number of worker threads
+Output:
+"""
+def run_server(address: str, workers: int, folder: str = "."):
+    # asyncio is only imported in --serve mode, like matplotlib it would otherwise be a good part of every run's start up time
+    import asyncio
+    server = GraphServer(workers, folder)
+    host, _, port = address.rpartition(":")
+
+    async def serve():
+        if host and port.isdigit():
+            listener = await asyncio.start_server(server.handle, host, int(port), limit=SERVER_LINE_LIMIT)
+        else:
+            listener = await asyncio.start_unix_server(server.handle, address, limit=SERVER_LINE_LIMIT)
+        print(f"serving on {address} with {workers} workers, files in {server.folder}", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.pool.shutdown(cancel_futures=True)
+        if not (host and port.isdigit()):
+            with contextlib.suppress(OSError):
+                os.remove(address)
+
+
+
+
+# Edge List Functions
+# ====================================================================================================
+# edge pairs read from the memory-mapped edge list (or neighbor pairs expanded from its on-disk neighbor lists) per step, which bounds the working memory past the per-node arrays
+EDGE_LIST_CHUNK = 1 << 22
+EDGE_LIST_DTYPES = ("int32", "int64")
+
+"""The labels of a graph whose nodes are 0..n-1 ("0", "1", ...), made when they are asked for instead of kept as a list of n strings
+"""
+class IdLabels:
+    def __init__(self, n: int):
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [str(v) for v in range(*i.indices(self.n))]
+        return str(i)
+
+"""A graph too big for a NetworkX graph, read from a flat binary edge list (pairs of int32 or int64 node ids) through a memory map. An edge listed more than once
+(either way round) is one edge, like in an nx.Graph, so m and the degrees are counted after build_neighbors drops the repeats.
+Only per-node arrays are kept in memory (degrees and the neighbor list offsets). The neighbor lists themselves are written to a temporary file next to the
+edge list by build_neighbors and memory-mapped, so indptr/indices work with frontier_pairs like a GraphCore's. Nodes are 0..n-1, n is one more than the largest id unless given
+"""
+class EdgeListGraph:
+    def __init__(self, path: str, dtype: str = "int32", n: int = None):
+        self.path = path
+        itemsize = np.dtype(dtype).itemsize
+        size = os.path.getsize(path)
+        if size % (2 * itemsize):
+            raise ValueError(f"{path} is {size} bytes, not a whole number of {dtype} pairs")
+        lines = size // (2 * itemsize)
+        self.edges = np.memmap(path, dtype=dtype, mode="r", shape=(lines, 2)) if lines else np.empty((0, 2), dtype=dtype)
+
+        largest = -1
+        for src, dst in self.chunks():
+            if src.size:
+                if min(int(src.min()), int(dst.min())) < 0:
+                    raise ValueError(f"{path} has negative node ids")
+                largest = max(largest, int(src.max()), int(dst.max()))
+        if n is None:
+            n = largest + 1
+        elif largest >= n:
+            raise ValueError(f"{path} has node id {largest}, but the graph only has {n} nodes")
+        self.n = n
+        self.labels = IdLabels(n)
+        self.columns = {}
+        self.neighbors_path = None
+        self.indptr = self.indices = None
+
+        # a self loop is only one neighbor of its node, like in a GraphCore. These count repeated edges until build_neighbors drops them
+        self.degree = np.zeros(n, dtype=np.int64)
+        for src, dst in self.chunks():
+            self.degree += np.bincount(src, minlength=n)
+            self.degree += np.bincount(dst[src != dst], minlength=n)
+        self.m = None
+        try:
+            self.build_neighbors()
+        except BaseException:
+            self.close()
+            raise
+
+    """To go through the edge list a chunk of EDGE_LIST_CHUNK edges at a time
+    Output: (sources, targets) intp arrays per chunk
+    """
+    def chunks(self):
+        for lo in range(0, len(self.edges), EDGE_LIST_CHUNK):
+            pairs = np.asarray(self.edges[lo:lo + EDGE_LIST_CHUNK], dtype=np.intp)
+            yield pairs[:, 0], pairs[:, 1]
+
+    """To write every node's neighbor list to a temporary file in CSR layout, the same order core_from_edges gives (each node's neighbors in edge list order),
+    with one counting sort pass over the edge list a chunk at a time. Then a pass over the lists, a piece of nodes at a time, keeps each neighbor only where it
+    first appears (the neighbor order an nx.Graph built from the same edges has) and moves the lists down over the dropped entries, and m and the degrees are counted again
+    """
+    def build_neighbors(self):
+        if self.indices is not None:
+            return
+        self.indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=self.indptr[1:])
+        total = int(self.indptr[-1])
+        id_dtype = np.int32 if self.n < 2**31 else np.int64
+
+        fd, self.neighbors_path = tempfile.mkstemp(suffix=".neighbors", dir=os.path.dirname(os.path.abspath(self.path)))
+        os.close(fd)
+        if total == 0:
+            self.indices = np.empty(0, dtype=id_dtype)
+            self.m = 0
+            return
+        self.indices = np.memmap(self.neighbors_path, dtype=id_dtype, mode="w+", shape=(total,))
+
+        cursor = self.indptr[:-1].copy()
+        for src, dst in self.chunks():
+            keep = np.ones(2 * src.size, dtype=bool)
+            keep[1::2] = src != dst
+            heads = np.column_stack((src, dst)).reshape(-1)[keep]
+            tails = np.column_stack((dst, src)).reshape(-1)[keep]
+            order = np.argsort(heads, kind="stable")
+            heads, tails = heads[order], tails[order]
+
+            # each head's neighbors from this chunk go after the ones earlier chunks put there
+            starts = np.flatnonzero(np.r_[True, heads[1:] != heads[:-1]])
+            counts = np.diff(np.r_[starts, heads.size])
+            offsets = np.arange(heads.size) - np.repeat(starts, counts)
+            self.indices[cursor[heads] + offsets] = tails
+            cursor[heads[starts]] += counts
+
+        # every piece is read before it is written back, and always to where it was or further down, so later pieces are still intact when they are read
+        degree = np.zeros(self.n, dtype=np.int64)
+        kept = self_loops = 0
+        for piece in frontier_batches(self, np.arange(self.n, dtype=np.intp)):
+            rows, nbrs = frontier_pairs(self, piece)
+            order = np.lexsort((nbrs, rows))
+            repeat = np.zeros(rows.size, dtype=bool)
+            repeat[order[1:]] = (rows[order[1:]] == rows[order[:-1]]) & (nbrs[order[1:]] == nbrs[order[:-1]])
+            rows, nbrs = rows[~repeat], nbrs[~repeat]
+            self.indices[kept:kept + nbrs.size] = nbrs
+            kept += nbrs.size
+            self_loops += int(np.count_nonzero(rows == nbrs))
+            degree[piece] = np.bincount(rows - piece[0], minlength=piece.size)
+        self.degree = degree
+        np.cumsum(degree, out=self.indptr[1:])
+        self.indices.flush()
+        self.indices = self.indices[:kept]
+        self.m = (kept - self_loops) // 2 + self_loops
+
+    """To remove the temporary neighbor list file
+    """
+    def close(self):
+        self.indices = None
+        if self.neighbors_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(self.neighbors_path)
+            self.neighbors_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+"""To split a frontier into pieces whose neighbor lists add up to at most EDGE_LIST_CHUNK entries (a node with a longer list is a piece by itself)
+Input: An EdgeListGraph and an int array of node ids
+Output: The pieces, as int arrays
+"""
+def frontier_batches(graph: EdgeListGraph, frontier):
+    ends = np.cumsum(graph.degree[frontier])
+    lo = 0
+    while lo < frontier.size:
+        hi = max(int(np.searchsorted(ends, (ends[lo - 1] if lo else 0) + EDGE_LIST_CHUNK, side="right")), lo + 1)
+        yield frontier[lo:hi]
+        lo = hi
+
+"""Multi-source BFS over an EdgeListGraph's on-disk neighbor lists, one level at a time, reading only the frontier's neighbor lists a bounded piece at a time.
+Gives the same arrays as compute_bfs_meta (core_bfs): the frontier is kept in the order a FIFO queue would reach it, and each newly reached node keeps the first frontier
+node (in that order) that lists it, which is its parent, and that node's source. A node reached by an earlier piece of the frontier is skipped by the later ones
+Input: An EdgeListGraph and a list of root ids
+Output: int32 arrays of dist, parent and source per node (-1 is undefined)
+"""
+def edge_list_bfs_meta(graph: EdgeListGraph, root_ids):
+    graph.build_neighbors()
+    n = graph.n
+    dist = np.full(n, -1, dtype=np.int32)
+    parent = np.full(n, -1, dtype=np.int32)
+    source = np.full(n, -1, dtype=np.int32)
+
+    # duplicate roots only count the first time they are listed
+    root_ids = np.asarray(root_ids, dtype=np.int64)
+    _, first = np.unique(root_ids, return_index=True)
+    frontier = root_ids[np.sort(first)]
+    dist[frontier] = 0
+    source[frontier] = frontier
+
+    level = 0
+    while frontier.size:
+        level += 1
+        reached = []
+        for piece in frontier_batches(graph, frontier):
+            owner, nbrs = frontier_pairs(graph, piece)
+            unvisited = dist[nbrs] == -1
+            owner, nbrs = owner[unvisited], nbrs[unvisited].astype(np.intp)
+            _, first = np.unique(nbrs, return_index=True)
+            first.sort()
+            new = nbrs[first]
+            dist[new] = level
+            parent[new] = owner[first]
+            source[new] = source[owner[first]]
+            reached.append(new)
+        frontier = np.concatenate(reached) if reached else np.empty(0, dtype=np.intp)
+
+    return dist, parent, source
+
+"""The structure --analyze reports for an EdgeListGraph, from passes over the edge list a chunk at a time: each chunk's edges are joined into the components found so far
+with component_roots, on the component each endpoint is in so far
+Output: A StructureAnalysis-like object with comp_id, num_components, isolate, has_cycle and density
+"""
+class EdgeListStructure:
+    def __init__(self, graph: EdgeListGraph):
+        # every node points at the smallest node of its component so far
+        comp = np.arange(graph.n, dtype=np.intp)
+        for src, dst in graph.chunks():
+            u, v = comp[src], comp[dst]
+            comp = component_roots(graph.n, np.concatenate([u, v]), np.concatenate([v, u]))[comp]
+        _, comp_id = np.unique(comp, return_inverse=True)
+        self.comp_id = comp_id.astype(np.int32)
+        self.num_components = int(self.comp_id.max(initial=-1)) + 1
+        self.isolate = graph.degree == 0
+        self.has_cycle = graph.m > graph.n - self.num_components
+        if graph.m == 0 or graph.n <= 1:
+            self.density = 0
+        else:
+            self.density = graph.m / (graph.n * (graph.n - 1)) * 2
+
+"""To write an EdgeListGraph with its attached columns as GML, the same file --output writes for the graph loaded with its nodes in id order and its edges in edge list order
+Input: The EdgeListGraph, the output path and the graph attributes
+Output:
+"""
+def write_edge_list_gml(graph: EdgeListGraph, path: str, graph_attrs: dict):
+    graph.build_neighbors()
+
+    def edge_chunks():
+        # each node's neighbors that come at or after it, a piece of nodes at a time
+        for piece in frontier_batches(graph, np.arange(graph.n, dtype=np.intp)):
+            rows, nbrs = frontier_pairs(graph, piece)
+            forward = nbrs >= rows
+            yield rows[forward], nbrs[forward]
+
+    write_gml_stream(path, graph_attrs, graph.labels, graph.columns, edge_chunks())
+    print(f"Graph saved to {path}")
+
+"""The --edge_list run: --multi_BFS metadata and the --analyze components, isolates, cycle check and density worked out out of core, printed like the in-memory run
+and written by --output with the same dist/source/parent/componentID/isolate attributes. The average shortest path length (a BFS from every node) is left out
+Input: The edge list's path, its id type and node count (None to take it from the largest id), the root ids, whether to analyze and the output path (or None)
+Output: raises ValueError for an edge list or root that doesn't fit
+"""
+def run_edge_list(path: str, dtype: str, n: int, roots: list, analyze: bool, output: str = None):
+    with EdgeListGraph(path, dtype, n) as graph:
+        print(f"edge list: {graph.n} nodes, {graph.m} edges from {path}")
+        graph_attrs = {}
+
+        bad = [r for r in roots if int(r) >= graph.n]
+        if bad:
+            raise ValueError(f"--multi_BFS contains out-of-range node ids: {bad}. Valid range is [0, {graph.n - 1}]")
+
+        if roots:
+            dist, parent, source = edge_list_bfs_meta(graph, [int(r) for r in roots])
+            if analyze:
+                graph.columns["dist"] = NodeColumn(graph, dist, "int")
+                graph.columns["source"] = NodeColumn(graph, source, "label")
+                graph.columns["parent"] = NodeColumn(graph, parent, "label")
+
+        if analyze:
+            structure = EdgeListStructure(graph)
+            print("Number of connected components:", structure.num_components)
+            print("This graph has a cycle." if structure.has_cycle else "This graph is acyclic (a forest).")
+            isolates = np.flatnonzero(structure.isolate)
+            if isolates.size:
+                print("Graph has isolated nodes:", [str(v) for v in isolates.tolist()])
+            else:
+                print("No isolated nodes.")
+            print("Density:", structure.density)
+            print("Average shortest path length: not worked out for --edge_list graphs")
+            graph_attrs.update(num_components=structure.num_components, has_cycle=structure.has_cycle, density=structure.density)
+            graph.columns["componentID"] = NodeColumn(graph, structure.comp_id, "int")
+            graph.columns["isolate"] = NodeColumn(graph, structure.isolate, "bool")
+
+        if output:
+            write_edge_list_gml(graph, output, graph_attrs)
+
+
+
+
+# Profiling Functions
+# ====================================================================================================
+# the functions --profile times, every call is a stage (calls made inside a stage, like graph_layout inside plot_graph, are stages nested in it)
+PROFILED_FUNCTIONS = (
+    "load_gml", "create_random_graph", "apply_edits", "start_incremental_analysis",
+    "multi_BFS", "compute_bfs_meta", "attach_bfs_meta",
+    "analyze_structure", "analyze_components", "attach_components_meta", "attach_component_ids",
+    "analyze_cycles", "attach_cycles_meta", "analyze_isolates", "attach_isolate_attr",
+    "analyze_density", "attach_density_meta", "analyze_avg_shortest_path", "attach_avg_shortest_path_meta",
+    "analyze_diameter_radius", "attach_diameter_meta", "analyze_clustering", "attach_clustering_meta",
+    "write_analysis_cache", "plot_graph", "import_plotting", "graph_layout", "save_gml", "run_sweep", "run_batch",
+    "edge_list_bfs_meta", "write_edge_list_gml",
+)
+
+"""The process's peak resident memory so far in MB, or None where the resource module is missing
+"""
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+"""Stand-in for Profiler when --profile isn't given: stage() hands back one shared do-nothing context and nothing is wrapped, so a normal run pays nothing for it
+"""
+class NoProfiler:
+    stage_context = contextlib.nullcontext()
+
+    def stage(self, name: str):
+        return self.stage_context
+
+    def instrument(self, namespace: dict, names):
+        pass
+
+    def restore(self, namespace: dict):
+        pass
+
+    def report(self, trace_path: str = None):
+        pass
+
+NO_PROFILER = NoProfiler()
+
+"""Times the stages of a --profile run. Each stage records its wall time, the peak and change of the memory tracemalloc traces (NumPy arrays included) while it runs,
+and the process's peak RSS when it ends. The tracemalloc peak is reset as each stage starts, and handed up to the stages it is nested in as it ends
+"""
+class Profiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.records = []   # finished stages, in the order they finished
+        self.open = []      # stages still running, outermost first
+        self.originals = {} # the functions instrument replaced, by name
+        tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        current, peak = tracemalloc.get_traced_memory()
+        for outer in self.open:
+            outer["peak"] = max(outer["peak"], peak)
+        tracemalloc.reset_peak()
+        record = {
+            "name": name,
+            "path": tuple(outer["name"] for outer in self.open) + (name,),
+            "start": time.perf_counter(),
+            "traced_start": current,
+            "peak": current,
+            "child_seconds": 0.0,
+        }
+        self.open.append(record)
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            current, peak = tracemalloc.get_traced_memory()
+            self.open.pop()
+            record.update(seconds=end - record["start"], peak=max(record["peak"], peak), traced_end=current, rss_mb=peak_rss_mb())
+            if self.open:
+                self.open[-1]["peak"] = max(self.open[-1]["peak"], record["peak"])
+                self.open[-1]["child_seconds"] += record["seconds"]
+            self.records.append(record)
+
+    """To make every call of the named functions in namespace (the module's globals) a stage, so the calls main and the other functions make go through it
+    """
+    def instrument(self, namespace: dict, names):
+        for name in names:
+            self.originals[name] = namespace[name]
+            namespace[name] = self.timed(namespace[name], name)
+
+    """To put back the functions instrument replaced, so a later main() in the same process (tests, an inline --batch) doesn't wrap them again and count every stage twice
+    """
+    def restore(self, namespace: dict):
+        namespace.update(self.originals)
+        self.originals = {}
+
+    def timed(self, func, name: str):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    """To print a table of the stages (calls of the same stage in the same place added together) to stderr, and with trace_path save every stage as a
+    Chrome trace JSON file (open it in chrome://tracing or ui.perfetto.dev)
+    """
+    def report(self, trace_path: str = None):
+        total = time.perf_counter() - self.origin
+        tracemalloc.stop()
+
+        rows = {}
+        for record in sorted(self.records, key=lambda r: r["start"]):
+            row = rows.setdefault(record["path"], {"calls": 0, "seconds": 0.0, "self": 0.0, "peak": 0, "delta": 0, "rss_mb": None})
+            row["calls"] += 1
+            row["seconds"] += record["seconds"]
+            row["self"] += record["seconds"] - record["child_seconds"]
+            row["peak"] = max(row["peak"], record["peak"] - record["traced_start"])
+            row["delta"] += record["traced_end"] - record["traced_start"]
+            row["rss_mb"] = record["rss_mb"]
+
+        rss = peak_rss_mb()
+        print(f"profile: {total:.3f}s total" + (f", peak RSS {rss:.1f} MB" if rss is not None else ""), file=sys.stderr)
+        print(f"{'stage':<40} {'calls':>6} {'total s':>10} {'self s':>10} {'peak MB':>10} {'alloc MB':>10} {'RSS MB':>10}", file=sys.stderr)
+        for path, row in rows.items():
+            name = "  " * (len(path) - 1) + path[-1]
+            rss_col = f"{row['rss_mb']:10.1f}" if row["rss_mb"] is not None else f"{'-':>10}"
+            print(
+                f"{name:<40} {row['calls']:>6} {row['seconds']:10.4f} {row['self']:10.4f} "
+                f"{row['peak'] / 2**20:10.2f} {row['delta'] / 2**20:10.2f} {rss_col}",
+                file=sys.stderr,
+            )
+
+        if trace_path:
+            pid = os.getpid()
+            events = []
+            for record in self.records:
+                args = {
+                    "traced_peak_mb": round((record["peak"] - record["traced_start"]) / 2**20, 3),
+                    "traced_delta_mb": round((record["traced_end"] - record["traced_start"]) / 2**20, 3),
+                }
+                if record["rss_mb"] is not None:
+                    args["peak_rss_mb"] = round(record["rss_mb"], 3)
+                start_us = (record["start"] - self.origin) * 1e6
+                events.append({"name": record["name"], "cat": "stage", "ph": "X", "ts": start_us, "dur": record["seconds"] * 1e6, "pid": pid, "tid": 0, "args": args})
+                events.append({"name": "traced memory", "ph": "C", "ts": start_us + record["seconds"] * 1e6, "pid": pid, "tid": 0, "args": {"MB": round(record["traced_end"] / 2**20, 3)}})
+            events.sort(key=lambda event: event["ts"])
+            with open(trace_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+            print(f"profile: trace saved to {trace_path}", file=sys.stderr)
 
 
 
@@ -496,6 +3643,30 @@ def build_parser() -> argparse.ArgumentParser:
         type=argparse.FileType("r"),
         help="Path to input GML file"
         )
+
+    group.add_argument(
+        "--sweep",
+        metavar="OUT_CSV",
+        help="Erdos-Renyi connectivity sweep: for every --sweep_n and --sweep_c pair, make --sweep_reps random graphs and write their component count, giant component fraction, isolate count and connectedness to OUT_CSV (- for stdout)",
+        )
+
+    group.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="Run a long-lived server on a local socket (host:port, or the path of a Unix socket) that loads graphs once and answers JSON line requests (load, bfs, component, isolates, density, export) from memory, on --workers threads",
+        )
+
+    group.add_argument(
+        "--edge_list",
+        metavar="FILE",
+        help="Read the graph from a flat binary edge list (pairs of --edge_dtype node ids, a repeated edge counts once) through a memory map, and run --multi_BFS/--analyze on it out of core, for graphs too big to load",
+        )
+
+    group.add_argument(
+        "--batch",
+        metavar="MANIFEST",
+        help="Run every graph listed in MANIFEST (an input .gml and optionally an output .gml per line) through --multi_BFS/--analyze across --workers processes, printing one JSON line of results per graph",
+        )
     parser.add_argument(
         "--output", 
         type=str,
@@ -510,6 +3681,12 @@ def build_parser() -> argparse.ArgumentParser:
         help="Generate random graph with n nodes and parameter c",
     )
 
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed for --create_random_graph (defaults to the current time)",
+    )
+
     parser.add_argument(
         "--multi_BFS",
         nargs="+",
@@ -524,18 +3701,146 @@ def build_parser() -> argparse.ArgumentParser:
         help="Print graph analysis",
     )
 
+    parser.add_argument(
+        "--avg_path_samples",
+        type=int,
+        metavar="K",
+        help="Estimate the average shortest path length from K random BFS sources (with a 95%% confidence interval) instead of all of them",
+    )
+
+    parser.add_argument(
+        "--avg_path_per_component",
+        action="store_true",
+        help="Report the average shortest path length of each component when the graph is not connected",
+    )
+
+    parser.add_argument(
+        "--diameter",
+        action="store_true",
+        help="With --analyze, also find the exact diameter and radius (of each component when the graph is not connected)",
+    )
+
+    parser.add_argument(
+        "--clustering",
+        action="store_true",
+        help="With --analyze, also count every node's triangles and its clustering coefficient, and the graph's average clustering and transitivity",
+    )
+
+    parser.add_argument(
+        "--serve_dir",
+        metavar="DIR",
+        default=".",
+        help="With --serve, the directory load and export requests read and write in: their paths are relative to it and can't leave it (default the current directory)",
+    )
+
+    parser.add_argument(
+        "--edge_dtype",
+        choices=EDGE_LIST_DTYPES,
+        default="int32",
+        help="Type of the node ids in the --edge_list file (default int32)",
+    )
+
+    parser.add_argument(
+        "--edge_list_nodes",
+        type=int,
+        metavar="N",
+        help="Number of nodes of the --edge_list graph, when the highest ids have no edges (defaults to the largest id + 1)",
+    )
+
+    parser.add_argument(
+        "--sweep_n",
+        type=int,
+        nargs="+",
+        metavar="N",
+        help="Node counts of the --sweep grid",
+        )
+
+    parser.add_argument(
+        "--sweep_c",
+        type=float,
+        nargs="+",
+        metavar="C",
+        help="c values (p = c * ln(n) / n) of the --sweep grid",
+        )
+
+    parser.add_argument(
+        "--sweep_reps",
+        type=int,
+        default=10,
+        metavar="R",
+        help="Random graphs per --sweep grid point, each with its own seed derived from --seed (default 10)",
+        )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes: of --sweep points and --batch graphs at once, or request threads for --serve (all three default to the number of CPUs), and for the parallel analyses of a single graph (default 1, no process pool)",
+    )
+
     parser.add_argument(
         "--plot",
         action="store_true",
         help="Show graph plot",
     )
+
+    parser.add_argument(
+        "--plot_out",
+        metavar="FILE",
+        help="Render the plot off-screen to a .png or .svg file instead of showing it (no display needed)",
+    )
+
+    parser.add_argument(
+        "--plot_density_edges",
+        type=int,
+        default=PLOT_DENSITY_EDGES,
+        metavar="N",
+        help=f"Above N edges, plots bin nodes and edges onto a pixel grid (density-aggregated) instead of drawing each one (default {PLOT_DENSITY_EDGES})",
+    )
+
+    parser.add_argument(
+        "--plot_hops",
+        type=int,
+        metavar="k",
+        help=f"With --multi_BFS, plot only each root's k-hop BFS neighborhood, with the rest of the graph collapsed into summary markers (labels are left out past {PLOT_LABEL_NODES} nodes)",
+    )
     
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        default="spring",
+        help="How --plot places the nodes: spring (nx.spring_layout, slow on large graphs), spectral (sparse spectral) or force (spectral refined by a grid-approximated force layout)",
+    )
+
+    parser.add_argument(
+        "--edits",
+        metavar="FILE",
+        help="Apply the edits in FILE (add_node u, remove_node u, add_edge u v, remove_edge u v; one per line) to the graph before the other steps. With --analyze the analysis is updated incrementally",
+    )
+
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Don't read or write the sidecar caches next to the --input file (FILE.gmlcache, and FILE.analysis.npz with --analyze), or the --plot layout cache",
+    )
+
     parser.add_argument(
     "--show_components",
     action="store_true",
     help="Shows Components as differently colored nodes",
     )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time every stage of the run (loading, BFS, each analyze_*/attach_*, layout, drawing, saving) with its peak memory, and print a summary table to stderr",
+    )
+
+    parser.add_argument(
+        "--profile_out",
+        metavar="FILE",
+        help="Like --profile, and also save the stages as a Chrome trace JSON file (open it in chrome://tracing or ui.perfetto.dev)",
+    )
+
 
     return parser
 
@@ -550,14 +3855,28 @@ def main():
     parser = build_parser()
     args = parser.parse_args()
 
+    # without --profile nothing is wrapped and every stage() is the same do-nothing context
+    profiler = Profiler() if args.profile or args.profile_out else NO_PROFILER
+    profiler.instrument(globals(), PROFILED_FUNCTIONS)
+    try:
+        run(parser, args, profiler)
+    finally:
+        try:
+            profiler.report(args.profile_out)
+        finally:
+            profiler.restore(globals())
+
+"""To run the steps the command line asked for, in order: load or generate, edits, --multi_BFS, --analyze, plot and save (or a whole --sweep or --batch)
+"""
+def run(parser: argparse.ArgumentParser, args, profiler):
     G = None            # local graph variable -> all functions
     root_nodes = []     # local root nodes variable -> made in multi_BFS, used in plot
 
     #ensure the paths (input and output end with .gml)
-    if args.input and not args.input.name.endswith(".gml"):
+    if args.input and not args.input.name.endswith((".gml", ".gml.gz")):
         parser.error("--input file must be a .gml file")
 
-    if args.output and not args.output.endswith(".gml"):
+    if args.output and not args.output.endswith((".gml", ".gml.gz")):
         parser.error("--output file must be a .gml file")
 
 
@@ -573,7 +3892,7 @@ def main():
     #Into regular calls
     if args.input:
         try:
-            G = load_gml(args.input.name)
+            G = load_gml(args.input.name, use_cache=not args.no_cache)
         except (nx.NetworkXError, ValueError, UnicodeDecodeError) as err:
             parser.error(f"--input: Malformed GML in {getattr(args.input, 'name', '<stdin>')}: {err}")
 
@@ -596,46 +3915,174 @@ def main():
             if c < 0:
                 parser.error("--create_random_graph c: not be < 0")
 
-        G = create_random_graph(n, c)
+        G = create_random_graph(n, c, args.seed)
+
+    if args.avg_path_samples is not None and args.avg_path_samples <= 0:
+        parser.error("--avg_path_samples K: must be > 0")
+
+    if args.workers is not None and args.workers <= 0:
+        parser.error("--workers: must be > 0")
+    if args.workers is None:
+        # a sweep's points and a batch's graphs are independent jobs spread over every core, and one slow load or export would hold up every other request
+        # on a single server thread, so --sweep, --batch and --serve use one worker per CPU unless told otherwise
+        args.workers = (os.cpu_count() or 1) if args.sweep or args.batch or args.serve else 1
+
+    if args.plot_out is not None and not args.plot_out.lower().endswith((".png", ".svg")):
+        parser.error("--plot_out: must be a .png or .svg file")
+
+    if args.plot_density_edges < 0:
+        parser.error("--plot_density_edges N: must be >= 0")
+
+    if args.plot_hops is not None:
+        if args.plot_hops < 0:
+            parser.error("--plot_hops k: must be >= 0")
+        if not args.multi_BFS:
+            parser.error("--plot_hops: draws the neighborhoods of the --multi_BFS roots, it requires --multi_BFS")
 
     if args.multi_BFS is not None and len(args.multi_BFS) == 0:
         parser.error("--multi_BFS: require at least one root node")
 
+    if args.diameter and not args.analyze:
+        parser.error("--diameter: is part of the analysis, it requires --analyze")
+
+    if args.clustering and not args.analyze:
+        parser.error("--clustering: is part of the analysis, it requires --analyze")
+
+    if args.sweep:
+        if args.output or args.plot or args.plot_out or args.edits or args.multi_BFS is not None or args.analyze:
+            parser.error("--sweep: only works out the connectivity statistics, it can't be combined with --output, --plot, --plot_out, --edits, --multi_BFS or --analyze")
+        if not args.sweep_n or not args.sweep_c:
+            parser.error("--sweep: requires --sweep_n and --sweep_c")
+        if min(args.sweep_n) <= 0:
+            parser.error("--sweep_n: must be > 0")
+        if min(args.sweep_c) < 0:
+            parser.error("--sweep_c: not be < 0")
+        if args.sweep_reps <= 0:
+            parser.error("--sweep_reps: must be > 0")
+        base_seed = int(time.time()) if args.seed is None else args.seed
+        print(f"sweep: {len(args.sweep_n) * len(args.sweep_c) * args.sweep_reps} graphs, base seed {base_seed}", file=sys.stderr)
+        if args.sweep == "-":
+            run_sweep(args.sweep_n, args.sweep_c, args.sweep_reps, base_seed, sys.stdout, args.workers)
+        else:
+            with open(args.sweep, "w", newline="", encoding="utf-8") as out:
+                run_sweep(args.sweep_n, args.sweep_c, args.sweep_reps, base_seed, out, args.workers)
+        return
+
+    if args.serve:
+        if args.output or args.plot or args.plot_out or args.edits or args.multi_BFS is not None or args.analyze:
+            parser.error("--serve: graphs are loaded, analyzed and saved by requests, it can't be combined with --output, --plot, --plot_out, --edits, --multi_BFS or --analyze")
+        if not os.path.isdir(args.serve_dir):
+            parser.error(f"--serve_dir: {args.serve_dir} is not a directory")
+        run_server(args.serve, args.workers, args.serve_dir)
+        return
+
+    if args.edge_list:
+        if args.plot or args.plot_out or args.edits:
+            parser.error("--edge_list: only --multi_BFS, --analyze and --output run out of core, --plot, --plot_out and --edits are not supported")
+        if args.edge_list_nodes is not None and args.edge_list_nodes < 0:
+            parser.error("--edge_list_nodes N: must be >= 0")
+        for node in args.multi_BFS or []:
+            if not node.isdigit():
+                parser.error(f"--multi_BFS {node!r} is not valid int node id (must be positive value)")
+        try:
+            run_edge_list(args.edge_list, args.edge_dtype, args.edge_list_nodes, args.multi_BFS or [], args.analyze, args.output)
+        except (OSError, ValueError) as err:
+            parser.error(f"--edge_list: {err}")
+        return
+
+    if args.batch:
+        if args.output or args.plot or args.plot_out or args.edits:
+            parser.error("--batch: outputs are given per graph in the manifest, and --plot, --plot_out and --edits are not supported")
+        try:
+            jobs = read_manifest(args.batch)
+        except (OSError, ValueError) as err:
+            parser.error(f"--batch: {err}")
+        options = {
+            "roots": [str(r) for r in (args.multi_BFS or [])],
+            "analyze": args.analyze,
+            "use_cache": not args.no_cache,
+            "avg_path_samples": args.avg_path_samples,
+            "avg_path_per_component": args.avg_path_per_component,
+            "diameter": args.diameter,
+            "clustering": args.clustering,
+            "seed": args.seed,
+        }
+        sys.exit(1 if run_batch(jobs, options, args.workers) else 0)
+
+    # the roots are checked to be node ids before the edits, and against the graph after them
+    if args.multi_BFS and G:
+        with profiler.stage("validate_roots"):
+            for node in args.multi_BFS:
+                if not node.isdigit():
+                    parser.error(f"--multi_BFS {node!r} is not valid int node id (must be positive value)")
+
+    if args.edits and G:
+        try:
+            edits = read_edits(args.edits)
+        except (OSError, ValueError) as err:
+            parser.error(f"--edits: {err}")
+        try:
+            # with --analyze the analysis is kept up to date edit by edit instead of being worked out again afterwards
+            if args.analyze:
+                cache_path = args.input.name if args.input and not args.no_cache else None
+                analysis = start_incremental_analysis(G, args.multi_BFS, cache_path)
+                with profiler.stage("incremental_edits"):
+                    for op, nodes in edits:
+                        analysis.apply(op, nodes)
+                    analysis.finish()
+            else:
+                apply_edits(G, edits)
+        except ValueError as err:
+            parser.error(f"--edits: {err}")
+        print(f"Applied {len(edits)} edits: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+
     if args.multi_BFS and G:
         bad = []
         holder_for_n = G.number_of_nodes() - 1
-        for node in args.multi_BFS:
-            if not node.isdigit():
-                parser.error(f"--multi_BFS {node!r} is not valid int node id (must be positive value)")
-            node_val = int(node)
-            if node_val > holder_for_n or node_val < 0:
-                bad.append(node)
+        with profiler.stage("validate_roots"):
+            if args.edits:
+                # edits leave gaps where nodes were removed and add ids past n - 1, so the roots are looked up in the edited graph instead
+                bad = [node for node in args.multi_BFS if node not in G]
+            else:
+                bad = [node for node in args.multi_BFS if int(node) > holder_for_n]
+        if bad and args.edits:
+            parser.error(f"--multi_BFS contains node ids that aren't in the graph after --edits: {bad}")
         if bad:
             parser.error(f"--multi_BFS contains out-of-range node ids: {bad}. Valid range is [0, {holder_for_n}]")
 
         root_nodes = args.multi_BFS
-        all_BFS = multi_BFS(G, root_nodes)
-        
+        # after --edits with --analyze the metadata is the one the incremental analysis repaired (compute_bfs_meta hands it back),
+        # so nothing is traversed again, and the plots sweep the per-root trees only if they draw them
+        if not (args.edits and args.analyze):
+            multi_BFS(G, root_nodes)
+
         if args.analyze:
             dist, parent, source = compute_bfs_meta(G, args.multi_BFS)
             attach_bfs_meta(G, dist, parent, source)
 
     if args.analyze and G:
+        structure = analyze_structure(G)
         attach_components_meta(G, analyze_components(G))
-        comp_id = compute_component_ids(G)
-        attach_component_ids(G, comp_id)
+        attach_component_ids(G, structure.comp_id)
 
         attach_cycles_meta(G, analyze_cycles(G))
 
         analyze_isolates(G)
-        isolates = compute_isolates(G)
-        attach_isolate_attr(G, isolates)
+        attach_isolate_attr(G, structure.isolate)
 
         attach_density_meta(G, analyze_density(G))
-        attach_avg_shortest_path_meta(G, analyze_avg_shortest_path(G))
-
-    if args.plot and G:
-        plot_graph(G, root_nodes, args.show_components)
+        attach_avg_shortest_path_meta(G, analyze_avg_shortest_path(G, args.avg_path_samples, args.avg_path_per_component, args.workers, args.seed))
+        if args.diameter:
+            attach_diameter_meta(G, analyze_diameter_radius(G))
+        if args.clustering:
+            attach_clustering_meta(G, analyze_clustering(G, args.workers))
+
+        # the analysis of the file as it is on disk is kept for later runs with --edits
+        if args.input and not args.no_cache and not args.edits:
+            write_analysis_cache(G, args.multi_BFS, args.input.name)
+
+    if (args.plot or args.plot_out) and G:
+        plot_graph(G, root_nodes, args.show_components, args.layout, not args.no_cache, args.plot_out, args.plot_density_edges, args.plot_hops)
 
     if args.output and G:
         save_gml(G, args.output)
@@ -0,0 +1,67 @@
+"""
+Startup budget check for headless graph.py runs (--input/--analyze/--output, no --plot)
+Purpose: Import graph.py under `python -X importtime` a few times, print the slowest imports, and fail if the best import time is over the budget
+or if anything from the plotting stack (matplotlib) was imported, since that is only supposed to load for --plot
+Usage: python misc/import_time_bench.py [--budget ms] [--runs r]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ("matplotlib",)
+
+
+"""To import graph.py once in a fresh interpreter with -X importtime
+Input: None
+Output: A dict of module name -> cumulative import time in microseconds
+"""
+def import_times():
+    run = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import graph"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in run.stderr.splitlines():
+        # lines look like "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check graph.py's headless startup time")
+    parser.add_argument("--budget", type=float, default=500, help="Import time budget in milliseconds (default 500)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of imports to take the best of (default 5)")
+    args = parser.parse_args()
+
+    # the best run is the least noisy estimate, the first one also pays for cold disk caches
+    runs = [import_times() for _ in range(args.runs)]
+    best = min(runs, key=lambda times: times["graph"])
+    total_ms = best["graph"] / 1000
+
+    print(f"import graph: {total_ms:.1f} ms (best of {args.runs}, budget {args.budget:.0f} ms)")
+    print("slowest top-level imports:")
+    top_level = {name: us for name, us in best.items() if "." not in name and name != "graph"}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {name:<24} {us / 1000:8.1f} ms")
+
+    failed = False
+    loaded = sorted(name for name in best if name.split(".")[0] in FORBIDDEN)
+    if loaded:
+        print(f"FAIL: plotting modules imported without --plot: {', '.join(loaded[:5])}")
+        failed = True
+    if total_ms > args.budget:
+        print(f"FAIL: import time {total_ms:.1f} ms is over the {args.budget:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
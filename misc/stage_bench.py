@@ -0,0 +1,272 @@
+"""
+Stage-level benchmarks for graph.py at increasing scales
+Purpose: Generate an Erdos-Renyi graph at each size, time every pipeline stage on its own (generate, save, load, per-root BFS, multi-source BFS, structure analysis,
+average path, diameter and radius, triangles and clustering, layout, render) and record its wall time and peak memory. The results are saved as JSON and compared against a stored baseline,
+failing if any stage got slower or bigger by more than the threshold
+Usage: python misc/stage_bench.py [--sizes n ...] [--stages name ...] [--diameter_max_n n] [--out results.json] [--baseline baseline.json] [--save_baseline] [--threshold t]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import networkx as nx
+import graph
+
+DEFAULT_BASELINE = os.path.join(ROOT, "misc", "stage_bench_baseline.json")
+# differences smaller than these are noise, whatever the percentage
+MIN_SECONDS = 0.01
+MIN_PEAK_MB = 1.0
+
+
+"""What one size's stages share: the graph, the roots and where the files go
+"""
+class BenchContext:
+    def __init__(self, n: int, c: float, seed: int, num_roots: int, avg_path_samples: int, layout: str, folder: str, max_n: dict):
+        self.n = n
+        self.c = c
+        self.seed = seed
+        self.roots = [str(r) for r in np.linspace(0, n - 1, min(num_roots, n)).astype(int)]
+        self.avg_path_samples = avg_path_samples
+        self.layout = layout
+        # stages that are only run up to some size (stage name -> largest n)
+        self.max_n = max_n
+        self.gml_path = os.path.join(folder, f"bench_{n}.gml")
+        self.plot_path = os.path.join(folder, f"bench_{n}.png")
+        self.G = None
+
+    def core(self):
+        return graph.graph_core(self.G)
+
+
+# each stage is a setup (not timed, puts back the state the stage starts from) and the timed run
+
+def generate(ctx):
+    ctx.G = graph.create_random_graph(ctx.n, ctx.c, ctx.seed)
+
+def save(ctx):
+    graph.save_gml(ctx.G, ctx.gml_path)
+
+def load(ctx):
+    graph.load_gml(ctx.gml_path, use_cache=False)
+
+def warm_gml_cache(ctx):
+    graph.load_gml(ctx.gml_path, use_cache=True)
+
+def load_warm(ctx):
+    graph.load_gml(ctx.gml_path, use_cache=True)
+
+def clear_bfs(ctx):
+    core = ctx.core()
+    core.bfs = None
+    core.bfs_meta = None
+
+def per_root_bfs(ctx):
+    graph.multi_BFS(ctx.G, ctx.roots)
+
+def multi_source_bfs(ctx):
+    graph.attach_bfs_meta(ctx.G, *graph.compute_bfs_meta(ctx.G, ctx.roots))
+
+def clear_structure(ctx):
+    ctx.core().structure = None
+
+def structure(ctx):
+    result = graph.analyze_structure(ctx.G)
+    graph.attach_components_meta(ctx.G, graph.analyze_components(ctx.G))
+    graph.attach_component_ids(ctx.G, result.comp_id)
+    graph.attach_cycles_meta(ctx.G, graph.analyze_cycles(ctx.G))
+    graph.analyze_isolates(ctx.G)
+    graph.attach_isolate_attr(ctx.G, result.isolate)
+
+def avg_path(ctx):
+    # the exact average is a BFS from every node, so past the sample count it is estimated like --avg_path_samples would
+    samples = ctx.avg_path_samples if ctx.n > ctx.avg_path_samples else None
+    graph.analyze_avg_shortest_path(ctx.G, samples, workers=1, seed=ctx.seed)
+
+def ready_structure(ctx):
+    # --diameter comes after --analyze has worked out the components it starts from
+    graph.analyze_structure(ctx.G)
+
+def diameter(ctx):
+    graph.attach_diameter_meta(ctx.G, graph.analyze_diameter_radius(ctx.G))
+
+def clustering(ctx):
+    graph.attach_clustering_meta(ctx.G, graph.analyze_clustering(ctx.G, workers=1))
+
+def remove_layout_cache(ctx):
+    path = graph.layout_cache_path(ctx.core(), ctx.layout, graph.LAYOUT_SEED)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+def layout(ctx):
+    graph.graph_layout(ctx.G, ctx.layout, graph.LAYOUT_SEED, use_cache=True)
+
+def render(ctx):
+    # the layout comes from the cache the layout stage left, so this is only the drawing
+    graph.plot_graph(ctx.G, [], False, ctx.layout, use_cache=True, out=ctx.plot_path)
+    graph.plt.close("all")
+
+def nothing(ctx):
+    pass
+
+# in pipeline order, later stages use the graph the generate stage made
+STAGES = {
+    "generate": (nothing, generate),
+    "save": (nothing, save),
+    "load": (nothing, load),
+    "load_warm": (warm_gml_cache, load_warm),
+    "per_root_bfs": (clear_bfs, per_root_bfs),
+    "multi_source_bfs": (clear_bfs, multi_source_bfs),
+    "structure": (clear_structure, structure),
+    "avg_path": (nothing, avg_path),
+    "diameter": (ready_structure, diameter),
+    "clustering": (nothing, clustering),
+    "layout": (remove_layout_cache, layout),
+    "render": (nothing, render),
+}
+# the stage whose output each of these starts from
+NEEDS = {"load": "save", "load_warm": "save", "render": "layout"}
+
+
+"""To run one stage: repeat times for the wall time (the best one is kept), then once more under tracemalloc for the peak memory, since tracing slows allocation heavy stages down
+Input: The stage's setup and run functions, the context and the number of timed runs
+Output: A dict with the stage's seconds and peak_mb
+"""
+def measure(setup, run, ctx, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        setup(ctx)
+        start = time.perf_counter()
+        run(ctx)
+        times.append(time.perf_counter() - start)
+
+    setup(ctx)
+    tracemalloc.start()
+    try:
+        run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(times), 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+"""To run every stage at one size
+Input: The context and the stage names and number of timed runs
+Output: A dict of stage name -> measure() results
+"""
+def bench_size(ctx, stages: list, repeat: int) -> dict:
+    # stages that aren't measured still run (untimed) when a measured one needs what they leave behind
+    needed = {"generate"} | {NEEDS[name] for name in stages if name in NEEDS}
+    results = {}
+    for name, (setup, run) in STAGES.items():
+        if name in stages and ctx.n > ctx.max_n.get(name, ctx.n):
+            print(f"  {name:<18} skipped (n > {ctx.max_n[name]})", file=sys.stderr)
+        elif name in stages:
+            results[name] = measure(setup, run, ctx, repeat)
+            print(f"  {name:<18} {results[name]['seconds']:10.4f} s {results[name]['peak_mb']:10.1f} MB", file=sys.stderr)
+        elif name in needed:
+            setup(ctx)
+            run(ctx)
+    return results
+
+
+"""To compare results against a baseline
+Input: The results and baseline dicts (size -> stage -> measurements) and the allowed fraction of growth
+Output: A list of regression messages
+"""
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for size, stages in results.items():
+        for name, now in stages.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            for key, floor, unit in (("seconds", MIN_SECONDS, "s"), ("peak_mb", MIN_PEAK_MB, "MB")):
+                if now[key] > before[key] * (1 + threshold) and now[key] - before[key] > floor:
+                    change = (now[key] / before[key] - 1) * 100 if before[key] else float("inf")
+                    regressions.append(f"n={size} {name} {key}: {before[key]:.4f} -> {now[key]:.4f} {unit} (+{change:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and measure the memory of each graph.py stage at increasing graph sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5], help="Node counts to run at (default 10^3 to 10^5, the committed baseline's sizes)")
+    parser.add_argument("--c", type=float, default=1.5, help="c of the generated graphs, p = c * ln(n) / n (default 1.5)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generated graphs (default 1)")
+    parser.add_argument("--roots", type=int, default=4, help="Number of BFS roots (default 4)")
+    parser.add_argument("--avg_path_samples", type=int, default=64, help="Sources of the average path estimate for graphs with more nodes than this (default 64)")
+    parser.add_argument("--diameter_max_n", type=int, default=10**4, help="Largest graph the diameter stage runs on, an Erdos-Renyi graph needs thousands of BFS runs to pin its eccentricities down (default 10^4)")
+    parser.add_argument("--layout", choices=graph.LAYOUTS, default="spectral", help="Layout of the layout and render stages (default spectral)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES), help="Stages to run (default all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per stage, the best is kept (default 1)")
+    parser.add_argument("--out", help="Where to save the results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against (default misc/stage_bench_baseline.json)")
+    parser.add_argument("--save_baseline", action="store_true", help="Save the results as the new baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed growth over the baseline before a stage counts as a regression (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # matplotlib's import is startup time, not part of rendering
+    graph.import_plotting(headless=True)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        # the layout cache is relative to the working folder, so it is kept out of the repo
+        cwd = os.getcwd()
+        os.chdir(folder)
+        try:
+            for n in args.sizes:
+                print(f"n={n}", file=sys.stderr)
+                ctx = BenchContext(n, args.c, args.seed, args.roots, args.avg_path_samples, args.layout, folder,
+                                   {"diameter": args.diameter_max_n})
+                # graph.py prints as it goes (and the isolate list can be huge), only the benchmark's own output is kept
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    results[str(n)] = bench_size(ctx, args.stages, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "networkx": nx.__version__,
+        "machine": platform.machine(),
+        "c": args.c,
+        "seed": args.seed,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"results saved to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        # without a baseline nothing was checked, which must not pass as a clean run
+        print(f"no baseline at {args.baseline} to compare against (make one with --save_baseline)")
+        sys.exit(1)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["results"], args.threshold)
+    for line in regressions:
+        print(f"REGRESSION: {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"OK: no stage over {args.threshold:.0%} slower or bigger than {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Regression tests for graph.py's --diameter and --clustering analyses (core_eccentricity_bounds through analyze_diameter_radius, triangle_counts through analyze_clustering)
+Purpose: Check every component's exact diameter and radius against nx.diameter and nx.radius, and the triangle counts and clustering coefficients against nx.triangles,
+nx.clustering, nx.average_clustering and nx.transitivity, on random graphs with several components, self loops and isolated nodes
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import networkx as nx
+import pytest
+import graph
+
+
+"""To make a random graph with string node ids like load_gml gives, out of a few random components (paths, cycles, trees and G(n, p) pieces), with a few self loops
+"""
+def random_graph(rng, parts: int) -> nx.Graph:
+    G = nx.Graph()
+    for _ in range(parts):
+        size = int(rng.integers(1, 40))
+        kind = rng.choice(["path", "cycle", "tree", "gnp"])
+        if kind == "path":
+            H = nx.path_graph(size)
+        elif kind == "cycle":
+            H = nx.cycle_graph(size)
+        elif kind == "tree":
+            H = nx.Graph()
+            H.add_node(0)
+            H.add_edges_from((v, int(rng.integers(v))) for v in range(1, size))
+        else:
+            H = nx.gnp_random_graph(size, float(rng.random()) * 0.3, seed=int(rng.integers(1 << 30)))
+        G = nx.disjoint_union(G, H)
+    for _ in range(int(rng.integers(0, 3))):
+        v = int(rng.integers(G.number_of_nodes()))
+        G.add_edge(v, v)
+    return nx.relabel_nodes(G, str)
+
+"""To list the nodes of each component in comp_id order
+"""
+def components(G: nx.Graph, comp_id) -> list:
+    labels = graph.graph_core(G).labels
+    return [[labels[v] for v in np.flatnonzero(comp_id == c).tolist()] for c in range(int(comp_id.max(initial=-1)) + 1)]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_diameter_radius_match_networkx(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(1, 6)))
+    result = graph.analyze_diameter_radius(G)
+    comps = components(G, graph.analyze_structure(G).comp_id)
+    assert len(result.diameter) == len(result.radius) == len(comps)
+    for c, nodes in enumerate(comps):
+        H = G.subgraph(nodes)
+        assert result.diameter[c] == nx.diameter(H), c
+        assert result.radius[c] == nx.radius(H), c
+
+def test_diameter_radius_of_large_component():
+    # past ECCENTRICITY_SINGLE_ROUNDS, so the later rounds' bit-parallel sweeps are used too
+    G = nx.relabel_nodes(nx.connected_watts_strogatz_graph(400, 4, 0.05, seed=5), str)
+    result = graph.analyze_diameter_radius(G)
+    assert (int(result.diameter[0]), int(result.radius[0])) == (nx.diameter(G), nx.radius(G))
+    assert result.bfs_runs <= G.number_of_nodes()
+
+def test_diameter_meta():
+    G = nx.relabel_nodes(nx.disjoint_union(nx.path_graph(5), nx.cycle_graph(6)), str)
+    graph.attach_diameter_meta(G, graph.analyze_diameter_radius(G))
+    assert G.graph["diameter"] == G.graph["radius"] == "undefined"
+    assert G.graph["diameter_per_component"] == [4, 3]
+    assert G.graph["radius_per_component"] == [2, 3]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_clustering_matches_networkx(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(1, 6)))
+    result = graph.analyze_clustering(G)
+    labels = graph.graph_core(G).labels
+    triangles, clustering = nx.triangles(G), nx.clustering(G)
+    assert result.triangles.tolist() == [triangles[v] for v in labels]
+    assert result.clustering.tolist() == pytest.approx([clustering[v] for v in labels])
+    assert result.num_triangles == sum(triangles.values()) // 3
+    assert result.avg_clustering == pytest.approx(nx.average_clustering(G))
+    assert result.transitivity == pytest.approx(nx.transitivity(G))
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_clustering_in_chunks(monkeypatch, workers):
+    # chunks small enough that the counting takes many steps, and with 2 workers is split across the pool
+    monkeypatch.setattr(graph, "TRIANGLE_CHUNK", 64)
+    G = nx.relabel_nodes(nx.powerlaw_cluster_graph(300, 4, 0.5, seed=9), str)
+    result = graph.analyze_clustering(G, workers)
+    labels = graph.graph_core(G).labels
+    triangles = nx.triangles(G)
+    assert result.triangles.tolist() == [triangles[v] for v in labels]
+    assert result.transitivity == pytest.approx(nx.transitivity(G))
+
+def test_clustering_meta():
+    G = nx.relabel_nodes(nx.complete_graph(4), str)
+    graph.attach_clustering_meta(G, graph.analyze_clustering(G))
+    assert (G.graph["num_triangles"], G.graph["avg_clustering"], G.graph["transitivity"]) == (4, 1.0, 1.0)
+    assert graph.node_column(G, "triangles").materialize() == [3, 3, 3, 3]
@@ -0,0 +1,105 @@
+"""
+Regression tests for graph.py's --batch (read_manifest and batch_job through run_batch)
+Purpose: Check that each graph of a manifest gets its own JSON result line, that a graph that can't be loaded, analyzed or whose worker process dies
+is reported as that graph's failure, and that the rest of the batch still runs, inline and across a process pool
+Usage: python -m pytest tests
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import networkx as nx
+import pytest
+import graph
+
+GOOD = ["data.gml", "final_graph.gml", "mo_analyze_out.gml"]
+OPTIONS = {
+    "roots": None, "analyze": True, "use_cache": False, "avg_path_samples": None, "avg_path_per_component": False,
+    "diameter": False, "clustering": False, "seed": 0,
+}
+
+
+"""To write a manifest with the repo's good graphs, a missing file and the malformed one, each saved to an output next to it
+"""
+@pytest.fixture
+def manifest(tmp_path):
+    for name in GOOD + ["mo_analyze_malformed.gml"]:
+        shutil.copy(os.path.join(ROOT, "misc", name), tmp_path / name)
+    path = tmp_path / "manifest.txt"
+    lines = [f"{name} out_{name}" for name in GOOD[:2]] + ["missing.gml  # not there", "", "mo_analyze_malformed.gml out_bad.gml", GOOD[2]]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+"""To run a batch and read back its result lines by input file name
+"""
+def batch_results(capsys, jobs: list, options: dict, workers: int):
+    failed = graph.run_batch(jobs, options, workers)
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(lines) == len(jobs)
+    return failed, {os.path.basename(result["input"]): result for result in lines}
+
+
+def test_read_manifest(manifest, tmp_path):
+    jobs = graph.read_manifest(manifest)
+    assert jobs == [
+        (str(tmp_path / GOOD[0]), str(tmp_path / ("out_" + GOOD[0]))),
+        (str(tmp_path / GOOD[1]), str(tmp_path / ("out_" + GOOD[1]))),
+        (str(tmp_path / "missing.gml"), None),
+        (str(tmp_path / "mo_analyze_malformed.gml"), str(tmp_path / "out_bad.gml")),
+        (str(tmp_path / GOOD[2]), None),
+    ]
+
+    (tmp_path / "bad.txt").write_text("a.gml b.txt\n")
+    with pytest.raises(ValueError, match="line 1"):
+        graph.read_manifest(str(tmp_path / "bad.txt"))
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_failures_are_per_graph(manifest, tmp_path, capsys, workers):
+    failed, results = batch_results(capsys, graph.read_manifest(manifest), OPTIONS, workers)
+    assert failed == 2
+    assert not results["missing.gml"]["ok"] and "FileNotFoundError" in results["missing.gml"]["error"]
+    assert not results["mo_analyze_malformed.gml"]["ok"] and "node id A" in results["mo_analyze_malformed.gml"]["error"]
+    assert not os.path.exists(tmp_path / "out_bad.gml")
+
+    for name in GOOD:
+        result = results[name]
+        G = nx.read_gml(str(tmp_path / name))
+        assert result["ok"], result
+        assert (result["nodes"], result["edges"]) == (G.number_of_nodes(), G.number_of_edges())
+        assert result["num_components"] == nx.number_connected_components(G)
+    for name in GOOD[:2]:
+        saved = nx.read_gml(str(tmp_path / ("out_" + name)))
+        assert saved.graph["num_components"] == results[name]["num_components"]
+
+def test_missing_root_fails_that_graph(tmp_path, capsys):
+    # the same roots are used for every graph, a graph without them fails on its own
+    small = tmp_path / "small.gml"
+    nx.write_gml(nx.path_graph(["0", "1"]), str(small))
+    big = tmp_path / "big.gml"
+    nx.write_gml(nx.path_graph([str(v) for v in range(6)]), str(big))
+    failed, results = batch_results(capsys, [(str(small), None), (str(big), None)], {**OPTIONS, "roots": ["5"]}, 1)
+    assert failed == 1
+    assert "not in the graph" in results["small.gml"]["error"]
+    assert results["big.gml"]["multi_BFS"] == {"5": {"reached": 6, "depth": 5}}
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="the crashing load_gml is patched in before the pool forks")
+def test_dead_worker_fails_only_its_graph(manifest, monkeypatch, capsys):
+    load_gml = graph.load_gml
+
+    def crashing_load_gml(path, use_cache=False):
+        if path.endswith(GOOD[1]):
+            os._exit(1)
+        return load_gml(path, use_cache)
+
+    monkeypatch.setattr(graph, "load_gml", crashing_load_gml)
+    failed, results = batch_results(capsys, graph.read_manifest(manifest), OPTIONS, 3)
+    assert failed == 3
+    assert results[GOOD[1]]["error"].startswith("worker process died")
+    assert results[GOOD[0]]["ok"] and results[GOOD[2]]["ok"]
+    assert "FileNotFoundError" in results["missing.gml"]["error"]
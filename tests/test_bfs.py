@@ -0,0 +1,166 @@
+"""
+Regression tests for graph.py's array-backed GraphCore and the BFS routines that run on it (core_multi_root_bfs through multi_BFS, BFSCache and compute_bfs_meta)
+Purpose: Check that the core built from a graph (build_graph_core) or straight from its edges (core_from_edges) lists every node's neighbors in the order NetworkX does,
+that every root's distances and parents match nx.single_source_shortest_path_length and nx.bfs_tree (also once the BFS cache has dropped rows to stay in its byte budget),
+and that the multi-source metadata matches a FIFO queue seeded with the roots in order
+Usage: python -m pytest tests
+"""
+
+import collections
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import networkx as nx
+import pytest
+import graph
+
+
+"""To make a random graph with string node ids like load_gml gives, with a few self loops and a few isolated nodes
+"""
+def random_graph(rng, n: int, p: float) -> nx.Graph:
+    G = nx.relabel_nodes(nx.gnp_random_graph(n, p, seed=int(rng.integers(1 << 30))), str)
+    for _ in range(int(rng.integers(0, 3))):
+        v = str(int(rng.integers(n)))
+        G.add_edge(v, v)
+    G.add_nodes_from(str(n + i) for i in range(int(rng.integers(0, 3))))
+    return G
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_core_matches_graph(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(1, 60)), float(rng.random()) * 0.2)
+    core = graph.build_graph_core(G)
+    assert graph.graph_core(G) is core
+    assert core.labels == list(G) and core.n == G.number_of_nodes() and core.m == G.number_of_edges()
+    for i, v in enumerate(core.labels):
+        assert [core.labels[u] for u in core.neighbors(i).tolist()] == list(G.adj[v])
+
+    # the same graph built from its edges in the order they were added
+    labels = list(G)
+    src, dst = zip(*((core.index[u], core.index[v]) for u, v in G.edges())) if G.number_of_edges() else ((), ())
+    H = nx.Graph()
+    H.add_nodes_from(labels)
+    H.add_edges_from(G.edges())
+    edges_core = graph.core_from_edges(labels, src, dst)
+    for i, v in enumerate(labels):
+        assert [labels[u] for u in edges_core.neighbors(i).tolist()] == list(H.adj[v])
+    assert edges_core.m == core.m
+
+
+"""To check one root's distance and parent arrays against NetworkX's BFS from it
+"""
+def assert_matches_networkx_bfs(G: nx.Graph, root: str, dist, parent):
+    core = graph.graph_core(G)
+    lengths = nx.single_source_shortest_path_length(G, root)
+    tree = nx.bfs_tree(G, root)
+    for i, v in enumerate(core.labels):
+        assert dist[i] == lengths.get(v, -1), v
+        preds = list(tree.predecessors(v)) if v in tree else []
+        assert parent[i] == (core.index[preds[0]] if preds else -1), v
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_multi_root_bfs_matches_networkx(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(1, 80)), float(rng.random()) * 0.15)
+    core = graph.build_graph_core(G)
+    # repeated roots and up to a full word of them
+    root_ids = rng.integers(0, core.n, int(rng.integers(1, graph.BFS_WORD_BITS + 1))).astype(np.int32)
+    dist, parent = graph.core_multi_root_bfs(core, root_ids)
+    assert dist.shape == parent.shape == (len(root_ids), core.n)
+    for b, r in enumerate(root_ids.tolist()):
+        assert_matches_networkx_bfs(G, core.labels[r], dist[b], parent[b])
+
+def test_multi_bfs_over_many_words():
+    # more roots than one sweep holds, so the rows come from several sweeps
+    rng = np.random.default_rng(50)
+    G = random_graph(rng, 200, 0.02)
+    roots = [str(v) for v in rng.integers(0, 200, 3 * graph.BFS_WORD_BITS + 5).tolist()]
+    result = graph.multi_BFS(G, roots)
+    assert len(result) == len(roots)
+    for i, (root, dist, parent) in enumerate(result.rows()):
+        assert root == roots[i]
+        assert_matches_networkx_bfs(G, root, dist, parent)
+
+    # paths are rebuilt from the parents, the same ones nx.bfs_tree gives
+    tree = nx.bfs_tree(G, roots[0])
+    for v in G:
+        path = result.path(0, v)
+        assert path == (nx.shortest_path(tree, roots[0], v) if v in tree else None)
+
+
+"""To work out the multi-source BFS metadata with a FIFO queue seeded with the roots in order, the way compute_bfs_meta is meant to break ties
+"""
+def fifo_bfs_meta(G: nx.Graph, roots: list):
+    dist, parent, source = {}, {}, {}
+    queue = collections.deque()
+    for r in roots:
+        if r not in dist:
+            dist[r], parent[r], source[r] = 0, None, r
+            queue.append(r)
+    while queue:
+        u = queue.popleft()
+        for v in G.adj[u]:
+            if v not in dist:
+                dist[v], parent[v], source[v] = dist[u] + 1, u, source[u]
+                queue.append(v)
+    return dist, parent, source
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_bfs_meta_matches_fifo_queue(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(1, 80)), float(rng.random()) * 0.1)
+    nodes = list(G)
+    roots = [nodes[int(i)] for i in rng.integers(0, len(nodes), int(rng.integers(1, 6)))]
+    dist, parent, source = graph.compute_bfs_meta(G, roots)
+
+    labels = graph.graph_core(G).labels
+    want_dist, want_parent, want_source = fifo_bfs_meta(G, roots)
+    for i, v in enumerate(labels):
+        assert dist[i] == want_dist.get(v, -1), v
+        assert (labels[parent[i]] if parent[i] >= 0 else None) == want_parent.get(v), v
+        assert (labels[source[i]] if source[i] >= 0 else None) == want_source.get(v), v
+
+def test_bfs_meta_skips_roots_not_in_graph():
+    G = nx.path_graph(["0", "1", "2"])
+    dist, _, source = graph.compute_bfs_meta(G, ["9", 2])
+    assert dist.tolist() == [2, 1, 0]
+    assert source.tolist() == [2, 2, 2]
+
+def test_bfs_cache_stays_in_budget():
+    rng = np.random.default_rng(60)
+    G = random_graph(rng, 300, 0.01)
+    core = graph.build_graph_core(G)
+    row_bytes = 2 * core.n * np.dtype(np.int32).itemsize
+    cache = graph.BFSCache(core, max_bytes=10 * row_bytes)
+    core.bfs = cache
+
+    roots = [str(v) for v in range(150)]
+    for root, dist, parent in graph.multi_BFS(G, roots).rows():
+        assert_matches_networkx_bfs(G, root, dist, parent)
+        assert cache.nbytes <= cache.max_bytes
+    assert len(cache.entries) == 10
+
+    # the rows still kept are hits, the dropped ones are swept again
+    hits, misses = cache.hits, cache.misses
+    cache.row(core.index[roots[-1]])
+    assert (cache.hits, cache.misses) == (hits + 1, misses)
+    dist, parent = cache.row(core.index[roots[0]])
+    assert cache.misses == misses + 1
+    assert_matches_networkx_bfs(G, roots[0], dist, parent)
+
+def test_bfs_cache_lookup_streams_rows():
+    # a budget too small for any row keeps nothing, lookup still yields every root's row in order
+    G = random_graph(np.random.default_rng(61), 100, 0.03)
+    core = graph.build_graph_core(G)
+    cache = graph.BFSCache(core, max_bytes=1)
+    roots = list(range(core.n)) * 2
+    for r, (dist, parent) in zip(roots, cache.lookup(roots)):
+        assert_matches_networkx_bfs(G, core.labels[r], dist, parent)
+    assert len(cache.entries) == 0 and cache.nbytes == 0
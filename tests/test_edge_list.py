@@ -0,0 +1,103 @@
+"""
+Regression tests for graph.py's out-of-core --edge_list run (EdgeListGraph through run_edge_list)
+Purpose: Check that --multi_BFS, --analyze and --output on a binary edge list (with repeated, reversed and self loop edges) write the same GML file as the in-memory
+--input run of the same graph, apart from the average shortest path length the edge list run leaves out
+Usage: python -m pytest tests
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import networkx as nx
+import pytest
+import graph
+
+
+"""To run graph.py's command line and fail the test with its output if it doesn't exit cleanly
+"""
+def run_cli(*args: str) -> str:
+    done = subprocess.run([sys.executable, os.path.join(ROOT, "graph.py"), *args], capture_output=True, text=True)
+    assert done.returncode == 0, done.stdout + done.stderr
+    return done.stdout
+
+"""To write the edges as a binary edge list
+"""
+def write_edge_list(tmp_path, edges, dtype: str = "int32") -> str:
+    path = str(tmp_path / "edges.bin")
+    np.asarray(edges, dtype=dtype).reshape(-1, 2).tofile(path)
+    return path
+
+"""To build the graph an edge list stands for in memory: nodes "0".."n-1" in order and the edges added in list order (so the neighbor lists are in the same order)
+"""
+def edge_list_graph(edges, n: int) -> nx.Graph:
+    G = nx.Graph()
+    G.add_nodes_from(str(v) for v in range(n))
+    G.add_edges_from((str(u), str(v)) for u, v in edges)
+    return G
+
+"""To read an output GML file's lines without the average shortest path the --edge_list run doesn't work out
+"""
+def gml_lines(path: str) -> list:
+    with open(path, "r", encoding="ascii") as f:
+        return [line for line in f if not line.startswith("  avg_shortest_path")]
+
+
+@pytest.mark.parametrize("dtype", graph.EDGE_LIST_DTYPES)
+def test_edge_list_matches_in_memory_run(tmp_path, dtype):
+    # the edges in the order the --input file lists them (an nx.write_gml round trip can reorder the neighbor lists of edges added in any other order),
+    # then 1-2, 5-4 and 4's self loop listed again, the other way round too. 7 and 8 (the last ids) have no edges
+    G = edge_list_graph([(0, 1), (0, 3), (1, 2), (4, 4), (4, 5), (4, 6), (5, 6)], 9)
+    gml_path = str(tmp_path / "input.gml")
+    nx.write_gml(G, gml_path)
+    edge_path = write_edge_list(tmp_path, [(int(u), int(v)) for u, v in nx.read_gml(gml_path).edges()] + [(1, 2), (2, 1), (5, 4), (4, 4)], dtype)
+    roots = ["2", "5", "2"]
+
+    out = run_cli("--edge_list", edge_path, "--edge_dtype", dtype, "--edge_list_nodes", "9", "--multi_BFS", *roots, "--analyze",
+                  "--output", str(tmp_path / "edge_list.gml"))
+    assert "edge list: 9 nodes, 7 edges" in out
+    run_cli("--input", gml_path, "--multi_BFS", *roots, "--analyze", "--no_cache", "--output", str(tmp_path / "in_memory.gml"))
+    assert gml_lines(str(tmp_path / "edge_list.gml")) == gml_lines(str(tmp_path / "in_memory.gml"))
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_edge_lists(tmp_path, seed, monkeypatch):
+    # small chunks, so the neighbor lists, the BFS frontier and the components all take several pieces
+    monkeypatch.setattr(graph, "EDGE_LIST_CHUNK", 7)
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 60))
+    edges = [tuple(e) for e in rng.integers(0, n, (int(rng.integers(0, 3 * n)), 2)).tolist()]
+    edges += edges[:int(rng.integers(0, 5))] + [(v, u) for u, v in edges[:int(rng.integers(0, 5))]]
+    rng.shuffle(edges)
+    edge_path = write_edge_list(tmp_path, edges)
+    roots = [str(v) for v in rng.integers(0, n, 3).tolist()]
+
+    graph.run_edge_list(edge_path, "int32", n, roots, True, str(tmp_path / "edge_list.gml"))
+    # the steps the in-memory --multi_BFS --analyze --output run takes, on the graph built from the same edges
+    G = edge_list_graph(edges, n)
+    graph.attach_bfs_meta(G, *graph.compute_bfs_meta(G, roots))
+    structure = graph.analyze_structure(G)
+    graph.attach_components_meta(G, structure.num_components)
+    graph.attach_cycles_meta(G, structure.has_cycle)
+    graph.attach_density_meta(G, structure.density)
+    graph.attach_component_ids(G, structure.comp_id)
+    graph.attach_isolate_attr(G, structure.isolate)
+    graph.save_gml(G, str(tmp_path / "in_memory.gml"))
+    assert gml_lines(str(tmp_path / "edge_list.gml")) == gml_lines(str(tmp_path / "in_memory.gml"))
+
+    # the temporary neighbor lists are gone
+    assert sorted(os.listdir(tmp_path)) == ["edge_list.gml", "edges.bin", "in_memory.gml"]
+
+def test_bad_edge_lists(tmp_path):
+    path = str(tmp_path / "edges.bin")
+    np.array([0, 1, 2], dtype=np.int32).tofile(path)
+    with pytest.raises(ValueError, match="not a whole number"):
+        graph.EdgeListGraph(path)
+    np.array([0, 5], dtype=np.int32).tofile(path)
+    with pytest.raises(ValueError, match="only has 3 nodes"):
+        graph.EdgeListGraph(path, n=3)
+    with pytest.raises(ValueError, match="out-of-range"):
+        graph.run_edge_list(path, "int32", None, ["6"], False)
@@ -0,0 +1,100 @@
+"""
+Regression tests for graph.py's GML reader (read_gml_fast through load_gml) and writer (write_gml_fast through save_gml)
+Purpose: Check that loading the repo's .gml files gives the same graph nx.read_gml does (nodes, edges and attributes in the same order),
+and that saving a graph writes the same file nx.write_gml would
+Usage: python -m pytest tests
+"""
+
+import glob
+import gzip
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import networkx as nx
+import pytest
+import graph
+
+MALFORMED = os.path.join(ROOT, "misc", "mo_analyze_malformed.gml")
+REPO_GML = sorted(path for path in glob.glob(os.path.join(ROOT, "*.gml")) + glob.glob(os.path.join(ROOT, "misc", "*.gml")) if path != MALFORMED)
+
+
+"""To read a saved file's text, decompressing .gz files
+"""
+def read_text(path: str) -> str:
+    with (gzip.open(path, "rt", encoding="ascii") if path.endswith(".gz") else open(path, "r", encoding="ascii")) as f:
+        return f.read()
+
+"""To check two graphs are the same, down to the order of their nodes, edges and attributes
+"""
+def assert_same_graph(G: nx.Graph, H: nx.Graph):
+    assert list(G.nodes(data=True)) == list(H.nodes(data=True))
+    assert list(G.edges(data=True)) == list(H.edges(data=True))
+    assert G.graph == H.graph
+
+
+@pytest.mark.parametrize("path", REPO_GML, ids=os.path.basename)
+def test_read_matches_networkx(path):
+    # the repo's files are all in the subset read_gml_fast reads, so none of them falls back to nx.read_gml
+    fast = graph.read_gml_fast(path)
+    assert_same_graph(fast, nx.read_gml(path))
+    assert_same_graph(graph.load_gml(path), nx.read_gml(path))
+
+    # the core built while parsing is the one build_graph_core would make from the graph
+    core, rebuilt = graph.graph_core(fast), graph.build_graph_core(nx.read_gml(path))
+    assert core.labels == rebuilt.labels
+    assert core.m == rebuilt.m == fast.number_of_edges()
+    for i in range(core.n):
+        assert sorted(core.neighbors(i).tolist()) == sorted(rebuilt.neighbors(i).tolist())
+
+def test_read_falls_back_to_networkx(tmp_path):
+    # GML outside read_gml_fast's subset (a list valued attribute, comments) is read by nx.read_gml instead, with the same result
+    path = str(tmp_path / "lists.gml")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('# a comment\ngraph [\n  node [\n    id 0\n    label "0"\n    pos 1.0\n    pos 2.0\n  ]\n  node [\n    id 1\n    label "1"\n  ]\n'
+                '  edge [\n    source 0\n    target 1\n  ]\n]\n')
+    with pytest.raises(graph.GMLFallback):
+        graph.read_gml_fast(path)
+    assert_same_graph(graph.load_gml(path), nx.read_gml(path))
+
+def test_read_rejects_non_int_ids():
+    with pytest.raises(ValueError, match="node id A"):
+        graph.load_gml(MALFORMED)
+
+
+@pytest.mark.parametrize("path", REPO_GML, ids=os.path.basename)
+def test_write_matches_networkx(tmp_path, path):
+    G = graph.load_gml(path)
+    graph.save_gml(G, str(tmp_path / "fast.gml"))
+    nx.write_gml(nx.read_gml(path), str(tmp_path / "nx.gml"))
+    assert read_text(str(tmp_path / "fast.gml")) == read_text(str(tmp_path / "nx.gml"))
+
+@pytest.mark.parametrize("name", ["attrs.gml", "attrs.gml.gz"])
+def test_write_attribute_types(tmp_path, name):
+    # the values gml_entry and gml_column special case: big ints, bools, floats (inf, exponents), escaped strings and nodes missing some attributes
+    G = nx.Graph(name="mixed", tags=["a", "b"], single=[1])
+    G.add_node("0", size=3, weight=1.5, note="plain")
+    G.add_node("1", size=2**40, weight=float("inf"), note='quote " & caf\u00e9')
+    G.add_node("2", weight=1e-300, flag=True)
+    G.add_node("3")
+    G.add_edges_from([("0", "1"), ("1", "2"), ("2", "2")])
+    graph.build_graph_core(G)
+
+    path, expected = str(tmp_path / name), str(tmp_path / ("nx_" + name))
+    graph.write_gml_fast(G, path)
+    nx.write_gml(G, expected)
+    assert read_text(path) == read_text(expected)
+    assert_same_graph(graph.load_gml(path), nx.read_gml(expected))
+
+def test_write_falls_back_to_networkx(tmp_path):
+    # edge attributes aren't in write_gml_fast's subset, save_gml writes them with nx.write_gml
+    G = nx.Graph()
+    G.add_edge("0", "1", weight=2)
+    graph.build_graph_core(G)
+    with pytest.raises(graph.GMLFallback):
+        graph.write_gml_fast(G, str(tmp_path / "fast.gml"))
+    graph.save_gml(G, str(tmp_path / "saved.gml"))
+    nx.write_gml(G, str(tmp_path / "nx.gml"))
+    assert read_text(str(tmp_path / "saved.gml")) == read_text(str(tmp_path / "nx.gml"))
@@ -0,0 +1,109 @@
+"""
+Regression tests for graph.py's .gmlcache sidecar (write_gml_cache / read_gml_cache through load_gml(use_cache=True))
+Purpose: Check that a warm load gives the same graph as parsing the file, and that the cache is dropped once the file's size or contents change
+(a new mtime alone only costs a hash check)
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import networkx as nx
+import pytest
+import graph
+
+
+GML_TEXT = (
+    'graph [\n  name "cached"\n'
+    '  node [\n    id 0\n    label "0"\n    weight 1.5\n    kind "a"\n  ]\n'
+    '  node [\n    id 1\n    label "1"\n    weight 2.5\n  ]\n'
+    '  node [\n    id 2\n    label "2"\n    weight 3.5\n    kind "b"\n  ]\n'
+    '  node [\n    id 3\n    label "3"\n    weight 4.5\n  ]\n'
+    '  edge [\n    source 0\n    target 1\n  ]\n'
+    '  edge [\n    source 1\n    target 2\n  ]\n'
+    ']\n'
+)
+
+
+"""To write a GML file with the given text
+"""
+def write_text(path: str, text: str):
+    with open(path, "w", encoding="ascii") as f:
+        f.write(text)
+
+"""To move a file's mtime a second on, so it no longer matches the one the cache was keyed by
+"""
+def touch_later(path: str):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+"""To check two graphs are the same, down to the order of their nodes, edges and attributes
+"""
+def assert_same_graph(G: nx.Graph, H: nx.Graph):
+    assert list(G.nodes(data=True)) == list(H.nodes(data=True))
+    assert list(G.edges(data=True)) == list(H.edges(data=True))
+    assert G.graph == H.graph
+
+"""To load a file cold so its cache gets written
+"""
+@pytest.fixture
+def cached_input(tmp_path):
+    path = str(tmp_path / "input.gml")
+    write_text(path, GML_TEXT)
+    assert graph.read_gml_cache(path) is None
+    graph.load_gml(path, use_cache=True)
+    assert os.path.exists(graph.gml_cache_path(path))
+    return path
+
+
+def test_warm_load_matches_cold_load(cached_input, capsys):
+    cold = graph.load_gml(cached_input)
+    capsys.readouterr()
+    warm = graph.load_gml(cached_input, use_cache=True)
+    assert "warm load" in capsys.readouterr().out
+    assert_same_graph(warm, cold)
+
+    # the core rebuilt from the cache's arrays has the same neighbor order the parse gave
+    warm_core, cold_core = graph.graph_core(warm), graph.graph_core(cold)
+    assert warm_core.labels == cold_core.labels
+    assert warm_core.indptr.tolist() == cold_core.indptr.tolist()
+    assert warm_core.indices.tolist() == cold_core.indices.tolist()
+
+def test_new_mtime_same_contents_is_still_used(cached_input):
+    touch_later(cached_input)
+    G = graph.read_gml_cache(cached_input)
+    assert G is not None
+    assert_same_graph(G, graph.load_gml(cached_input))
+
+def test_size_change_is_stale(cached_input):
+    # an extra edge, with the mtime put back to the one the cache was keyed by so only the size gives it away
+    stat = os.stat(cached_input)
+    write_text(cached_input, GML_TEXT[:-2] + "  edge [\n    source 2\n    target 3\n  ]\n]\n")
+    os.utime(cached_input, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert graph.read_gml_cache(cached_input) is None
+
+    G = graph.load_gml(cached_input, use_cache=True)
+    assert G.has_edge("2", "3")
+    # the cold load wrote a fresh cache for the new contents
+    assert_same_graph(graph.read_gml_cache(cached_input), G)
+
+def test_content_change_same_size_is_stale(cached_input):
+    # the same number of bytes with a different weight: only the content hash tells them apart
+    changed = GML_TEXT.replace("weight 3.5", "weight 7.5")
+    assert len(changed) == len(GML_TEXT)
+    write_text(cached_input, changed)
+    touch_later(cached_input)
+    assert graph.read_gml_cache(cached_input) is None
+
+    G = graph.load_gml(cached_input, use_cache=True)
+    assert G.nodes["2"]["weight"] == 7.5
+    assert_same_graph(graph.read_gml_cache(cached_input), G)
+
+def test_bad_cache_file_is_ignored(cached_input):
+    with open(graph.gml_cache_path(cached_input), "r+b") as f:
+        f.write(b"NOTACACHE")
+    assert graph.read_gml_cache(cached_input) is None
+    assert_same_graph(graph.load_gml(cached_input, use_cache=True), nx.read_gml(cached_input))
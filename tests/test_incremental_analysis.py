@@ -0,0 +1,178 @@
+"""
+Regression tests for graph.py's IncrementalAnalysis (--edits with --analyze)
+Purpose: Apply random edit streams to random graphs through the incremental analysis and check the components, isolates, cycle status, density and multi-source BFS
+metadata against working them out again from the edited graph, also when the analysis starts from the sidecar kept next to the --input file and when that sidecar is stale
+Usage: python -m pytest tests
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import networkx as nx
+import pytest
+import graph
+
+
+"""To make a random graph with string node ids like load_gml gives, with a few self loops
+"""
+def random_graph(rng, n: int, p: float) -> nx.Graph:
+    G = nx.relabel_nodes(nx.gnp_random_graph(n, p, seed=int(rng.integers(1 << 30))), str)
+    for _ in range(int(rng.integers(0, 3))):
+        v = str(int(rng.integers(n)))
+        G.add_edge(v, v)
+    graph.build_graph_core(G)
+    return G
+
+"""To make a random stream of edits that can all be applied in order: edges added between old and new nodes, edges and nodes (roots too) removed
+"""
+def random_edits(rng, G: nx.Graph, count: int) -> list:
+    H = G.copy()
+    next_id = max((int(v) for v in H), default=-1) + 1
+    edits = []
+    while len(edits) < count:
+        op = rng.choice(["add_edge", "add_edge", "remove_edge", "remove_edge", "add_node", "remove_node"])
+        nodes = list(H)
+        if op == "add_edge" and nodes:
+            u = nodes[int(rng.integers(len(nodes)))]
+            v = str(next_id) if rng.random() < 0.1 else nodes[int(rng.integers(len(nodes)))]
+            next_id += v == str(next_id)
+            edit = (op, (u, v))
+        elif op == "remove_edge" and H.number_of_edges():
+            edges = list(H.edges())
+            edit = (op, edges[int(rng.integers(len(edges)))])
+        elif op == "add_node":
+            edit = (op, (str(next_id),))
+            next_id += 1
+        elif op == "remove_node" and len(nodes) > 1:
+            edit = (op, (nodes[int(rng.integers(len(nodes)))],))
+        else:
+            continue
+        graph.apply_edits(H, [edit])
+        edits.append(edit)
+    return edits
+
+"""To check the analysis finish left with the graph's core against working it out again from the edited graph
+"""
+def assert_matches_full_analysis(G: nx.Graph, roots: list):
+    incremental = graph.analyze_structure(G)
+    incremental_meta = graph.compute_bfs_meta(G, roots)
+    incremental_isolates = graph.compute_isolates(G)
+
+    graph.drop_graph_core(G)
+    full = graph.analyze_structure(G)
+    assert graph.graph_core(G).bfs_meta is None
+    full_meta = graph.compute_bfs_meta(G, roots)
+
+    assert incremental.comp_id.tolist() == full.comp_id.tolist()
+    assert incremental.num_components == graph.analyze_components(G) == nx.number_connected_components(G)
+    assert incremental.has_cycle == graph.analyze_cycles(G)
+    assert incremental.density == graph.analyze_density(G)
+    assert incremental_isolates == graph.compute_isolates(G)
+    for name, got, want in zip(("dist", "parent", "source"), incremental_meta, full_meta):
+        assert got.tolist() == want.tolist(), name
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_edit_streams(seed):
+    rng = np.random.default_rng(seed)
+    G = random_graph(rng, int(rng.integers(2, 40)), float(rng.random()) * 0.2)
+    nodes = list(G)
+    roots = [nodes[int(i)] for i in rng.integers(0, len(nodes), int(rng.integers(1, 5)))]
+    edits = random_edits(rng, G, int(rng.integers(1, 60)))
+
+    analysis = graph.start_incremental_analysis(G, roots)
+    for op, args in edits:
+        analysis.apply(op, args)
+    analysis.finish()
+    assert_matches_full_analysis(G, roots)
+
+
+"""To save a random graph as the --input file a run would load, with the analysis sidecar a plain --analyze run leaves next to it
+"""
+def saved_input(tmp_path, rng, roots_count: int = 3):
+    path = str(tmp_path / "input.gml")
+    graph.save_gml(random_graph(rng, 30, 0.08), path)
+    G = graph.load_gml(path)
+    nodes = list(G)
+    roots = [nodes[int(i)] for i in rng.integers(0, len(nodes), roots_count)]
+    graph.write_analysis_cache(G, roots, path)
+    return path, roots
+
+def test_edits_from_sidecar(tmp_path):
+    rng = np.random.default_rng(100)
+    path, roots = saved_input(tmp_path, rng)
+
+    G = graph.load_gml(path)
+    assert graph.read_analysis_cache(path, G.number_of_nodes()) is not None
+    edits = random_edits(rng, G, 40)
+    analysis = graph.start_incremental_analysis(G, roots, path)
+    for op, args in edits:
+        analysis.apply(op, args)
+    analysis.finish()
+    assert_matches_full_analysis(G, roots)
+
+def test_sidecar_with_other_roots(tmp_path):
+    rng = np.random.default_rng(101)
+    path, roots = saved_input(tmp_path, rng)
+
+    # the components still come from the sidecar, the BFS metadata is worked out for the new roots
+    G = graph.load_gml(path)
+    other_roots = [v for v in G if v not in roots][:2]
+    edits = random_edits(rng, G, 30)
+    analysis = graph.start_incremental_analysis(G, other_roots, path)
+    for op, args in edits:
+        analysis.apply(op, args)
+    analysis.finish()
+    assert_matches_full_analysis(G, other_roots)
+
+def test_stale_sidecar_mtime(tmp_path):
+    rng = np.random.default_rng(102)
+    path, roots = saved_input(tmp_path, rng)
+
+    # same contents with a new mtime: the analysis sidecar (keyed by size and mtime) is dropped, the GML sidecar checks the hash and is still used
+    graph.load_gml(path, use_cache=True)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert graph.read_gml_cache(path) is not None
+    G = graph.load_gml(path, use_cache=True)
+    assert graph.read_analysis_cache(path, G.number_of_nodes()) is None
+
+    edits = random_edits(rng, G, 30)
+    analysis = graph.start_incremental_analysis(G, roots, path)
+    for op, args in edits:
+        analysis.apply(op, args)
+    analysis.finish()
+    assert_matches_full_analysis(G, roots)
+
+def test_stale_sidecar_contents(tmp_path):
+    rng = np.random.default_rng(103)
+    path, roots = saved_input(tmp_path, rng)
+    graph.load_gml(path, use_cache=True)
+
+    # move the last edge onto a non-edge with ids of the same widths, so the file keeps its size but not its hash: both sidecars must be dropped
+    G = graph.load_gml(path)
+    u, v = list(G.edges())[-1]
+    moved = next((a, b) for a in G for b in G if a != b and len(a) == len(u) and len(b) == len(v) and not G.has_edge(a, b))
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    old_edge = f"source {u}\n    target {v}\n"
+    assert text.endswith(old_edge + "  ]\n]\n")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text[:text.rindex(old_edge)] + f"source {moved[0]}\n    target {moved[1]}\n  ]\n]\n")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert graph.read_gml_cache(path) is None
+    G = graph.load_gml(path, use_cache=True)
+    assert graph.read_analysis_cache(path, G.number_of_nodes()) is None
+    assert G.has_edge(*moved) and not G.has_edge(u, v)
+    edits = random_edits(rng, G, 30)
+    analysis = graph.start_incremental_analysis(G, roots, path)
+    for op, args in edits:
+        analysis.apply(op, args)
+    analysis.finish()
+    assert_matches_full_analysis(G, roots)
@@ -0,0 +1,51 @@
+"""
+Regression tests for graph.py's Erdos-Renyi generator (erdos_renyi_edges through create_random_graph)
+Purpose: Check that a seed always gives the same graph, that the edges are distinct pairs in order, and that the edge count is what G(n, p) expects
+Usage: python -m pytest tests
+"""
+
+import math
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pytest
+import graph
+
+
+@pytest.mark.parametrize("n, c", [(50, 1.0), (1000, 0.5), (1000, 3.0)])
+def test_same_seed_same_graph(n, c):
+    G, H = graph.create_random_graph(n, c, seed=7), graph.create_random_graph(n, c, seed=7)
+    assert list(G.nodes()) == list(H.nodes()) == [str(i) for i in range(n)]
+    assert list(G.edges()) == list(H.edges())
+    assert graph.graph_core(G).indices.tolist() == graph.graph_core(H).indices.tolist()
+
+    other = graph.create_random_graph(n, c, seed=8)
+    assert list(G.edges()) != list(other.edges())
+
+def test_edges_are_distinct_pairs_in_order():
+    lo, hi = graph.erdos_renyi_edges(2000, 0.01, seed=3)
+    assert lo.dtype == hi.dtype == np.int32
+    assert (lo < hi).all() and (hi < 2000).all() and (lo >= 0).all()
+    # pair order: by the higher id and then the lower one, which also makes every pair distinct
+    keys = hi.astype(np.int64) * 2000 + lo
+    assert (np.diff(keys) > 0).all()
+
+@pytest.mark.parametrize("p, expected", [(0.0, 0), (1.0, 45)])
+def test_edge_probability_bounds(p, expected):
+    lo, hi = graph.erdos_renyi_edges(10, p, seed=1)
+    assert lo.size == hi.size == expected
+
+@pytest.mark.parametrize("seed", range(5))
+def test_expected_edge_count(seed):
+    # the edge count is Binomial(n(n-1)/2, p), so it should land well within 5 standard deviations of the mean
+    n, c = 10000, 2.0
+    p = c * math.log(n) / n
+    pairs = n * (n - 1) // 2
+    G = graph.create_random_graph(n, c, seed=seed)
+    mean, sd = pairs * p, math.sqrt(pairs * p * (1 - p))
+    assert abs(G.number_of_edges() - mean) < 5 * sd
+    assert graph.graph_core(G).m == G.number_of_edges()
@@ -0,0 +1,141 @@
+"""
+Regression tests for graph.py's --serve request handlers (GraphServer.handle and dispatch through the SERVER_OPS functions)
+Purpose: Send JSON line requests over a local TCP connection and check the load, bfs, component, isolates, density, export and unload answers against working them out
+directly, and that malformed requests (unknown ops, graphs or nodes, missing or mistyped fields, paths outside --serve_dir, bad or over-long lines) get an error line
+while the connection carries on
+Usage: python -m pytest tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import networkx as nx
+import pytest
+import graph
+
+
+"""To answer request lines the way --serve does, over one connection to a server on a free local port
+Input: The GraphServer, the request lines (dicts are sent as JSON, strings as they are) and the longest line the server reads
+Output: The parsed response lines, in order
+"""
+def exchange(server: graph.GraphServer, lines: list, limit: int = graph.SERVER_LINE_LIMIT) -> list:
+    async def talk():
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0, limit=limit)
+        async with listener:
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for line in lines:
+                writer.write((line if isinstance(line, str) else json.dumps(line)).encode("utf-8") + b"\n")
+            await writer.drain()
+            responses = [json.loads(await reader.readline()) for line in lines if not (isinstance(line, str) and not line.strip())]
+            writer.close()
+            await writer.wait_closed()
+        return responses
+    return asyncio.run(talk())
+
+"""To serve a folder with a graph of two components and two isolated nodes saved in it as graph.gml, with the graph already loaded as "g"
+"""
+@pytest.fixture
+def server(tmp_path):
+    G = nx.Graph()
+    G.add_nodes_from(str(v) for v in range(9))
+    G.add_edges_from([("0", "1"), ("1", "2"), ("2", "0"), ("2", "3"), ("4", "5"), ("5", "6")])
+    (tmp_path / "served").mkdir()
+    nx.write_gml(G, str(tmp_path / "served" / "graph.gml"))
+    server = graph.GraphServer(2, str(tmp_path / "served"))
+    [response] = exchange(server, [{"op": "load", "path": "graph.gml", "graph": "g", "cache": False}])
+    assert response["ok"] and (response["nodes"], response["edges"]) == (9, 6)
+    yield server
+    server.pool.shutdown()
+
+
+def test_queries(server):
+    G = server.graphs["g"].G
+    ping, graphs, bfs, some, component, isolates, density = exchange(server, [
+        {"op": "ping", "id": 7},
+        {"op": "graphs"},
+        {"op": "bfs", "graph": "g", "roots": ["3", "5"]},
+        {"op": "bfs", "graph": "g", "roots": ["3"], "nodes": ["0", "8"]},
+        {"op": "component", "graph": "g", "node": "5"},
+        {"op": "isolates", "graph": "g"},
+        {"op": "density", "graph": "g"},
+    ])
+    assert ping["ok"] and ping["id"] == 7
+    assert graphs["graphs"] == {"g": {"path": "graph.gml", "nodes": 9, "edges": 6}}
+
+    # the same metadata --multi_BFS gives, with null where a node isn't reached
+    dist, parent, source = graph.compute_bfs_meta(G, ["3", "5"])
+    labels = graph.graph_core(G).labels
+    assert bfs["nodes"] == labels
+    assert bfs["dist"] == [d if d >= 0 else None for d in dist.tolist()]
+    assert bfs["parent"] == [labels[p] if p >= 0 else None for p in parent.tolist()]
+    assert bfs["source"] == [labels[s] if s >= 0 else None for s in source.tolist()]
+    assert (some["nodes"], some["dist"], some["source"]) == (["0", "8"], [2, None], ["3", None])
+
+    assert (component["componentID"], component["size"], component["num_components"]) == (1, 3, 4)
+    assert isolates["isolates"] == ["7", "8"]
+    assert density["density"] == pytest.approx(nx.density(G))
+
+def test_export_and_unload(server, tmp_path):
+    export, again, unload, gone = exchange(server, [
+        {"op": "export", "graph": "g", "path": "out/../analyzed.gml", "roots": ["0"], "analyze": True, "diameter": True},
+        {"op": "export", "graph": "g", "path": "plain.gml"},
+        {"op": "unload", "graph": "g"},
+        {"op": "density", "graph": "g"},
+    ])
+    assert export["ok"] and export["path"] == str(tmp_path / "served" / "analyzed.gml")
+    assert export["num_components"] == 4 and export["multi_BFS"] == {"0": {"reached": 4, "depth": 2}}
+    saved = nx.read_gml(export["path"])
+    assert saved.graph["num_components"] == 4 and saved.nodes["3"]["dist"] == 2
+
+    # one export's metadata stays out of the served graph and later exports
+    plain = nx.read_gml(again["path"])
+    assert "num_components" not in plain.graph and "dist" not in plain.nodes["3"]
+
+    assert unload["ok"] and unload["graph"] == "g"
+    assert not gone["ok"] and gone["error"] == "no graph loaded as 'g'"
+
+@pytest.mark.parametrize("request_fields, error", [
+    ({"op": "nope"}, "unknown op 'nope'"),
+    ({"graph": "g"}, "unknown op None"),
+    ({"op": "density"}, "missing 'graph' field"),
+    ({"op": "density", "graph": 3}, "'graph' must be a string, got 3"),
+    ({"op": "density", "graph": "h"}, "no graph loaded as 'h'"),
+    ({"op": "bfs", "graph": "g"}, "missing 'roots' field"),
+    ({"op": "bfs", "graph": "g", "roots": "0"}, "'roots' must be a list of node id strings, got \"0\""),
+    ({"op": "bfs", "graph": "g", "roots": [0]}, "'roots' must be a list of node id strings, got [0]"),
+    ({"op": "bfs", "graph": "g", "roots": []}, "'roots' must be a non-empty list of nodes in the graph"),
+    ({"op": "bfs", "graph": "g", "roots": ["0"], "nodes": ["99"]}, "unknown node '99'"),
+    ({"op": "component", "graph": "g", "node": "99"}, "unknown node '99'"),
+    ({"op": "component", "graph": "g"}, "missing 'node' field"),
+    ({"op": "load"}, "missing 'path' field"),
+    ({"op": "load", "path": "graph.gml", "cache": "yes"}, "'cache' must be true or false, got \"yes\""),
+    ({"op": "load", "path": "../outside.gml"}, "path '../outside.gml' is outside the served directory"),
+    ({"op": "load", "path": "/etc/hosts"}, "path '/etc/hosts' is outside the served directory"),
+    ({"op": "export", "graph": "g"}, "missing 'path' field"),
+    ({"op": "export", "graph": "g", "path": "../outside.gml"}, "path '../outside.gml' is outside the served directory"),
+    ({"op": "export", "graph": "g", "path": "x.gml", "avg_path_samples": 0}, "'avg_path_samples' must be > 0"),
+    ({"op": "export", "graph": "g", "path": "x.gml", "seed": True}, "'seed' must be an integer, got true"),
+])
+def test_request_errors(server, tmp_path, request_fields, error):
+    # every bad request gets its error line (with its id), and the connection still answers the next request
+    response, after = exchange(server, [{**request_fields, "id": "r1"}, {"op": "ping"}])
+    assert response["ok"] is False and response["error"].startswith(error), response
+    assert response["id"] == "r1"
+    assert after["ok"]
+    assert not os.path.exists(tmp_path / "outside.gml")
+    assert sorted(os.listdir(tmp_path / "served")) == ["graph.gml"]
+
+def test_bad_lines(server):
+    responses = exchange(server, ["not json", "[1, 2]", "   ", '{"op": "load", "path": "missing.gml"}', '"x" ' * 40, {"op": "ping"}], limit=100)
+    assert [r["ok"] for r in responses] == [False, False, False, False, True]
+    assert responses[0]["error"].startswith("JSONDecodeError")
+    assert responses[1]["error"] == "a request must be a JSON object"
+    assert responses[2]["error"].startswith("FileNotFoundError")
+    # the line past the limit is skipped, and the next request on the connection is answered
+    assert responses[3]["error"] == f"request line longer than {graph.SERVER_LINE_LIMIT} bytes"
@@ -0,0 +1,59 @@
+"""
+Regression tests for graph.py's --sweep (sweep_seed and sweep_point through run_sweep)
+Purpose: Check that a sweep with the same base seed writes the same rows whatever the number of workers, and that every row's statistics are those of the graph
+--create_random_graph n c --seed seed builds
+Usage: python -m pytest tests
+"""
+
+import csv
+import io
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import networkx as nx
+import pytest
+import graph
+
+NS, CS, REPS = [50, 400], [0.5, 1.5], 3
+
+
+"""To run a sweep into memory and read its rows back, without the timing column that changes from run to run
+"""
+def sweep_rows(base_seed: int, workers: int) -> list:
+    out = io.StringIO()
+    assert graph.run_sweep(NS, CS, REPS, base_seed, out, workers) == len(NS) * len(CS) * REPS
+    out.seek(0)
+    rows = list(csv.DictReader(out))
+    assert all(list(row) == list(graph.SWEEP_FIELDS) for row in rows)
+    return [{key: value for key, value in row.items() if key != "seconds"} for row in rows]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_same_seed_same_rows(workers):
+    rows = sweep_rows(11, workers)
+    assert rows == sweep_rows(11, 1)
+    assert rows != sweep_rows(12, workers)
+    # grid order, whatever order the workers finish in
+    assert [(int(r["n"]), float(r["c"]), int(r["rep"])) for r in rows] == [(n, c, rep) for n in NS for c in CS for rep in range(REPS)]
+
+def test_rows_match_created_graphs():
+    for row in sweep_rows(13, 1):
+        G = graph.create_random_graph(int(row["n"]), float(row["c"]), int(row["seed"]))
+        giant = max(map(len, nx.connected_components(G)))
+        assert int(row["edges"]) == G.number_of_edges()
+        assert int(row["components"]) == nx.number_connected_components(G)
+        assert int(row["isolates"]) == nx.number_of_isolates(G)
+        assert float(row["giant_fraction"]) == giant / G.number_of_nodes()
+        assert (row["connected"] == "True") == nx.is_connected(G)
+
+def test_seed_depends_on_point_not_grid():
+    # a point keeps its seed when the grid around it changes
+    assert graph.sweep_seed(5, 400, 1.5, 2) == graph.sweep_seed(5, 400, 1.5, 2)
+    assert len({graph.sweep_seed(5, n, c, rep) for n in NS for c in CS for rep in range(REPS)}) == len(NS) * len(CS) * REPS
+    out = io.StringIO()
+    graph.run_sweep([400], [1.5], REPS, 5, out)
+    out.seek(0)
+    assert [int(row["seed"]) for row in csv.DictReader(out)] == [graph.sweep_seed(5, 400, 1.5, rep) for rep in range(REPS)]